@@ -0,0 +1,538 @@
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from ingestion_manifest import MANIFEST_TABLE
+from pulse_metrics import METRICS
+from pulse_schema import TABLES, get_dialect
+from schema_manager import latest_period_condition
+from sql_runner import borrow_connection, connect_mysql, fetch_dataframe
+
+# --- Parameterized analysis API ---
+# The 19 analyses of phonepe_analysis_queries.sql as functions of state, year, quarter, category
+# and top_n. Each builder returns (SQL, parameters) for a given placeholder style; the state
+# level queries read the rollup tables, like phonepe_rollup_queries.sql. Calling a builder with
+# its defaults reproduces the hard-coded query (e.g. 2.2 defaults to 'karnataka' and 2021).
+# For the "latest period" analyses, year=None / quarter=None means the most recent one in the data
+# (as recorded in the latest_period table, see schema_manager).
+#
+# run_analysis() serves results through a ResultCache keyed by (analysis, parameters, data
+# version), with LRU eviction and a TTL. The data version is a hash of the ingestion manifest,
+# so a refresh of the Pulse data invalidates every cached slice at once.
+
+
+def _conditions(p, **filters):
+    """Builds 'col = ? AND ...' for the filters that are not None. Returns (sql, params)."""
+    columns = [column for column, value in filters.items() if value is not None]
+    return ' AND '.join(f"{column} = {p}" for column in columns), [filters[column] for column in columns]
+
+
+def _where(p, **filters):
+    """Like _conditions, but returns a full WHERE clause (or '' when there is no filter)."""
+    sql, params = _conditions(p, **filters)
+    return (f"WHERE {sql}" if sql else ''), params
+
+
+def _period(p, table, year, quarter):
+    """Selects the given year/quarter, filling in whatever is None with the latest period in the table."""
+    if year is not None and quarter is not None:
+        return f"year = {p} AND quarter = {p}", [year, quarter]
+    if year is not None:
+        return f"year = {p} AND quarter = (SELECT MAX(quarter) FROM {table} WHERE year = {p})", [year, year]
+    if quarter is not None:
+        return f"quarter = {p} AND year = (SELECT MAX(year) FROM {table} WHERE quarter = {p})", [quarter, quarter]
+    return latest_period_condition(table), []
+
+
+def _limit(top_n):
+    """Returns the LIMIT clause for top_n (no limit when top_n is None or 0)."""
+    return f"LIMIT {int(top_n)}" if top_n else ''
+
+
+def _and(*conditions):
+    """Joins the non-empty conditions with AND."""
+    return ' AND '.join(condition for condition in conditions if condition)
+
+
+def _place(state=None):
+    """Formats a state name for titles, e.g. 'andaman-&-nicobar-islands' -> 'Andaman & Nicobar Islands'."""
+    return state.replace('-', ' ').title() if state else 'All States'
+
+
+def _when(year=None, quarter=None, default='Latest Year/Quarter'):
+    """Formats a year/quarter for titles."""
+    if year is not None and quarter is not None:
+        return f"{year} Q{quarter}"
+    if year is not None:
+        return str(year)
+    if quarter is not None:
+        return f"Q{quarter}"
+    return default
+
+
+# --- The 19 analyses ---
+
+def analysis_1_1(p, state=None, year=None, quarter=None, top_n=None):
+    """Transaction count and amount per payment instrument (all years and quarters unless filtered)."""
+    where, params = _where(p, state=state, year=year, quarter=quarter)
+    return f"""
+        SELECT transaction_type, SUM(transaction_count) AS total_transactions,
+               SUM(transaction_amount) AS total_transaction_amount
+        FROM Aggregated_transaction
+        {where}
+        GROUP BY transaction_type
+        ORDER BY total_transaction_amount DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_1_2(p, state='maharashtra', category='Recharge & bill payments'):
+    """Quarterly transaction trend for a state and payment instrument."""
+    where, params = _where(p, state=state, transaction_type=category)
+    return f"""
+        SELECT year, quarter, SUM(transaction_count) AS quarterly_transactions,
+               SUM(transaction_amount) AS quarterly_amount
+        FROM Aggregated_transaction
+        {where}
+        GROUP BY year, quarter
+        ORDER BY year, quarter""", params
+
+
+def analysis_1_3(p, year=2022, quarter=None, top_n=5):
+    """Top states by total transaction amount for a year."""
+    where, params = _where(p, year=year, quarter=quarter)
+    return f"""
+        SELECT state, SUM(transaction_amount) AS total_transaction_amount
+        FROM rollup_map_transaction
+        {where}
+        GROUP BY state
+        ORDER BY total_transaction_amount DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_2_1(p, top_n=None):
+    """Registered users and app opens by device brand across all years and quarters."""
+    # Kept as in the report: the comma join multiplies every device row by every Aggregated_user row
+    return f"""
+        SELECT brand_name, SUM(registered_users) AS total_registered_users, SUM(app_opens) AS total_app_opens
+        FROM users_by_device, Aggregated_user
+        GROUP BY brand_name
+        ORDER BY total_registered_users DESC
+        {_limit(top_n)}""", []
+
+
+def analysis_2_2(p, state='karnataka', year=2021, quarter=None, top_n=None):
+    """Registered users by device brand for a state in a given year."""
+    where, params = _where(p, state=state, year=year, quarter=quarter)
+    return f"""
+        SELECT brand_name, SUM(count) AS total_users_by_brand
+        FROM users_by_device
+        {where}
+        GROUP BY brand_name
+        ORDER BY total_users_by_brand DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_3_1(p, state=None):
+    """Total insurance premium count and amount over time (by year and quarter)."""
+    where, params = _where(p, state=state)
+    return f"""
+        SELECT year, quarter, SUM(count) AS total_premium_count, SUM(amount) AS total_premium_amount
+        FROM rollup_top_insurance
+        {where}
+        GROUP BY year, quarter
+        ORDER BY year ASC, quarter ASC""", params
+
+
+def analysis_3_2(p, year=None, quarter=None, top_n=5):
+    """Top states by total insurance premium amount for the latest (or given) year/quarter."""
+    period, params = _period(p, 'rollup_top_insurance', year, quarter)
+    return f"""
+        SELECT state, SUM(amount) AS total_premium_amount
+        FROM rollup_top_insurance
+        WHERE {period}
+        GROUP BY state
+        ORDER BY total_premium_amount DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_4_1(p, year=2022, top_n=10):
+    """States with the highest growth in transaction amount from the previous year to `year`."""
+    previous, year = int(year) - 1, int(year)
+    return f"""
+        SELECT y1.state, y1.total_amount_{previous}, y2.total_amount_{year},
+               (y2.total_amount_{year} - y1.total_amount_{previous}) AS amount_growth
+        FROM (SELECT state, SUM(transaction_amount) AS total_amount_{previous}
+              FROM rollup_map_transaction WHERE year = {p} GROUP BY state) AS y1
+        JOIN (SELECT state, SUM(transaction_amount) AS total_amount_{year}
+              FROM rollup_map_transaction WHERE year = {p} GROUP BY state) AS y2
+            ON y1.state = y2.state
+        ORDER BY amount_growth DESC
+        {_limit(top_n)}""", [previous, year]
+
+
+def analysis_4_2(p, year=None, quarter=None, top_n=None):
+    """Transaction volume and value per state for the latest (or given) year/quarter."""
+    period, params = _period(p, 'rollup_map_transaction', year, quarter)
+    return f"""
+        SELECT state, SUM(transaction_count) AS total_transaction_volume,
+               SUM(transaction_amount) AS total_transaction_value
+        FROM rollup_map_transaction
+        WHERE {period}
+        GROUP BY state
+        ORDER BY total_transaction_value DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_5_1(p, state=None, year=None, quarter=None, top_n=10):
+    """Top districts by registered users for the latest (or given) year/quarter."""
+    period, period_params = _period(p, 'top_user_districts_data', year, quarter)
+    state_filter, state_params = _conditions(p, state=state)
+    return f"""
+        SELECT district_name, SUM(registered_users) AS total_registered_users
+        FROM top_user_districts_data
+        WHERE {_and(period, state_filter)}
+        GROUP BY district_name
+        ORDER BY total_registered_users DESC
+        {_limit(top_n)}""", period_params + state_params
+
+
+def analysis_5_2(p, year=None, quarter=None, top_n=None):
+    """State-wise average app opens per registered user."""
+    where, params = _where(p, year=year, quarter=quarter)
+    return f"""
+        SELECT state, SUM(registered_users) AS total_registered_users, SUM(app_opens) AS total_app_opens,
+               SUM(app_opens) / NULLIF(SUM(registered_users), 0) AS avg_app_opens_per_user
+        FROM Aggregated_user
+        {where}
+        GROUP BY state
+        ORDER BY avg_app_opens_per_user DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_6_1(p, state=None, year=2022, quarter=3, top_n=10):
+    """Insurance transaction volume per district for a year and quarter."""
+    where, params = _where(p, state=state, year=year, quarter=quarter)
+    return f"""
+        SELECT district, SUM(premium_count) AS total_premium_count
+        FROM Map_insurance
+        {where}
+        GROUP BY district
+        ORDER BY total_premium_count DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_6_2(p, year=2022, top_n=None):
+    """States with growth in insurance premium amount from the previous year to `year`."""
+    previous, year = int(year) - 1, int(year)
+    return f"""
+        SELECT y1.state, y1.total_premium_{previous}, y2.total_premium_{year},
+               (y2.total_premium_{year} - y1.total_premium_{previous}) AS growth_amount,
+               CASE WHEN y1.total_premium_{previous} > 0
+                    THEN ((y2.total_premium_{year} - y1.total_premium_{previous}) / y1.total_premium_{previous}) * 100
+                    ELSE 0 END AS percentage_growth
+        FROM (SELECT state, SUM(amount) AS total_premium_{previous}
+              FROM rollup_top_insurance WHERE year = {p} GROUP BY state) AS y1
+        JOIN (SELECT state, SUM(amount) AS total_premium_{year}
+              FROM rollup_top_insurance WHERE year = {p} GROUP BY state) AS y2
+            ON y1.state = y2.state
+        WHERE (y2.total_premium_{year} - y1.total_premium_{previous}) > 0
+        ORDER BY percentage_growth DESC
+        {_limit(top_n)}""", [previous, year]
+
+
+def analysis_7_1(p, year=None, quarter=None, top_n=10):
+    """Top states by transaction value for the latest (or given) year/quarter."""
+    period, params = _period(p, 'rollup_top_transaction', year, quarter)
+    return f"""
+        SELECT state, SUM(amount) AS total_transaction_value
+        FROM rollup_top_transaction
+        WHERE {period}
+        GROUP BY state
+        ORDER BY total_transaction_value DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_7_2(p, state='maharashtra', year=2022, quarter=4, top_n=5):
+    """Top districts by transaction count for a state, year and quarter."""
+    # Reads top_insurance_districts_data, like Query 7.2 in the report
+    where, params = _where(p, state=state, year=year, quarter=quarter)
+    return f"""
+        SELECT district_name, SUM(count) AS total_transaction_count
+        FROM top_insurance_districts_data
+        {where}
+        GROUP BY district_name
+        ORDER BY total_transaction_count DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_8_1(p, state=None, year=None, quarter=None, top_n=10):
+    """Top pincodes by registered users for the latest (or given) year/quarter."""
+    period, period_params = _period(p, 'top_user_pincodes_data', year, quarter)
+    state_filter, state_params = _conditions(p, state=state)
+    return f"""
+        SELECT pincode, SUM(registered_users) AS total_registered_users
+        FROM top_user_pincodes_data
+        WHERE {_and(period, state_filter)}
+        GROUP BY pincode
+        ORDER BY total_registered_users DESC
+        {_limit(top_n)}""", period_params + state_params
+
+
+def analysis_8_2(p, year=None, quarter=None, top_n=10):
+    """States with the highest total registered users."""
+    where, params = _where(p, year=year, quarter=quarter)
+    return f"""
+        SELECT state, SUM(registered_users) AS total_registered_users
+        FROM rollup_top_user
+        {where}
+        GROUP BY state
+        ORDER BY total_registered_users DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_9_1(p, state=None, year=2021, quarter=2, top_n=5):
+    """Top districts by insurance premium count for a year and quarter."""
+    where, params = _where(p, state=state, year=year, quarter=quarter)
+    return f"""
+        SELECT district_name, SUM(count) AS premium_count
+        FROM top_insurance_districts_data
+        {where}
+        GROUP BY district_name
+        ORDER BY premium_count DESC
+        {_limit(top_n)}""", params
+
+
+def analysis_9_2(p, year=None, quarter=None, top_n=10):
+    """Top states by insurance premium amount for the latest (or given) year/quarter."""
+    period, params = _period(p, 'rollup_top_insurance', year, quarter)
+    return f"""
+        SELECT state, SUM(amount) AS total_insurance_premium_amount
+        FROM rollup_top_insurance
+        WHERE {period}
+        GROUP BY state
+        ORDER BY total_insurance_premium_amount DESC
+        {_limit(top_n)}""", params
+
+
+def _top(top_n, noun):
+    """Formats 'Top N <noun>' for titles, or just the noun when there is no limit."""
+    return f"Top {top_n} {noun}" if top_n else noun
+
+
+# analysis id -> (query builder, title for a set of bound parameters)
+ANALYSES = {
+    '1.1': (analysis_1_1, lambda a: f"Transaction Count and Amount per Payment Instrument "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'], 'All Years/Quarters')})"),
+    '1.2': (analysis_1_2, lambda a: f"Quarterly Transaction Trend ({_place(a['state'])}, {a['category']})"),
+    '1.3': (analysis_1_3, lambda a: f"{_top(a['top_n'], 'States')} by Total Transaction Amount "
+                                    f"({_when(a['year'], a['quarter'], 'All Years')})"),
+    '2.1': (analysis_2_1, lambda a: "Number of Registered Users and App Opens by Device Brand (All Years/Quarters)"),
+    '2.2': (analysis_2_2, lambda a: f"User Engagement: Registered Users by Device Brand "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'], 'All Years')})"),
+    '3.1': (analysis_3_1, lambda a: f"Total Insurance Premium Count and Amount Over Time ({_place(a['state'])})"),
+    '3.2': (analysis_3_2, lambda a: f"{_top(a['top_n'], 'States')} by Total Insurance Premium Amount "
+                                    f"({_when(a['year'], a['quarter'])})"),
+    '4.1': (analysis_4_1, lambda a: f"States with Highest Growth in Transaction Amount Year-over-Year "
+                                    f"({int(a['year']) - 1} vs {a['year']})"),
+    '4.2': (analysis_4_2, lambda a: f"Total Transaction Volume and Value per State ({_when(a['year'], a['quarter'])})"),
+    '5.1': (analysis_5_1, lambda a: f"{_top(a['top_n'], 'Districts')} by Total Registered Users "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'])})"),
+    '5.2': (analysis_5_2, lambda a: f"State-wise Average App Opens per Registered User "
+                                    f"({_when(a['year'], a['quarter'], 'All Years/Quarters')})"),
+    '6.1': (analysis_6_1, lambda a: f"{_top(a['top_n'], 'Districts')} by Insurance Transaction Volume "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'], 'All Years')})"),
+    '6.2': (analysis_6_2, lambda a: f"States with Significant Growth in Insurance Premium Amount "
+                                    f"({int(a['year']) - 1} vs {a['year']})"),
+    '7.1': (analysis_7_1, lambda a: f"{_top(a['top_n'], 'States')} by Total Transaction Value "
+                                    f"({_when(a['year'], a['quarter'])})"),
+    '7.2': (analysis_7_2, lambda a: f"{_top(a['top_n'], 'Districts')} by Total Transaction Count "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'], 'All Years')})"),
+    '8.1': (analysis_8_1, lambda a: f"{_top(a['top_n'], 'Pincodes')} by Registered Users "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'])})"),
+    '8.2': (analysis_8_2, lambda a: f"States with the Highest Total Registered Users "
+                                    f"({_when(a['year'], a['quarter'], 'All Years/Quarters')})"),
+    '9.1': (analysis_9_1, lambda a: f"{_top(a['top_n'], 'Districts')} by Insurance Premium Count "
+                                    f"({_place(a['state'])}, {_when(a['year'], a['quarter'], 'All Years')})"),
+    '9.2': (analysis_9_2, lambda a: f"{_top(a['top_n'], 'States')} by Total Insurance Premium Amount "
+                                    f"({_when(a['year'], a['quarter'])})"),
+}
+
+
+def analysis_parameters(analysis_id):
+    """Returns {parameter: default} for the filters an analysis accepts."""
+    signature = inspect.signature(ANALYSES[analysis_id][0])
+    return {name: parameter.default for name, parameter in list(signature.parameters.items())[1:]}
+
+
+def bind_parameters(analysis_id, **params):
+    """Fills in defaults and drops the filters the analysis does not use.
+
+    States are matched in lower case, as stored by the ingestion. The result is what the
+    query runs with, so it is also what results are cached under.
+    """
+    bound = analysis_parameters(analysis_id)
+    for name, value in params.items():
+        if name in bound:
+            bound[name] = value
+    if bound.get('state'):
+        bound['state'] = bound['state'].lower()
+    return bound
+
+
+def describe_analysis(analysis_id, **params):
+    """Returns the chart title of an analysis for the given filters."""
+    return ANALYSES[analysis_id][1](bind_parameters(analysis_id, **params))
+
+
+def build_analysis_query(analysis_id, dialect='mysql', **params):
+    """Returns (SQL, parameters) for an analysis in the placeholder style of the dialect."""
+    placeholder = '?' if dialect == 'sqlite' else '%s'
+    return ANALYSES[analysis_id][0](placeholder, **bind_parameters(analysis_id, **params))
+
+
+def data_version(connection):
+    """Returns a short hash identifying the current contents of the database.
+
+    It is built from the ingestion manifest (files, sizes and mtimes), so any ingestion that
+    changes data changes the version. Databases loaded without a manifest fall back to row counts.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*), SUM(size), MAX(mtime_ns) FROM {MANIFEST_TABLE}")
+        state = cursor.fetchone()
+        if not state or not state[0]:
+            counts = []
+            for table_name in TABLES:
+                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+                counts.append((table_name, cursor.fetchone()[0]))
+            state = tuple(counts)
+    finally:
+        cursor.close()
+    return hashlib.sha256(repr(state).encode('utf-8')).hexdigest()[:16]
+
+
+class ResultCache:
+    """LRU cache of analysis results with a time-to-live.
+
+    Holds at most max_entries results; each expires ttl seconds after it was stored. The data
+    version of a database is re-checked at most every version_ttl seconds. Cached DataFrames are
+    shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, max_entries=256, ttl=900, version_ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._versions = {}  # source -> (checked_at, version)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for key, or None if it is missing or expired."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or time.monotonic() - cached[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def cached_version(self, source):
+        """Returns the data version last read for a database if it was read within version_ttl, else None."""
+        with self._lock:
+            checked = self._versions.get(source)
+        if checked is not None and time.monotonic() - checked[0] <= self.version_ttl:
+            return checked[1]
+        return None
+
+    def version(self, source, connection):
+        """Returns the data version of a database, re-reading it at most every version_ttl seconds."""
+        version = self.cached_version(source)
+        if version is not None:
+            return version
+        version = data_version(connection)
+        with self._lock:
+            self._versions[source] = (time.monotonic(), version)
+        return version
+
+    def clear(self):
+        """Drops every cached result and data version."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self):
+        """Returns entry, hit and miss counts."""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_result_cache = ResultCache()
+
+
+def current_data_version(connection_factory=connect_mysql, pool=None, cache=None):
+    """Returns the data version run_analysis() caches results under, borrowing a connection only
+    when the cached version is older than version_ttl."""
+    cache = _result_cache if cache is None else cache
+    source = pool if pool is not None else connection_factory
+    version = cache.cached_version(source)
+    if version is None:
+        with borrow_connection(connection_factory, pool) as connection:
+            version = cache.version(source, connection)
+    return version
+
+
+def run_analysis(analysis_id, connection_factory=connect_mysql, pool=None, cache=None, **params):
+    """Runs an analysis with the given filters and returns its DataFrame.
+
+    Results come from the cache when the same analysis, filters and data version were seen
+    within the TTL. While the cached data version is fresh (see ResultCache.version_ttl) a hit
+    needs no connection; one is borrowed only to re-check the version or to run the query.
+    Pass a sql_runner.ConnectionPool as pool to reuse connections. Query errors are raised
+    (and not cached). Cache hits and misses are counted in pulse_metrics, and the latency of
+    misses is recorded per analysis.
+    """
+    cache = _result_cache if cache is None else cache
+    bound = bind_parameters(analysis_id, **params)
+    source = pool if pool is not None else connection_factory
+    params_key = (analysis_id, tuple(sorted(bound.items())))
+    version = cache.cached_version(source)
+    df_result = None if version is None else cache.get((*params_key, version))
+    if df_result is not None:
+        METRICS.inc('pulse_analysis_cache_total', result='hit')
+        return df_result
+    with borrow_connection(connection_factory, pool) as connection:
+        if version is None:
+            version = cache.version(source, connection)
+            df_result = cache.get((*params_key, version))
+        METRICS.inc('pulse_analysis_cache_total', result='miss' if df_result is None else 'hit')
+        if df_result is None:
+            query, query_params = build_analysis_query(analysis_id, get_dialect(connection), **bound)
+            cursor = connection.cursor()
+            try:
+                with METRICS.timer('pulse_analysis_seconds', analysis_id=analysis_id):
+                    cursor.execute(query, query_params)
+                    df_result = fetch_dataframe(cursor)
+            finally:
+                cursor.close()
+            cache.put((*params_key, version), df_result)
+    return df_result
+
+
+def clear_result_cache():
+    """Drops every cached analysis result."""
+    _result_cache.clear()
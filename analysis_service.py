@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import functools
+import gzip
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs
+
+from analysis_api import (ANALYSES, ResultCache, analysis_parameters, bind_parameters, data_version, describe_analysis,
+                          run_analysis)
+from growth_engine import GROWTH_ANALYSES, GrowthEngine
+from pulse_db import LOCAL_DB_PATH, connect_local_db
+from pulse_metrics import METRICS
+from sql_runner import ConnectionPool, borrow_connection, connect_mysql
+
+try:
+    import uvicorn
+except ImportError:  # Only needed to serve the app from the command line; any ASGI server works
+    uvicorn = None
+
+# --- Read-only HTTP/JSON API for the analyses ---
+# AnalysisService is a plain ASGI app (no framework needed) serving every analysis of
+# analysis_api, i.e. the 19 charts of app.py, as JSON:
+#   GET /analyses                  - index: id, title, accepted filters and URL of each analysis
+#   GET /analyses/<id>?year=2022   - one analysis; filters as in analysis_api, plus page/page_size
+#                                    for the district and pincode analyses
+#   GET /health                    - data version and when the responses were built
+#   GET /metrics                   - pulse_metrics in the Prometheus text format
+#
+# The responses for every analysis with its default filters (all pages) are built once per data
+# version: JSON-encoded, gzip-compressed and hashed into an ETag. The data version is re-checked
+# at most every version_ttl seconds on a background thread; when it changes, a new set is built
+# on that thread while the old one is still served, then swapped in. Requests with other filters
+# are answered on first use and kept in an LRU cache keyed by the data version. Filters an
+# analysis does not accept are rejected with 400. Clients that poll with
+# If-None-Match get 304 Not Modified until the data changes, so polling costs no query at all.
+#
+# Serve it with any ASGI server, e.g. python analysis_service.py --local-db phonepe_pulse_local.db
+
+# District- and pincode-level analyses, which are paginated
+PAGINATED_ANALYSES = ['5.1', '6.1', '7.2', '8.1', '9.1']
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+# Filters passed as numbers in the query string
+INTEGER_FILTERS = ('year', 'quarter', 'top_n')
+
+# body and gzip_body are encoded bytes (gzip_body is None when not worth compressing)
+PrecomputedResponse = namedtuple('PrecomputedResponse', ['status', 'body', 'gzip_body', 'etag'])
+
+# responses: {(analysis_id, page, page_size) or path: PrecomputedResponse} for the default filters
+ServiceSnapshot = namedtuple('ServiceSnapshot', ['version', 'responses', 'built_at'])
+
+
+class RequestError(Exception):
+    """A request the service cannot answer; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def build_response(document, status=200):
+    """Encodes a JSON document once: body, gzip body and a strong ETag over the body."""
+    body = json.dumps(document, separators=(',', ':'), default=str).encode('utf-8')
+    gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    return PrecomputedResponse(status, body, gzip_body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def _json_rows(df):
+    """Returns DataFrame rows as JSON-ready dicts, with NaN as None and NumPy scalars as Python ones."""
+    return [{column: None if isinstance(value, float) and math.isnan(value) else
+             value.item() if hasattr(value, 'item') else value
+             for column, value in zip(df.columns, row)} for row in df.itertuples(index=False, name=None)]
+
+
+def analysis_documents(analysis_id, df, params, version, page_size=None, page=None):
+    """Builds the JSON document(s) of an analysis result.
+
+    Returns {page: document}: all pages when page is None, else only the one requested. Analyses
+    that are not paginated have a single page 1 holding every row.
+    """
+    paginated = analysis_id in PAGINATED_ANALYSES
+    page_size = page_size or DEFAULT_PAGE_SIZE
+    total_rows = len(df)
+    pages = max(1, math.ceil(total_rows / page_size)) if paginated else 1
+    wanted = range(1, pages + 1) if page is None else [page]
+    documents = {}
+    for number in wanted:
+        if number > pages:
+            raise RequestError(404, f"Page {number} is out of range; analysis {analysis_id} has {pages} page(s)")
+        rows = df.iloc[(number - 1) * page_size:number * page_size] if paginated else df
+        document = {
+            'analysis_id': analysis_id,
+            'title': describe_analysis(analysis_id, **params),
+            'parameters': params,
+            'data_version': version,
+            'columns': [str(column) for column in df.columns],
+            'rows': _json_rows(rows),
+        }
+        if paginated:
+            document['pagination'] = {'page': number, 'page_size': page_size, 'total_rows': total_rows, 'pages': pages}
+        documents[number] = document
+    return documents
+
+
+def _etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value covers the ETag (weak comparison, as RFC 9110 asks)."""
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+def _accepts_gzip(accept_encoding):
+    for coding in accept_encoding.split(','):
+        name, _, parameters = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return parameters.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def _parse_query(query_string):
+    """Splits a query string into (filters, page or None, page_size or None)."""
+    values = {name: items[-1] for name, items in parse_qs(query_string, keep_blank_values=False).items()}
+    try:
+        page = int(values.pop('page')) if 'page' in values else None
+        page_size = int(values.pop('page_size')) if 'page_size' in values else None
+        filters = {name: int(value) if name in INTEGER_FILTERS else value for name, value in values.items()}
+    except ValueError as e:
+        raise RequestError(400, f"Invalid number in query string: {e}")
+    if page is not None and page < 1:
+        raise RequestError(400, "page starts at 1")
+    if page_size is not None and not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise RequestError(400, f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+    return filters, page, page_size
+
+
+class AnalysisService:
+    """ASGI app serving the analyses as precomputed JSON with ETags and gzip. See the module comment."""
+
+    def __init__(self, connection_factory=connect_mysql, pool=None, version_ttl=30, page_size=DEFAULT_PAGE_SIZE,
+                 cache_entries=1024):
+        self.connection_factory = connection_factory
+        self.pool = pool
+        self.version_ttl = version_ttl
+        self.page_size = page_size
+        self.growth_engine = GrowthEngine(connection_factory, pool=pool, version_ttl=version_ttl)
+        # Results and responses for non-default filters; keys include the data version, so no TTL is needed
+        self._results = ResultCache(max_entries=cache_entries, ttl=float('inf'), version_ttl=version_ttl)
+        self._responses = ResultCache(max_entries=cache_entries, ttl=float('inf'))
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    # --- Precomputed responses ---
+
+    def run(self, analysis_id, **params):
+        """Runs an analysis the way the dashboard does (growth panels for 4.1 and 6.2)."""
+        if analysis_id in GROWTH_ANALYSES:
+            return self.growth_engine.analysis(analysis_id, **params)
+        return run_analysis(analysis_id, self.connection_factory, pool=self.pool, cache=self._results, **params)
+
+    def _index_document(self, version):
+        return {
+            'data_version': version,
+            'analyses': [{'analysis_id': analysis_id,
+                          'title': describe_analysis(analysis_id),
+                          'filters': analysis_parameters(analysis_id),
+                          'paginated': analysis_id in PAGINATED_ANALYSES,
+                          'url': f'/analyses/{analysis_id}'} for analysis_id in ANALYSES],
+        }
+
+    def _build(self, version):
+        """Builds the responses of every analysis with its default filters."""
+        start = time.perf_counter()
+        # Start from the new data; the pages of one result are then built from a single query
+        self.growth_engine.clear()
+        self._results.clear()
+        responses = {'/analyses': build_response(self._index_document(version))}
+        for analysis_id in ANALYSES:
+            params = bind_parameters(analysis_id)
+            try:
+                documents = analysis_documents(analysis_id, self.run(analysis_id), params, version, self.page_size)
+            except Exception as e:
+                print(f"Could not precompute analysis {analysis_id}: {e}")
+                continue
+            for page, document in documents.items():
+                responses[(analysis_id, page, self.page_size)] = build_response(document)
+        built_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        responses['/health'] = build_response({'status': 'ok', 'data_version': version, 'built_at': built_at,
+                                               'analyses': len({key[0] for key in responses if isinstance(key, tuple)})})
+        print(f"Precomputed {len(responses)} responses for data version {version} "
+              f"in {time.perf_counter() - start:.2f}s")
+        return ServiceSnapshot(version, responses, built_at)
+
+    def snapshot(self):
+        """Returns the current responses. The first call builds them and waits.
+
+        Afterwards, once version_ttl has passed, the data version is re-checked on a background
+        thread, which also builds the responses of a new version; requests keep getting the
+        previous snapshot until it is swapped in.
+        """
+        current = self._snapshot
+        if current is not None and time.monotonic() - self._checked_at <= self.version_ttl:
+            return current
+        if not self._reload_lock.acquire(blocking=current is None):
+            return current  # A refresh is already running
+        if self._snapshot is not None and time.monotonic() - self._checked_at <= self.version_ttl:
+            self._reload_lock.release()  # Loaded or refreshed by another thread meanwhile
+        elif self._snapshot is None:
+            try:
+                self._refresh()
+            finally:
+                self._reload_lock.release()
+        else:
+            threading.Thread(target=self._background_refresh, name='analysis-service-refresh', daemon=True).start()
+        return self._snapshot
+
+    def _refresh(self):
+        """Checks the data version and swaps in a new snapshot if it changed. Needs _reload_lock."""
+        current = self._snapshot
+        with borrow_connection(self.connection_factory, self.pool) as connection:
+            version = data_version(connection)
+        if current is None or current.version != version:
+            current = self._build(version)
+        with self._lock:
+            self._snapshot = current
+            self._checked_at = time.monotonic()
+
+    def _background_refresh(self):
+        """Runs _refresh() on the refresh thread and releases _reload_lock afterwards."""
+        try:
+            self._refresh()
+        except Exception as e:  # Keep serving the old snapshot; the next check retries
+            print(f"Could not refresh the precomputed responses: {e}")
+            with self._lock:
+                self._checked_at = time.monotonic()
+        finally:
+            self._reload_lock.release()
+
+    def response(self, path, query_string=''):
+        """Returns the PrecomputedResponse for a GET of path?query_string. Raises RequestError."""
+        snapshot = self.snapshot()
+        path = path.rstrip('/') or '/'
+        if path in ('/', '/analyses', '/health'):
+            return snapshot.responses['/analyses' if path == '/' else path]
+        analysis_id = path.removeprefix('/analyses/')
+        if analysis_id == path or analysis_id not in ANALYSES:
+            raise RequestError(404, f"Unknown path '{path}'; see /analyses")
+
+        filters, page, page_size = _parse_query(query_string)
+        accepted = analysis_parameters(analysis_id)
+        unknown = sorted(set(filters) - set(accepted))
+        if unknown:
+            raise RequestError(400, f"Unknown filter(s) {', '.join(unknown)} for analysis {analysis_id}; "
+                                    f"it accepts: {', '.join(accepted) or 'none'}")
+        params = bind_parameters(analysis_id, **filters)
+        page_size = page_size or self.page_size
+        if analysis_id not in PAGINATED_ANALYSES:
+            page, page_size = 1, self.page_size
+        if params == bind_parameters(analysis_id):
+            cached = snapshot.responses.get((analysis_id, page or 1, page_size))
+            if cached is not None:
+                return cached
+        key = (snapshot.version, analysis_id, tuple(sorted(params.items())), page or 1, page_size)
+        cached = self._responses.get(key)
+        if cached is None:
+            documents = analysis_documents(analysis_id, self.run(analysis_id, **params), params, snapshot.version,
+                                           page_size, page or 1)
+            cached = build_response(documents[page or 1])
+            self._responses.put(key, cached)
+        return cached
+
+    # --- ASGI ---
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.to_thread(self.snapshot)
+                except Exception as e:  # Keep serving; requests retry and report the error
+                    print(f"Could not precompute responses at startup: {e}")
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.pool is not None:
+                    self.pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, send):
+        start = time.perf_counter()
+        if scope['method'] in ('GET', 'HEAD') and scope['path'].rstrip('/') == '/metrics':
+            body = METRICS.to_prometheus().encode('utf-8')
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/plain; version=0.0.4; charset=utf-8'),
+                (b'content-length', str(len(body)).encode('latin-1'))]})
+            await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+            return
+        status = await self._respond(scope, send)
+        endpoint = scope['path'].rstrip('/').removeprefix('/analyses/') if status < 400 else 'other'
+        METRICS.observe('pulse_http_request_seconds', time.perf_counter() - start, endpoint=endpoint or '/',
+                        status=status)
+
+    async def _respond(self, scope, send):
+        """Sends the response to an API request and returns its status."""
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        if scope['method'] not in ('GET', 'HEAD'):
+            response = build_response({'error': "This API is read-only; use GET"}, 405)
+        else:
+            try:
+                response = await asyncio.to_thread(self.response, scope['path'],
+                                                   scope.get('query_string', b'').decode('latin-1'))
+            except RequestError as e:
+                response = build_response({'error': str(e)}, e.status)
+            except Exception as e:
+                response = build_response({'error': f"Could not answer the request: {e}"}, 503)
+
+        response_headers = [(b'content-type', b'application/json'), (b'vary', b'Accept-Encoding')]
+        status, body = response.status, response.body
+        if status == 200:
+            response_headers += [(b'etag', response.etag.encode('latin-1')), (b'cache-control', b'no-cache')]
+            if _etag_matches(headers.get('if-none-match', ''), response.etag):
+                status, body = 304, b''
+        if status != 304 and response.gzip_body is not None and _accepts_gzip(headers.get('accept-encoding', '')):
+            body = response.gzip_body
+            response_headers.append((b'content-encoding', b'gzip'))
+        if status != 304:
+            response_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+        return status
+
+
+def create_app(db_path=LOCAL_DB_PATH, mysql=False, pool_size=4, version_ttl=30, page_size=DEFAULT_PAGE_SIZE):
+    """Builds an AnalysisService on the local SQLite database (or MySQL) with a connection pool."""
+    connection_factory = connect_mysql if mysql else functools.partial(connect_local_db, db_path)
+    pool = ConnectionPool(connection_factory, size=pool_size)
+    return AnalysisService(connection_factory, pool=pool, version_ttl=version_ttl, page_size=page_size)
+
+
+def main(argv=None):
+    """Command-line entry point: python analysis_service.py [--local-db PATH | --mysql] [--host H] [--port P]"""
+    parser = argparse.ArgumentParser(description="Serve the PhonePe Pulse analyses as a read-only JSON API.")
+    parser.add_argument('--local-db', metavar='PATH', default=LOCAL_DB_PATH, help="Local SQLite database to serve")
+    parser.add_argument('--mysql', action='store_true', help="Serve from MySQL instead of the local database")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--version-ttl', type=int, default=30, help="Seconds between checks for new data")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    if uvicorn is None:
+        print("uvicorn is required to serve the API (pip install uvicorn), or pass create_app() to any ASGI server.")
+        return
+    app = create_app(args.local_db, args.mysql, version_ttl=args.version_ttl, page_size=args.page_size)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import csv
+import os
+import tempfile
+from collections import Counter, deque
+
+from pulse_schema import build_merge_query, build_upsert_query, get_dialect, get_table
+
+# --- Batched bulk-load writer ---
+# Rows are buffered per table and written in batches instead of one upsert round trip per row.
+# Write methods:
+#   'executemany' - cursor.executemany() of the single-row upsert
+#   'multirow'    - one INSERT ... VALUES (...), (...), ... upsert per batch
+#   'load_data'   - LOAD DATA LOCAL INFILE from a temp CSV (MySQL only, needs allow_local_infile=True)
+# With staging=True batches go into a temporary staging table with plain INSERTs (or LOAD DATA)
+# and are merged into the target table with one INSERT ... SELECT upsert before every commit.
+# A commit is issued every `commit_every` rows so no transaction grows unbounded.
+# Rows can be tagged with the source they came from; the sources of every batch that failed
+# (or failed to merge) are collected in `failed_sources`.
+
+WRITE_METHODS = ('executemany', 'multirow', 'load_data')
+
+
+def _staging_table_name(table_name):
+    """Returns the name of the staging table used for a target table."""
+    return f"staging_{table_name.lower()}"
+
+
+def _write_csv_batch(rows):
+    """Writes rows to a temp CSV in the format LOAD DATA expects and returns its path."""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8', delete=False) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for row in rows:
+            # \N is MySQL's NULL marker; backslashes in values must be escaped
+            writer.writerow(['\\N' if v is None else str(v).replace('\\', '\\\\') for v in row])
+        return f.name
+
+
+class BulkWriter:
+    """Buffers rows per table and writes them to the database in batches.
+
+    Use as a context manager, or call close() to flush, merge and commit what is left.
+    Successfully written and failed row counts are kept in `loaded` and `errors`, and the
+    sources passed to add_rows() whose rows were (partly) not written in `failed_sources`.
+    """
+
+    def __init__(self, connection, method='executemany', staging=False, batch_size=5000, commit_every=50000):
+        if method not in WRITE_METHODS:
+            raise ValueError(f"Unknown write method '{method}'. Expected one of {WRITE_METHODS}")
+        self.connection = connection
+        self.dialect = get_dialect(connection)
+        if method == 'load_data' and self.dialect != 'mysql':
+            raise ValueError("The 'load_data' write method is only available for MySQL")
+        self.method = method
+        self.staging = staging
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.cursor = connection.cursor()
+        self.loaded = Counter()
+        self.errors = Counter()
+        self.failed_sources = set()
+        self._buffers = {}
+        self._buffer_sources = {}  # table -> deque of [source, row count] runs, in buffer order
+        self._staged = Counter()  # rows in each staging table that are not merged yet
+        self._staged_sources = {}  # table -> sources of the rows in its staging table
+        self._staging_tables = set()
+        self._uncommitted = 0
+        self._queries = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_rows(self, table_name, rows, source=None):
+        """Queues rows for a table, writing full batches as they fill up.
+
+        source (e.g. the file the rows came from) is added to failed_sources if any of them fail.
+        """
+        buffer = self._buffers.setdefault(table_name, [])
+        buffered = len(buffer)
+        buffer.extend(rows)
+        self._buffer_sources.setdefault(table_name, deque()).append([source, len(buffer) - buffered])
+        while len(buffer) >= self.batch_size:
+            batch = buffer[:self.batch_size]
+            del buffer[:self.batch_size]
+            self._write_batch(table_name, batch)
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def flush(self):
+        """Writes every partially filled batch."""
+        for table_name, buffer in self._buffers.items():
+            if buffer:
+                self._write_batch(table_name, buffer)
+                self._buffers[table_name] = []
+
+    def commit(self):
+        """Flushes buffers, merges staging tables and commits the transaction."""
+        self.flush()
+        if self.staging:
+            self._merge_staging_tables()
+        self.connection.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        """Commits all pending rows and drops the staging tables."""
+        try:
+            self.commit()
+            for staging_table in self._staging_tables:
+                self.cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            self._staging_tables.clear()
+        finally:
+            self.cursor.close()
+
+    # --- Internal helpers ---
+
+    def _query(self, key, build):
+        """Returns a cached SQL statement, building it on first use."""
+        if key not in self._queries:
+            self._queries[key] = build()
+        return self._queries[key]
+
+    def _take_sources(self, table_name, row_count):
+        """Pops the source runs covering the next row_count buffered rows and returns their sources."""
+        runs = self._buffer_sources[table_name]
+        sources = set()
+        while row_count and runs:
+            run = runs[0]
+            taken = min(row_count, run[1])
+            if taken:
+                sources.add(run[0])
+            run[1] -= taken
+            row_count -= taken
+            if not run[1]:
+                runs.popleft()
+        sources.discard(None)
+        return sources
+
+    def _write_batch(self, table_name, batch):
+        """Writes one batch to the target table, or to its staging table in staging mode."""
+        sources = self._take_sources(table_name, len(batch))
+        target = self._ensure_staging_table(table_name) if self.staging else table_name
+        try:
+            if self.method == 'load_data':
+                self._load_data(target, table_name, batch)
+            elif self.staging:
+                self._insert_plain(target, table_name, batch)
+            elif self.method == 'multirow':
+                query = self._query(('multirow', table_name, len(batch)),
+                                    lambda: build_upsert_query(table_name, self.dialect, row_count=len(batch)))
+                self.cursor.execute(query, [value for row in batch for value in row])
+            else:
+                query = self._query(('upsert', table_name),
+                                    lambda: build_upsert_query(table_name, self.dialect))
+                self.cursor.executemany(query, batch)
+        except Exception as e:
+            print(f"Error writing a batch of {len(batch)} rows to {target}: {e}")
+            self.errors[table_name] += len(batch)
+            self.failed_sources |= sources
+            return
+        if self.staging:
+            self._staged[table_name] += len(batch)
+            self._staged_sources.setdefault(table_name, set()).update(sources)
+        else:
+            self.loaded[table_name] += len(batch)
+        self._uncommitted += len(batch)
+
+    def _insert_plain(self, target, table_name, batch):
+        """Inserts a batch into a staging table without conflict handling."""
+        columns = get_table(table_name)['columns']
+        placeholder = '%s' if self.dialect == 'mysql' else '?'
+        if self.method == 'multirow':
+            row_placeholders = f"({', '.join([placeholder] * len(columns))})"
+            query = f"INSERT INTO {target} ({', '.join(columns)}) VALUES {', '.join([row_placeholders] * len(batch))}"
+            self.cursor.execute(query, [value for row in batch for value in row])
+        else:
+            query = self._query(('insert', target), lambda: (
+                f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({', '.join([placeholder] * len(columns))})"))
+            self.cursor.executemany(query, batch)
+
+    def _load_data(self, target, table_name, batch):
+        """Streams a batch through a temp CSV with LOAD DATA LOCAL INFILE."""
+        csv_path = _write_csv_batch(batch)
+        # REPLACE gives the load upsert semantics when it writes straight into the target table
+        duplicate_handling = '' if self.staging else 'REPLACE '
+        try:
+            self.cursor.execute(
+                f"LOAD DATA LOCAL INFILE '{csv_path.replace(os.sep, '/')}' {duplicate_handling}INTO TABLE {target} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' LINES TERMINATED BY '\\n' "
+                f"({', '.join(get_table(table_name)['columns'])})"
+            )
+        finally:
+            os.remove(csv_path)
+
+    def _ensure_staging_table(self, table_name):
+        """Creates the temporary staging table for a target table on first use."""
+        staging_table = _staging_table_name(table_name)
+        if staging_table not in self._staging_tables:
+            if self.dialect == 'sqlite':
+                self.cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} AS "
+                                    f"SELECT {', '.join(get_table(table_name)['columns'])} FROM {table_name} WHERE 0")
+            else:
+                self.cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging_table} "
+                                    f"SELECT {', '.join(get_table(table_name)['columns'])} FROM {table_name} LIMIT 0")
+            self._staging_tables.add(staging_table)
+        return staging_table
+
+    def _merge_staging_tables(self):
+        """Upserts the staged rows into their target tables and empties the staging tables."""
+        for table_name, staged in list(self._staged.items()):
+            if not staged:
+                continue
+            staging_table = _staging_table_name(table_name)
+            try:
+                self.cursor.execute(build_merge_query(table_name, staging_table, self.dialect))
+                self.loaded[table_name] += staged
+            except Exception as e:
+                print(f"Error merging {staged} staged rows into {table_name}: {e}")
+                self.errors[table_name] += staged
+                self.failed_sources |= self._staged_sources.get(table_name, set())
+            self.cursor.execute(f"DELETE FROM {staging_table}")
+            self._staged[table_name] = 0
+            self._staged_sources[table_name] = set()
@@ -0,0 +1,59 @@
+import functools
+
+from analysis_api import run_analysis
+from excel_cache import load_cached_excel
+from growth_engine import GROWTH_ANALYSES, GrowthEngine
+from pulse_db import connect_local_db
+from sql_runner import ConnectionPool, connect_mysql
+
+# --- Chart data of the dashboard ---
+# load_chart_frame() returns the DataFrame a chart of app.py draws: the precomputed .xlsx
+# snapshot, or the live analysis (analysis_api, or the growth engine for the year-over-year
+# charts). The figure_cache pre-render workers load their charts' data themselves through
+# prerender_chart_frame(), with their own connections, so the frames (and so the figure keys)
+# are the same as the app's.
+
+# Precomputed results of each analysis, one .xlsx per chart
+SNAPSHOT_PATHS = {analysis_id: f'{analysis_id}.xlsx' for analysis_id in
+                  ('1.1', '1.2', '1.3', '2.1', '2.2', '3.1', '3.2', '4.1', '4.2', '5.1', '5.2', '6.1', '6.2',
+                   '7.1', '7.2', '8.1', '8.2', '9.1', '9.2')}
+
+
+def connection_factory(backend, db_path=None):
+    """Returns the connection factory of a dashboard backend ("MySQL" or "Local SQLite")."""
+    if backend == "Local SQLite":
+        return functools.partial(connect_local_db, db_path)
+    return connect_mysql
+
+
+def load_snapshot(analysis_id):
+    """Returns the precomputed result of an analysis."""
+    df = load_cached_excel(SNAPSHOT_PATHS[analysis_id])
+    if analysis_id == '6.1':
+        # The 6.1 snapshot holds every district; the chart shows the top 10
+        df = df.nlargest(10, 'total_premium_count')
+    return df
+
+
+def load_chart_frame(analysis_id, filters, pool=None, growth_engine=None):
+    """Returns a chart's data: the snapshot without a pool, else the live analysis for the filters."""
+    if pool is None:
+        return load_snapshot(analysis_id)
+    if analysis_id in GROWTH_ANALYSES:
+        # Year-over-year charts are answered from the in-memory growth panels instead of a SQL join
+        return growth_engine.analysis(analysis_id, **filters)
+    return run_analysis(analysis_id, pool=pool, **filters)
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_source(backend, db_path):
+    """The connection pool and growth engine of a pre-render worker process, one per database."""
+    pool = ConnectionPool(connection_factory(backend, db_path), size=1)
+    return pool, GrowthEngine(pool=pool)
+
+
+def prerender_chart_frame(analysis_id, filters, backend=None, db_path=None):
+    """Pre-render worker loader: load_chart_frame() for a backend, or the snapshot if backend is None."""
+    if backend is None:
+        return load_snapshot(analysis_id)
+    return load_chart_frame(analysis_id, filters, *_worker_source(backend, db_path))
@@ -0,0 +1,342 @@
+import matplotlib.pyplot as plt
+
+# --- Plotting Functions ---
+# Each function takes the DataFrame of one analysis (an .xlsx snapshot or a live analysis_api
+# result) and returns a matplotlib figure. They live outside app.py so figures can also be
+# rendered in worker processes that do not run the Streamlit script (see figure_cache.py).
+
+def plot_1_1(df):
+    fig, axes = plt.subplots(1, 2, figsize=(18, 6))
+
+    # Plot 'total_transactions' by 'transaction_type'
+    df_transactions = df.sort_values(by='total_transactions', ascending=False)
+    axes[0].bar(df_transactions['transaction_type'], df_transactions['total_transactions'])
+    axes[0].set_title('Total Transactions by Payment Instrument')
+    axes[0].set_xlabel('Payment Instrument')
+    axes[0].set_ylabel('Total Transactions')
+    axes[0].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[0].set_xticklabels(df_transactions['transaction_type'], rotation=90, ha='right')
+
+    # Plot 'total_transaction_amount' by 'transaction_type'
+    df_amount = df.sort_values(by='total_transaction_amount', ascending=False)
+    axes[1].bar(df_amount['transaction_type'], df_amount['total_transaction_amount'])
+    axes[1].set_title('Total Transaction Amount by Payment Instrument')
+    axes[1].set_xlabel('Payment Instrument')
+    axes[1].set_ylabel('Total Transaction Amount')
+    axes[1].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[1].set_xticklabels(df_amount['transaction_type'], rotation=90, ha='right')
+
+    plt.tight_layout()
+    return fig
+
+def plot_quarterly_trend(df):
+    # Query 1.2 returns one row per quarter (the 1.2.xlsx snapshot holds per-instrument totals instead)
+    df = df.assign(time_period=df['year'].astype(str) + ' Q' + df['quarter'].astype(str))
+    fig, axes = plt.subplots(1, 2, figsize=(18, 6))
+
+    axes[0].plot(df['time_period'], df['quarterly_transactions'], marker='o')
+    axes[0].set_title('Quarterly Transactions')
+    axes[0].set_xlabel('Year and Quarter')
+    axes[0].set_ylabel('Total Transactions')
+    axes[0].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[0].set_xticklabels(df['time_period'], rotation=90, ha='right')
+
+    axes[1].plot(df['time_period'], df['quarterly_amount'], marker='o', color='orange')
+    axes[1].set_title('Quarterly Transaction Amount')
+    axes[1].set_xlabel('Year and Quarter')
+    axes[1].set_ylabel('Total Transaction Amount')
+    axes[1].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[1].set_xticklabels(df['time_period'], rotation=90, ha='right')
+
+    plt.tight_layout()
+    return fig
+
+def plot_1_2(df):
+    if 'transaction_type' not in df.columns:
+        return plot_quarterly_trend(df)
+    fig, axes = plt.subplots(1, 2, figsize=(18, 6))
+
+    # Plot 'total_transactions' by 'transaction_type'
+    df_transactions = df.sort_values(by='total_transactions', ascending=False)
+    axes[0].bar(df_transactions['transaction_type'], df_transactions['total_transactions'])
+    axes[0].set_title('Total Transactions by Payment Instrument')
+    axes[0].set_xlabel('Payment Instrument')
+    axes[0].set_ylabel('Total Transactions')
+    axes[0].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[0].set_xticklabels(df_transactions['transaction_type'], rotation=90, ha='right')
+
+    # Plot 'total_transaction_amount' by 'transaction_type'
+    df_amount = df.sort_values(by='total_transaction_amount', ascending=False)
+    axes[1].bar(df_amount['transaction_type'], df_amount['total_transaction_amount'])
+    axes[1].set_title('Total Transaction Amount by Payment Instrument')
+    axes[1].set_xlabel('Payment Instrument')
+    axes[1].set_ylabel('Total Transaction Amount')
+    axes[1].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[1].set_xticklabels(df_amount['transaction_type'], rotation=90, ha='right')
+
+    plt.tight_layout()
+    return fig
+
+def plot_1_3(df):
+    df_sorted = df.sort_values(by='total_transaction_amount', ascending=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(df_sorted['state'], df_sorted['total_transaction_amount'])
+    ax.set_title('Top States by Total Transaction Amount')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Total Transaction Amount')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_2_1(df):
+    
+    df_agg = df.groupby('brand_name').agg({
+        'total_registered_users': 'sum',
+        'total_app_opens': 'sum'
+    }).reset_index()
+
+    df_agg = df_agg.sort_values(by='total_registered_users', ascending=False)
+
+    fig, ax = plt.subplots(figsize=(12, 7))
+
+    bar_width = 0.35
+    index = range(len(df_agg['brand_name']))
+
+    bar1 = ax.bar([i - bar_width/2 for i in index], df_agg['total_registered_users'], bar_width, label='Total Registered Users', color='skyblue')
+    bar2 = ax.bar([i + bar_width/2 for i in index], df_agg['total_app_opens'], bar_width, label='Total App Opens', color='lightcoral')
+
+    ax.set_title('Number of Registered Users and App Opens by Device Brand')
+    ax.set_xlabel('Device Brand')
+    ax.set_ylabel('Count')
+    ax.set_xticks(index)
+    ax.set_xticklabels(df_agg['brand_name'], rotation=90, ha='right') # Updated for consistency
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.legend()
+    plt.tight_layout()
+    return fig
+
+def plot_2_2(df):
+    # Sort the data by 'total_users_by_brand' in descending order
+    df_sorted = df.sort_values(by='total_users_by_brand', ascending=False)
+
+    # Create the bar chart
+    fig, ax = plt.subplots(figsize=(10, 6)) # Changed to fig, ax
+    ax.bar(df_sorted['brand_name'], df_sorted['total_users_by_brand']) # Changed to ax.bar
+    ax.set_title('Total Registered Users by Device Brand') # Changed to ax.set_title
+    ax.set_xlabel('Device Brand') # Changed to ax.set_xlabel
+    ax.set_ylabel('Total Registered Users') # Changed to ax.set_ylabel
+    ax.set_xticklabels(df_sorted['brand_name'], rotation=90, ha='right') # Changed to set_xticklabels and rotation=90
+    ax.ticklabel_format(style='plain', axis='y') # Changed to ax.ticklabel_format
+    plt.tight_layout()
+    # plt.savefig('user_engagement_by_brand.png') # Removed savefig
+    # plt.show() # Removed show
+    return fig # Return fig for Streamlit
+
+def plot_3_1(df):
+    # Combine 'year' and 'quarter' for the x-axis (assign a copy; cached frames are shared)
+    df = df.assign(time_period=df['year'].astype(str) + ' Q' + df['quarter'].astype(str))
+
+    # Create subplots for the two charts
+    fig, axes = plt.subplots(2, 1, figsize=(12, 10))
+
+    # Plot 'total_premium_count' over time
+    axes[0].plot(df['time_period'], df['total_premium_count'], marker='o')
+    axes[0].set_title('Total Insurance Premium Count Over Time')
+    axes[0].set_xlabel('Year and Quarter')
+    axes[0].set_ylabel('Total Premium Count')
+    axes[0].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[0].set_xticklabels(df['time_period'], rotation=90, ha='right')
+
+    # Plot 'total_premium_amount' over time
+    axes[1].plot(df['time_period'], df['total_premium_amount'], marker='o', color='orange')
+    axes[1].set_title('Total Insurance Premium Amount Over Time')
+    axes[1].set_xlabel('Year and Quarter')
+    axes[1].set_ylabel('Total Premium Amount')
+    axes[1].ticklabel_format(style='plain', axis='y') # Disable scientific notation
+    axes[1].set_xticklabels(df['time_period'], rotation=90, ha='right')
+
+    plt.tight_layout()
+    # plt.show() # Removed show
+    return fig # Return fig for Streamlit
+
+def plot_3_2(df):
+    df_sorted = df.sort_values(by='total_premium_amount', ascending=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(df_sorted['state'], df_sorted['total_premium_amount'])
+    ax.set_title('Top States by Total Insurance Premium Amount')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Total Insurance Premium Amount')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_4_1(df):
+    # Sort the data by 'amount_growth' in descending order
+    df_sorted = df.sort_values(by='amount_growth', ascending=False)
+
+    # Create the bar chart
+    fig, ax = plt.subplots(figsize=(12, 7)) # Changed to fig, ax
+    ax.bar(df_sorted['state'], df_sorted['amount_growth']) # Changed to ax.bar
+    ax.set_title('States with the Highest Growth in Transaction Amount Year-over-Year') # Changed to ax.set_title
+    ax.set_xlabel('State') # Changed to ax.set_xlabel
+    ax.set_ylabel('Amount Growth') # Changed to ax.set_ylabel
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Changed to set_xticklabels and rotation=90
+    ax.ticklabel_format(style='plain', axis='y') # Changed to ax.ticklabel_format
+    plt.tight_layout()
+    # plt.show() # Removed show
+    return fig # Return fig for Streamlit
+
+def plot_4_2(df):
+    fig, axes = plt.subplots(1, 2, figsize=(20, 8))
+
+    df_volume = df.sort_values(by='total_transaction_volume', ascending=False)
+    axes[0].bar(df_volume['state'], df_volume['total_transaction_volume'])
+    axes[0].set_title('Total Transaction Volume per State')
+    axes[0].set_xlabel('State')
+    axes[0].set_ylabel('Total Transaction Volume')
+    axes[0].ticklabel_format(style='plain', axis='y')
+    axes[0].set_xticklabels(df_volume['state'], rotation=90, ha='right') # Updated for consistency
+
+    df_value = df.sort_values(by='total_transaction_value', ascending=False)
+    axes[1].bar(df_value['state'], df_value['total_transaction_value'])
+    axes[1].set_title('Total Transaction Value per State')
+    axes[1].set_xlabel('State')
+    axes[1].set_ylabel('Total Transaction Value')
+    axes[1].ticklabel_format(style='plain', axis='y')
+    axes[1].set_xticklabels(df_value['state'], rotation=90, ha='right') # Updated for consistency
+
+    plt.tight_layout()
+    return fig
+
+def plot_5_1(df):
+    df_sorted = df.sort_values(by='total_registered_users', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['district_name'], df_sorted['total_registered_users'])
+    ax.set_title('Top Districts by Total Registered Users')
+    ax.set_xlabel('District Name')
+    ax.set_ylabel('Total Registered Users')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['district_name'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_5_2(df):
+    df_sorted = df.sort_values(by='avg_app_opens_per_user', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['state'], df_sorted['avg_app_opens_per_user'])
+    ax.set_title('State-wise Average App Opens per Registered User')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Average App Opens Per User')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_6_1(df):
+    df_sorted = df.sort_values(by='total_premium_count', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['district'], df_sorted['total_premium_count'])
+    ax.set_title('Top Districts by Insurance Transaction Volume')
+    ax.set_xlabel('District')
+    ax.set_ylabel('Total Premium Count')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['district'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_6_2(df):
+    fig, axes = plt.subplots(1, 2, figsize=(20, 8))
+
+    df_growth_amount = df.sort_values(by='growth_amount', ascending=False)
+    axes[0].bar(df_growth_amount['state'], df_growth_amount['growth_amount'])
+    axes[0].set_title('States with Significant Growth in Insurance Premium Amount - Absolute Growth')
+    axes[0].set_xlabel('State')
+    axes[0].set_ylabel('Growth Amount')
+    axes[0].ticklabel_format(style='plain', axis='y')
+    axes[0].set_xticklabels(df_growth_amount['state'], rotation=90, ha='right')
+
+    df_percentage_growth = df.sort_values(by='percentage_growth', ascending=False)
+    axes[1].bar(df_percentage_growth['state'], df_percentage_growth['percentage_growth'], color='orange')
+    axes[1].set_title('States with Significant Growth in Insurance Premium Amount - Percentage Growth')
+    axes[1].set_xlabel('State')
+    axes[1].set_ylabel('Percentage Growth (%)')
+    axes[1].ticklabel_format(style='plain', axis='y')
+    axes[1].set_xticklabels(df_percentage_growth['state'], rotation=90, ha='right')
+
+    plt.tight_layout()
+    return fig
+
+def plot_7_1(df):
+    df_sorted = df.sort_values(by='total_transaction_value', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['state'], df_sorted['total_transaction_value'])
+    ax.set_title('Top States by Total Transaction Value')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Total Transaction Value')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_7_2(df):
+    df_sorted = df.sort_values(by='total_transaction_count', ascending=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(df_sorted['district_name'], df_sorted['total_transaction_count'])
+    ax.set_title("Top Districts by Total Transaction Count")
+    ax.set_xlabel("District Name")
+    ax.set_ylabel("Total Transaction Count")
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['district_name'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_8_1(df):
+    df = df.assign(pincode=df['pincode'].astype(str))
+    df_sorted = df.sort_values(by='total_registered_users', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['pincode'], df_sorted['total_registered_users'])
+    ax.set_title('Top Pincodes by Registered Users')
+    ax.set_xlabel('Pincode')
+    ax.set_ylabel('Total Registered Users')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['pincode'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_8_2(df):
+    df_sorted = df.sort_values(by='total_registered_users', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['state'], df_sorted['total_registered_users'])
+    ax.set_title('States with the Highest Total Registered Users')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Total Registered Users')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_9_1(df):
+    df_sorted = df.sort_values(by='premium_count', ascending=False)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(df_sorted['district_name'], df_sorted['premium_count'])
+    ax.set_title('Top Districts by Insurance Premium Count')
+    ax.set_xlabel('District Name')
+    ax.set_ylabel('Premium Count')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['district_name'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
+
+def plot_9_2(df):
+    df_sorted = df.sort_values(by='total_insurance_premium_amount', ascending=False)
+    fig, ax = plt.subplots(figsize=(12, 7))
+    ax.bar(df_sorted['state'], df_sorted['total_insurance_premium_amount'])
+    ax.set_title('Top States by Total Insurance Premium Amount')
+    ax.set_xlabel('State')
+    ax.set_ylabel('Total Insurance Premium Amount')
+    ax.ticklabel_format(style='plain', axis='y')
+    ax.set_xticklabels(df_sorted['state'], rotation=90, ha='right') # Updated for consistency
+    plt.tight_layout()
+    return fig
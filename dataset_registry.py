@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import namedtuple
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from analysis_api import data_version
+from pulse_schema import COLUMN_TYPES, TABLES
+from sql_runner import FETCH_CHUNK_SIZE, borrow_connection, connect_mysql, iter_query_chunks
+
+# --- Shared, compact in-memory copy of the Pulse tables ---
+# One DatasetRegistry per database holds the fact tables it is given (all of them by default)
+# as DataFrames with categorical strings (state, district, brand_name, pincode, ...) and the
+# smallest integer/float dtypes that hold the values exactly. All sessions of the dashboard read
+# the same frames, so memory stays flat as viewers are added.
+#
+# The frames of one load form an immutable DatasetSnapshot. When the data version (see
+# analysis_api.data_version) changes, a new snapshot is built in full and then swapped in, so
+# readers always see one consistent version and never a half-loaded one.
+#
+# Sharing relies on pandas copy-on-write (the default from pandas 3.0, switched on by the first
+# DatasetRegistry for older versions): frame() hands out shallow copies, so a caller that modifies
+# one gets a private copy of the data and the shared frame is untouched.
+
+# frames: {table: DataFrame}; memory: {table: {'rows', 'raw_bytes', 'bytes'}}
+DatasetSnapshot = namedtuple('DatasetSnapshot', ['version', 'frames', 'memory', 'loaded_at'])
+
+
+def _is_string_column(column):
+    return COLUMN_TYPES.get(column, '').startswith(('VARCHAR', 'CHAR'))
+
+
+def _compact_chunk(chunk):
+    """Builds a DataFrame from a {column: values} chunk with string columns as categoricals."""
+    df = pd.DataFrame(chunk)
+    raw_bytes = int(df.memory_usage(deep=True, index=False).sum())
+    for column in df.columns:
+        if _is_string_column(column) or df[column].dtype == object:
+            df[column] = df[column].astype('category')
+    return df, raw_bytes
+
+
+def _downcast(series):
+    """Returns the series in the smallest numeric dtype that holds every value exactly."""
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        narrow = series.astype('float32')
+        # float32 keeps ~7 significant digits; amounts usually need float64
+        if narrow.astype('float64').equals(series):
+            return narrow
+    return series
+
+
+def _concat_compact(frames, columns):
+    """Concatenates compacted chunks, merging the categories of categorical columns."""
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype='category' if _is_string_column(column) else
+                                               'float64' if COLUMN_TYPES.get(column) == 'DOUBLE' else 'int64')
+                             for column in columns})
+    data = {}
+    for column in columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            data[column] = pd.Series(union_categoricals(parts), name=column)
+        else:
+            data[column] = _downcast(pd.concat(parts, ignore_index=True))
+    return pd.DataFrame(data)
+
+
+def load_compact_table(connection, table_name, chunk_size=FETCH_CHUNK_SIZE):
+    """Reads a table in chunks into a compact DataFrame. Returns (DataFrame, memory entry)."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        columns = [column[0] for column in cursor.description]
+        frames, raw_bytes = [], 0
+        for chunk in iter_query_chunks(cursor, chunk_size):
+            frame, chunk_bytes = _compact_chunk(chunk)
+            frames.append(frame)
+            raw_bytes += chunk_bytes
+    finally:
+        cursor.close()
+    df = _concat_compact(frames, columns)
+    return df, {'rows': len(df), 'raw_bytes': raw_bytes, 'bytes': int(df.memory_usage(deep=True, index=False).sum())}
+
+
+class DatasetRegistry:
+    """Process-wide, read-only copy of the Pulse tables that reloads when the data changes.
+
+    Call snapshot() to get the current DatasetSnapshot; the data version is re-checked at most
+    every version_ttl seconds. Only one thread reloads at a time; the others keep reading the
+    previous snapshot until the new one is swapped in.
+    """
+
+    def __init__(self, connection_factory=connect_mysql, pool=None, tables=None, version_ttl=30,
+                 chunk_size=FETCH_CHUNK_SIZE):
+        self.connection_factory = connection_factory
+        self.pool = pool
+        self.tables = list(tables or TABLES)
+        self.version_ttl = version_ttl
+        self.chunk_size = chunk_size
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        if int(pd.__version__.split('.')[0]) < 3:
+            pd.set_option('mode.copy_on_write', True)
+
+    def snapshot(self):
+        """Returns the current snapshot, loading or reloading it first if the data version changed."""
+        current = self._snapshot
+        if current is not None and time.monotonic() - self._checked_at <= self.version_ttl:
+            return current
+        # The first load waits; later reloads are done by one thread while the others read the old snapshot
+        if not self._reload_lock.acquire(blocking=current is None):
+            return current
+        try:
+            current = self._snapshot
+            if current is not None and time.monotonic() - self._checked_at <= self.version_ttl:
+                return current
+            with borrow_connection(self.connection_factory, self.pool) as connection:
+                version = data_version(connection)
+                if current is None or current.version != version:
+                    current = self._load(connection, version)
+            with self._lock:
+                self._snapshot = current
+                self._checked_at = time.monotonic()
+            return current
+        finally:
+            self._reload_lock.release()
+
+    def frame(self, table_name):
+        """Returns a table of the current snapshot.
+
+        The result is a shallow copy: it shares the snapshot's memory until the caller modifies it,
+        at which point copy-on-write gives the caller its own data.
+        """
+        return self.snapshot().frames[table_name].copy(deep=False)
+
+    def memory_report(self):
+        """Returns the per-table and total memory footprint of the current snapshot."""
+        snapshot = self.snapshot()
+        raw_bytes = sum(entry['raw_bytes'] for entry in snapshot.memory.values())
+        total_bytes = sum(entry['bytes'] for entry in snapshot.memory.values())
+        return {
+            'version': snapshot.version,
+            'loaded_at': snapshot.loaded_at,
+            'tables': snapshot.memory,
+            'raw_bytes': raw_bytes,
+            'bytes': total_bytes,
+            'saved_ratio': round(1 - total_bytes / raw_bytes, 3) if raw_bytes else 0.0,
+        }
+
+    def _load(self, connection, version):
+        """Builds a complete new snapshot of every table."""
+        frames, memory = {}, {}
+        for table_name in self.tables:
+            frames[table_name], memory[table_name] = load_compact_table(connection, table_name, self.chunk_size)
+        print(f"Loaded dataset version {version}: "
+              f"{sum(entry['bytes'] for entry in memory.values()) / 2**20:.1f} MiB in {len(frames)} tables")
+        return DatasetSnapshot(version, frames, memory, time.strftime('%Y-%m-%dT%H:%M:%S'))
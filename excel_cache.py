@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it we fall back to pd.read_excel
+    feather = None
+
+# --- Columnar cache for the dashboard's .xlsx snapshots ---
+# Each workbook is parsed once with openpyxl, written next to a small JSON sidecar
+# as an uncompressed Feather (Arrow IPC) file, and read back memory-mapped on later runs.
+CACHE_DIR = '.excel_cache'
+
+_memory_cache = {}  # absolute source path -> (mtime_ns, size, DataFrame)
+_lock = threading.Lock()
+
+
+def _file_sha256(path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(source_path, cache_dir):
+    """Returns the (data, metadata) paths used to cache a source workbook."""
+    base_name = os.path.basename(source_path)
+    # Prefix with a short hash of the full path so equal file names in different folders don't collide
+    path_key = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:10]
+    stem = os.path.join(cache_dir, f"{path_key}_{base_name}")
+    return stem + '.feather', stem + '.json'
+
+
+def _read_meta(meta_path):
+    """Reads a cache sidecar file, returning None if it is missing or unreadable."""
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _atomic_write_json(path, payload):
+    """Writes JSON through a temp file so concurrent readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _write_feather(df, data_path):
+    """Writes a DataFrame as uncompressed Feather so it can be memory-mapped on read."""
+    tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Feather needs string column names and a default index
+    feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+    os.replace(tmp_path, data_path)
+
+
+def _load_from_disk_cache(source_path, stat, cache_dir):
+    """Returns the cached DataFrame for a workbook, rebuilding the cache entry when the source changed."""
+    data_path, meta_path = _cache_paths(source_path, cache_dir)
+    meta = _read_meta(meta_path)
+    cache_present = meta is not None and os.path.exists(data_path)
+
+    if cache_present and meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return feather.read_table(data_path, memory_map=True).to_pandas()
+
+    source_hash = _file_sha256(source_path)
+    if cache_present and meta.get('sha256') == source_hash:
+        # Only the timestamp changed (e.g. the file was copied or touched), so keep the cached data
+        meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _atomic_write_json(meta_path, meta)
+        return feather.read_table(data_path, memory_map=True).to_pandas()
+
+    df = pd.read_excel(source_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_feather(df, data_path)
+    _atomic_write_json(meta_path, {
+        'source': os.path.abspath(source_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': source_hash,
+    })
+    return df
+
+
+def load_cached_excel(file_path, cache_dir=CACHE_DIR):
+    """Loads an .xlsx file through the columnar cache, parsing it with openpyxl only when it has changed.
+
+    The returned DataFrame is shared between callers in the same process, so treat it as read-only.
+    Raises FileNotFoundError if the workbook does not exist, like pd.read_excel.
+    """
+    stat = os.stat(file_path)
+    key = os.path.abspath(file_path)
+
+    with _lock:
+        cached = _memory_cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    if feather is None:
+        df = pd.read_excel(file_path)
+    else:
+        df = _load_from_disk_cache(file_path, stat, cache_dir)
+
+    with _lock:
+        _memory_cache[key] = (stat.st_mtime_ns, stat.st_size, df)
+    return df
+
+
+def clear_excel_cache(cache_dir=CACHE_DIR):
+    """Drops the in-process cache and deletes the on-disk cache files."""
+    with _lock:
+        _memory_cache.clear()
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith(('.feather', '.json')):
+                os.remove(os.path.join(cache_dir, name))
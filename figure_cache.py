@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import inspect
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# --- Rendered figure cache for the dashboard ---
+# A chart is rendered once per (plot function, data) pair and kept as PNG (or SVG) bytes: in an
+# in-process LRU for reruns of the same session, and on disk so other sessions, restarts and the
+# background pre-render workers share the result. The key is the plot function's qualified name,
+# a code version and a hash of the DataFrame's columns, dtypes and values, so a chart is only
+# redrawn when its data or its drawing code changes. The code version hashes the source of the
+# module the plot function lives in (helpers and styling included) together with PLOT_VERSION.
+#
+# The disk cache is pruned by age and size after new figures are written; figures of old code
+# versions are never read again and age out.
+#
+# prerender_figures() hands charts to a background process pool that loads each chart's data
+# itself (a picklable loader and its arguments), so the caller does not load anything up front.
+FIGURE_CACHE_DIR = '.figure_cache'
+
+# Bump to invalidate every cached figure when rendering changes outside the plot modules
+# (matplotlib style, dpi, savefig options)
+PLOT_VERSION = 1
+
+# Rendered figures kept in memory per process
+MEMORY_CACHE_ENTRIES = 128
+
+# Disk cache limits, checked at most every PRUNE_INTERVAL seconds per process
+DISK_CACHE_MAX_BYTES = 256 * 2**20
+DISK_CACHE_MAX_AGE = 7 * 24 * 3600
+PRUNE_INTERVAL = 60
+
+_memory_cache = OrderedDict()  # figure key -> bytes
+_lock = threading.Lock()
+_executor = None
+_pending = set()  # pre-render jobs submitted and not finished yet
+_last_prune = None  # time.monotonic() of this process' last prune
+
+
+def frame_hash(df):
+    """Returns a SHA-256 of a DataFrame's column names, dtypes and values."""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(column), str(dtype)) for column, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(plot_function):
+    """Returns a short hash of PLOT_VERSION and the source of the plot function's module."""
+    module = inspect.getmodule(plot_function)
+    try:
+        source = inspect.getsource(module if module is not None else plot_function)
+    except (OSError, TypeError):
+        source = plot_function.__qualname__  # No source to hash (e.g. defined interactively)
+    return hashlib.sha256(f"{PLOT_VERSION}\n{source}".encode('utf-8')).hexdigest()[:12]
+
+
+def figure_key(plot_function, df, fmt='png'):
+    """Returns the cache key of a chart: plot function, code version, data hash and image format."""
+    return (f"{plot_function.__module__}.{plot_function.__qualname__}-{code_version(plot_function)}"
+            f"-{frame_hash(df)[:32]}.{fmt}")
+
+
+def render_figure(plot_function, df, fmt='png', dpi=100):
+    """Draws a chart with plot_function and returns the encoded image bytes."""
+    import matplotlib.pyplot as plt
+
+    fig = plot_function(df)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _remember(key, image):
+    """Stores rendered bytes in the in-process LRU."""
+    with _lock:
+        _memory_cache[key] = image
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def _write_image(path, image):
+    """Writes image bytes through a temp file so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(image)
+    os.replace(tmp_path, path)
+
+
+def prune_figure_cache(cache_dir=FIGURE_CACHE_DIR, max_bytes=DISK_CACHE_MAX_BYTES, max_age=DISK_CACHE_MAX_AGE):
+    """Deletes figures from the disk cache: those older than max_age seconds, then the least
+    recently used ones until the cache fits in max_bytes.
+
+    Returns the number of files deleted.
+    """
+    entries = []
+    for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+        if name.endswith(('.png', '.svg')):
+            try:
+                stat = os.stat(os.path.join(cache_dir, name))
+            except OSError:
+                continue  # Deleted by another process meanwhile
+            entries.append((stat.st_mtime, stat.st_size, name))
+    entries.sort()  # Oldest first; get_figure() refreshes the mtime of every figure it reads
+    total_bytes = sum(size for _, size, _ in entries)
+    cutoff = time.time() - max_age
+    deleted = 0
+    for mtime, size, name in entries:
+        if mtime >= cutoff and total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            deleted += 1
+        except OSError:
+            pass
+        total_bytes -= size
+    return deleted
+
+
+def _maybe_prune(cache_dir):
+    """Prunes the disk cache if the last prune in this process was PRUNE_INTERVAL seconds ago."""
+    global _last_prune
+    with _lock:
+        if _last_prune is not None and time.monotonic() - _last_prune < PRUNE_INTERVAL:
+            return
+        _last_prune = time.monotonic()
+    prune_figure_cache(cache_dir)
+
+
+def get_figure(plot_function, df, fmt='png', cache_dir=FIGURE_CACHE_DIR):
+    """Returns the rendered chart for df, drawing it only if it is not cached in memory or on disk."""
+    key = figure_key(plot_function, df, fmt)
+    with _lock:
+        image = _memory_cache.get(key)
+        if image is not None:
+            _memory_cache.move_to_end(key)
+            return image
+
+    path = os.path.join(cache_dir, key)
+    try:
+        with open(path, 'rb') as f:
+            image = f.read()
+        os.utime(path)  # Marks the figure as recently used for prune_figure_cache()
+    except OSError:
+        image = render_figure(plot_function, df, fmt)
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_image(path, image)
+        _maybe_prune(cache_dir)
+    _remember(key, image)
+    return image
+
+
+def _prerender(plot_function, load_frame, args, fmt, cache_dir):
+    """Worker entry point: loads one chart's data and renders it into the disk cache unless it is there."""
+    import matplotlib
+    matplotlib.use('Agg')
+    df = load_frame(*args)
+    if not df.empty:
+        get_figure(plot_function, df, fmt, cache_dir)
+
+
+def _finished(job, future):
+    with _lock:
+        _pending.discard(job)
+    if future.exception() is not None:
+        print(f"Error pre-rendering {job[0]} ({job[1]}{job[2]}): {future.exception()}")
+
+
+def prerender_figures(jobs, fmt='png', cache_dir=FIGURE_CACHE_DIR, max_workers=None):
+    """Renders (plot_function, load_frame, args) jobs into the disk cache on a background process pool.
+
+    Each worker calls load_frame(*args) for the chart's DataFrame and draws it only if it is not
+    cached yet. Returns immediately with the number of jobs submitted; jobs still running are
+    skipped. Plot and load functions must be importable from a module (not defined in a script),
+    and args picklable, to reach the workers. Errors are printed when a job finishes.
+    """
+    global _executor
+    submitted = 0
+    for plot_function, load_frame, args in jobs:
+        job = (f"{plot_function.__module__}.{plot_function.__qualname__}",
+               f"{load_frame.__module__}.{load_frame.__qualname__}", repr(args))
+        with _lock:
+            if job in _pending:
+                continue
+            if _executor is None:
+                # spawn keeps the workers free of the parent's threads (e.g. the Streamlit server)
+                _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            _pending.add(job)
+        future = _executor.submit(_prerender, plot_function, load_frame, args, fmt, cache_dir)
+        future.add_done_callback(lambda done, job=job: _finished(job, done))
+        submitted += 1
+    return submitted
+
+
+def clear_figure_cache(cache_dir=FIGURE_CACHE_DIR):
+    """Drops the in-process cache and deletes the rendered figures on disk."""
+    with _lock:
+        _memory_cache.clear()
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.endswith(('.png', '.svg')):
+                os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,345 @@
+import argparse
+import functools
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from analysis_api import bind_parameters, data_version
+from pulse_db import connect_local_db
+from sql_runner import borrow_connection, connect_mysql, fetch_dataframe
+
+# --- Vectorized growth and trend engine ---
+# A GrowthPanel holds one metric (transactions, users or insurance) as NumPy arrays of shape
+# (measure, entity, quarter), where an entity is a state or a (state, district) pair and the
+# quarter axis runs without gaps from Q1 of the first year to Q4 of the last (NaN where a
+# period has no data). When the panel is built, every growth series is computed at once for all
+# entities and periods:
+#   qoq / yoy      - change against the previous quarter / the same quarter a year earlier
+#   annual         - yearly totals, and annual_growth against the previous year
+#   cagr           - compound annual growth rate between every pair of years
+#   rolling        - trailing sums over `window` quarters (default a year), and their yoy change
+# Any period comparison is then array indexing, with no SQL self-join per pair of periods.
+#
+# GrowthEngine loads the panels on first use, keeps them until the data version changes (see
+# analysis_api.data_version), and answers the year-over-year analyses 4.1 and 6.2 in the same
+# shape as their SQL versions, for the dashboard and for sql_runner --growth-engine.
+
+# (metric, level) -> (table, entity columns, {measure: column}). State panels read the rollups;
+# state-level insurance uses the top/* rollup like analysis 6.2.
+GROWTH_SOURCES = {
+    ('transactions', 'state'): ('rollup_map_transaction', ['state'],
+                                {'transaction_count': 'transaction_count', 'transaction_amount': 'transaction_amount'}),
+    ('transactions', 'district'): ('Map_transaction', ['state', 'district'],
+                                   {'transaction_count': 'transaction_count', 'transaction_amount': 'transaction_amount'}),
+    ('users', 'state'): ('rollup_map_user', ['state'],
+                         {'registered_users': 'registered_users', 'app_opens': 'app_opens'}),
+    ('users', 'district'): ('Map_user', ['state', 'district'],
+                            {'registered_users': 'registered_users', 'app_opens': 'app_opens'}),
+    ('insurance', 'state'): ('rollup_top_insurance', ['state'],
+                             {'premium_count': 'count', 'premium_amount': 'amount'}),
+    ('insurance', 'district'): ('Map_insurance', ['state', 'district'],
+                                {'premium_count': 'premium_count', 'premium_amount': 'premium_amount'}),
+}
+GROWTH_METRICS = ['transactions', 'users', 'insurance']
+GROWTH_LEVELS = ['state', 'district']
+
+# Quarters in a rolling window
+ROLLING_WINDOW = 4
+
+
+# --- Array helpers; the last axis is time ---
+
+def _change(previous, current):
+    """Returns (absolute change, percentage change); the percentage is NaN unless previous > 0."""
+    delta = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(previous > 0, delta / previous * 100, np.nan)
+    return delta, pct
+
+
+def _lagged_change(values, lag):
+    """Returns the change of every period against the period `lag` steps earlier."""
+    previous = np.full_like(values, np.nan)
+    if lag < values.shape[-1]:
+        previous[..., lag:] = values[..., :-lag]
+    return _change(previous, values)
+
+
+def _growth_rate(start, end, years):
+    """Returns the compound annual growth rate in %, NaN unless start > 0, end >= 0 and years > 0."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = (np.power(end / start, 1 / years) - 1) * 100
+    return np.where((start > 0) & (end >= 0) & (years > 0), rate, np.nan)
+
+
+def _nan_sum(values, axis=-1):
+    """Sums over an axis, skipping NaN; NaN where every value is NaN."""
+    return np.where(np.isnan(values).all(axis=axis), np.nan, np.nansum(values, axis=axis))
+
+
+def _rolling_sum(values, window):
+    """Trailing sums over `window` periods from cumulative sums; NaN unless every period has data."""
+    present = ~np.isnan(values)
+    padding = np.zeros(values.shape[:-1] + (1,))
+    totals = np.concatenate([padding, np.cumsum(np.where(present, values, 0.0), axis=-1)], axis=-1)
+    counts = np.concatenate([padding, np.cumsum(present, axis=-1)], axis=-1)
+    rolling = np.full_like(values, np.nan)
+    if window <= values.shape[-1]:
+        complete = counts[..., window:] - counts[..., :-window] == window
+        rolling[..., window - 1:] = np.where(complete, totals[..., window:] - totals[..., :-window], np.nan)
+    return rolling
+
+
+def _parse_period(period):
+    """Turns 2022, '2022', (2022, 3) or '2022 Q3' into (year, quarter or None)."""
+    if isinstance(period, str):
+        match = re.fullmatch(r'\s*(\d{4})(?:\s*-?\s*Q([1-4]))?\s*', period, re.IGNORECASE)
+        if not match:
+            raise ValueError(f"Unrecognized period '{period}'; use e.g. 2022 or '2022 Q3'")
+        return int(match.group(1)), int(match.group(2)) if match.group(2) else None
+    if isinstance(period, (tuple, list)):
+        return int(period[0]), int(period[1])
+    return int(period), None
+
+
+class GrowthPanel:
+    """One metric at state or district level, with every growth series precomputed. Read-only.
+
+    entities is a DataFrame of the entity columns (state, or state and district) with one row
+    per panel row. Arrays are indexed [measure, entity, period].
+    """
+
+    def __init__(self, metric, level, entities, measures, first_year, values, window=ROLLING_WINDOW):
+        self.metric = metric
+        self.level = level
+        self.entities = entities
+        self.measures = list(measures)
+        self.window = window
+        measure_count, entity_count, quarter_count = values.shape
+        self.years = np.arange(first_year, first_year + quarter_count // 4)
+
+        self.quarterly = values
+        self.qoq, self.qoq_pct = _lagged_change(values, 1)
+        self.yoy, self.yoy_pct = _lagged_change(values, 4)
+        self.annual = _nan_sum(values.reshape(measure_count, entity_count, len(self.years), 4))
+        self.annual_growth, self.annual_growth_pct = _lagged_change(self.annual, 1)
+        spans = self.years[None, :] - self.years[:, None]  # [start year, end year] -> years between
+        self.cagr = _growth_rate(self.annual[..., :, None], self.annual[..., None, :], spans)
+        self.rolling = _rolling_sum(values, window)
+        self.rolling_yoy, self.rolling_yoy_pct = _lagged_change(self.rolling, 4)
+
+    @property
+    def periods(self):
+        """(year, quarter) of every position on the quarter axis."""
+        return [(int(year), quarter) for year in self.years for quarter in range(1, 5)]
+
+    def _measure(self, measure):
+        try:
+            return self.measures.index(measure)
+        except ValueError:
+            raise KeyError(f"'{measure}' is not a measure of the {self.metric} panel ({', '.join(self.measures)})")
+
+    def _position(self, year, quarter=None):
+        """Index of a year (quarter=None) or quarter on its axis, or None when outside the panel."""
+        index = year - int(self.years[0]) if len(self.years) else -1
+        if quarter is not None:
+            index = index * 4 + quarter - 1
+            return index if 0 <= index < len(self.years) * 4 else None
+        return index if 0 <= index < len(self.years) else None
+
+    def compare(self, measure, start, end):
+        """Compares two periods for every entity.
+
+        start and end are both years (comparing annual totals) or both (year, quarter) pairs
+        (comparing quarters); strings like '2022' and '2022 Q3' work too. Returns the entity
+        columns plus start_value, end_value, growth, growth_pct and cagr_pct (annualized).
+        Periods outside the data give NaN.
+        """
+        m = self._measure(measure)
+        (start_year, start_quarter), (end_year, end_quarter) = _parse_period(start), _parse_period(end)
+        if (start_quarter is None) != (end_quarter is None):
+            raise ValueError("Compare two years or two quarters, not a year with a quarter")
+        i, j = self._position(start_year, start_quarter), self._position(end_year, end_quarter)
+        series = self.annual[m] if start_quarter is None else self.quarterly[m]
+        missing = np.full(len(self.entities), np.nan)
+        first = series[:, i] if i is not None else missing
+        last = series[:, j] if j is not None else missing
+        growth, growth_pct = _change(first, last)
+        if start_quarter is None and i is not None and j is not None:
+            cagr = self.cagr[m, :, i, j]
+        else:
+            years = end_year - start_year + ((end_quarter or 1) - (start_quarter or 1)) / 4
+            cagr = _growth_rate(first, last, years)
+        df = self.entities.copy()
+        df['start_value'], df['end_value'] = first, last
+        df['growth'], df['growth_pct'], df['cagr_pct'] = growth, growth_pct, cagr
+        return df
+
+    def trend(self, measure):
+        """Returns one row per entity and quarter with the value and its qoq, yoy and rolling growth."""
+        m = self._measure(measure)
+        quarter_count = self.quarterly.shape[2]
+        df = self.entities.loc[self.entities.index.repeat(quarter_count)].reset_index(drop=True)
+        df['year'] = np.tile(np.repeat(self.years, 4), len(self.entities))
+        df['quarter'] = np.tile(np.arange(1, 5), len(self.entities) * len(self.years))
+        for name, values in ((measure, self.quarterly), ('qoq_growth_pct', self.qoq_pct),
+                             ('yoy_growth_pct', self.yoy_pct), (f'rolling_{measure}', self.rolling),
+                             ('rolling_yoy_growth_pct', self.rolling_yoy_pct)):
+            df[name] = values[m].ravel()
+        return df.dropna(subset=[measure]).reset_index(drop=True)
+
+
+def load_growth_panel(connection, metric='transactions', level='state', window=ROLLING_WINDOW):
+    """Reads one metric per entity and quarter with a single GROUP BY and builds its GrowthPanel."""
+    table_name, entity_columns, measures = GROWTH_SOURCES[(metric, level)]
+    sums = ', '.join(f"SUM({column}) AS {measure}" for measure, column in measures.items())
+    keys = ', '.join(entity_columns + ['year', 'quarter'])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {keys}, {sums} FROM {table_name} GROUP BY {keys}")
+        df = fetch_dataframe(cursor)
+    finally:
+        cursor.close()
+
+    if df.empty:
+        entities = pd.DataFrame({column: pd.Series(dtype=object) for column in entity_columns})
+        return GrowthPanel(metric, level, entities, measures, 0, np.empty((len(measures), 0, 0)), window)
+    # Entities are numbered in sorted order, matching the sorted, de-duplicated entity frame
+    entity_index = df.groupby(entity_columns, sort=True).ngroup().to_numpy()
+    entities = df[entity_columns].drop_duplicates().sort_values(entity_columns).reset_index(drop=True)
+    years = df['year'].astype(int).to_numpy()
+    first_year = int(years.min())
+    period_index = (years - first_year) * 4 + df['quarter'].astype(int).to_numpy() - 1
+    values = np.full((len(measures), len(entities), (int(years.max()) - first_year + 1) * 4), np.nan)
+    values[:, entity_index, period_index] = df[list(measures)].to_numpy(dtype=float).T
+    return GrowthPanel(metric, level, entities, measures, first_year, values, window)
+
+
+# --- Year-over-year analyses in the shape of their SQL versions (see analysis_api) ---
+
+def _sorted(df, column, top_n):
+    df = df.sort_values(column, ascending=False, kind='stable')
+    return (df.head(int(top_n)) if top_n else df).reset_index(drop=True)
+
+
+def growth_analysis_4_1(engine, year=2022, top_n=10):
+    """States with the highest growth in transaction amount from the previous year to `year`."""
+    previous, year = int(year) - 1, int(year)
+    df = engine.panel('transactions').compare('transaction_amount', previous, year)
+    df = df.dropna(subset=['start_value', 'end_value'])
+    return _sorted(pd.DataFrame({
+        'state': df['state'],
+        f'total_amount_{previous}': df['start_value'],
+        f'total_amount_{year}': df['end_value'],
+        'amount_growth': df['growth'],
+    }), 'amount_growth', top_n)
+
+
+def growth_analysis_6_2(engine, year=2022, top_n=None):
+    """States with growth in insurance premium amount from the previous year to `year`."""
+    previous, year = int(year) - 1, int(year)
+    df = engine.panel('insurance').compare('premium_amount', previous, year)
+    df = df[df['start_value'].notna() & df['end_value'].notna() & (df['growth'] > 0)]
+    return _sorted(pd.DataFrame({
+        'state': df['state'],
+        f'total_premium_{previous}': df['start_value'],
+        f'total_premium_{year}': df['end_value'],
+        'growth_amount': df['growth'],
+        'percentage_growth': df['growth_pct'].fillna(0.0),
+    }), 'percentage_growth', top_n)
+
+
+GROWTH_ANALYSES = {
+    '4.1': growth_analysis_4_1,
+    '6.2': growth_analysis_6_2,
+}
+
+# Queries of phonepe_analysis_queries.sql the engine answers, with the parameters they are written for
+REPORT_QUERIES = {
+    '4.1': ('4.1', {'year': 2022, 'top_n': 10}),
+    '6.2': ('6.2', {'year': 2022, 'top_n': None}),
+}
+
+
+class GrowthEngine:
+    """Process-wide GrowthPanels that are rebuilt when the data changes.
+
+    Panels are loaded on first use; the data version is re-checked at most every version_ttl
+    seconds and all panels are dropped when it changed. Panels are shared, so treat them as read-only.
+    """
+
+    def __init__(self, connection_factory=connect_mysql, pool=None, version_ttl=30, window=ROLLING_WINDOW):
+        self.connection_factory = connection_factory
+        self.pool = pool
+        self.version_ttl = version_ttl
+        self.window = window
+        self._panels = {}  # (metric, level) -> GrowthPanel
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def panel(self, metric='transactions', level='state'):
+        """Returns the GrowthPanel of a metric at 'state' or 'district' level."""
+        if (metric, level) not in GROWTH_SOURCES:
+            raise KeyError(f"No growth panel for {metric} at {level} level")
+        with self._lock:
+            stale = time.monotonic() - self._checked_at > self.version_ttl
+            panel = None if stale else self._panels.get((metric, level))
+            if panel is not None:
+                return panel
+            with borrow_connection(self.connection_factory, self.pool) as connection:
+                if stale:
+                    version = data_version(connection)
+                    if version != self._version:
+                        self._panels, self._version = {}, version
+                    self._checked_at = time.monotonic()
+                panel = self._panels.get((metric, level))
+                if panel is None:
+                    panel = load_growth_panel(connection, metric, level, self.window)
+                    self._panels[(metric, level)] = panel
+            return panel
+
+    def clear(self):
+        """Drops every panel, so the next call reloads from the database."""
+        with self._lock:
+            self._panels, self._version, self._checked_at = {}, None, 0.0
+
+    def analysis(self, analysis_id, **params):
+        """Runs analysis 4.1 or 6.2 from the panels; same filters and columns as analysis_api.run_analysis."""
+        return GROWTH_ANALYSES[analysis_id](self, **bind_parameters(analysis_id, **params))
+
+    def report_result(self, query_id):
+        """Returns the result of a report query the engine answers, or None for any other query."""
+        if query_id not in REPORT_QUERIES:
+            return None
+        analysis_id, params = REPORT_QUERIES[query_id]
+        return self.analysis(analysis_id, **params)
+
+
+def main(argv=None):
+    """Command-line entry point: python growth_engine.py START END [--metric M] [--level L] [--measure X]"""
+    parser = argparse.ArgumentParser(description="Compare two periods for every state or district.")
+    parser.add_argument('start', help="Year (2021) or quarter ('2021 Q4')")
+    parser.add_argument('end', help="Year (2022) or quarter ('2022 Q4')")
+    parser.add_argument('--metric', choices=GROWTH_METRICS, default='transactions')
+    parser.add_argument('--level', choices=GROWTH_LEVELS, default='state')
+    parser.add_argument('--measure', help="Defaults to the metric's last measure (e.g. transaction_amount)")
+    parser.add_argument('--top', type=int, default=10, help="Rows to show, by growth (0 = all)")
+    parser.add_argument('--local-db', metavar='PATH', help="Use a local SQLite database instead of MySQL")
+    args = parser.parse_args(argv)
+
+    connection_factory = functools.partial(connect_local_db, args.local_db) if args.local_db else connect_mysql
+    panel = GrowthEngine(connection_factory).panel(args.metric, args.level)
+    measure = args.measure or panel.measures[-1]
+    start = time.perf_counter()
+    df = panel.compare(measure, args.start, args.end).dropna(subset=['growth'])
+    seconds = time.perf_counter() - start
+    print(_sorted(df, 'growth_pct', args.top).to_string())
+    print(f"{measure} of {len(df)} {args.level}(s), {args.start} vs {args.end}, compared in {seconds * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
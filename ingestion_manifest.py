@@ -0,0 +1,94 @@
+import hashlib
+import os
+from collections import namedtuple
+
+from pulse_schema import get_dialect
+
+# --- Manifest of ingested Pulse files ---
+# The ingest_manifest table keeps one row per quarter file that was loaded: its path relative to
+# the data folder, where its rows went (dataset/state/year/quarter) and the size, mtime and
+# SHA-256 it had at the time. Comparing a fresh scan against it tells which files are new,
+# changed, unchanged or removed, so a quarterly refresh only touches the new quarter.
+MANIFEST_TABLE = 'ingest_manifest'
+
+ManifestEntry = namedtuple('ManifestEntry', ['path', 'dataset', 'state', 'year', 'quarter', 'size', 'mtime_ns', 'sha256'])
+
+# Result of comparing a scan with the manifest. `load` holds (PulseFile, old ManifestEntry or None),
+# `touched` holds (PulseFile, ManifestEntry) for files whose mtime changed but whose content did not,
+# and `removed` holds the ManifestEntry of every file that is gone.
+IngestionPlan = namedtuple('IngestionPlan', ['load', 'unchanged', 'touched', 'removed'])
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def relative_manifest_path(path, base_path):
+    """Returns the manifest key of a file: its path below base_path with '/' separators."""
+    return os.path.relpath(path, base_path).replace(os.sep, '/')
+
+
+def load_manifest(connection):
+    """Reads the manifest table into a {relative path: ManifestEntry} dict."""
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT {', '.join(ManifestEntry._fields)} FROM {MANIFEST_TABLE}")
+    manifest = {row[0]: ManifestEntry(*row) for row in cursor.fetchall()}
+    cursor.close()
+    return manifest
+
+
+def manifest_row(source, base_path, sha256):
+    """Builds the ingest_manifest row recording that a file was loaded."""
+    return (relative_manifest_path(source.path, base_path), source.dataset, source.state,
+            source.year, source.quarter, source.size, source.mtime_ns, sha256)
+
+
+def plan_ingestion(files, manifest, base_path, datasets):
+    """Compares scanned files against the manifest and decides what has to be (re)loaded.
+
+    Size and mtime are checked first; the file is only hashed when they differ from the manifest,
+    so an unchanged tree costs one stat per file. Files of the given datasets that are in the
+    manifest but no longer on disk are reported as removed.
+    """
+    load, unchanged, touched = [], [], []
+    seen = set()
+    for source in files:
+        key = relative_manifest_path(source.path, base_path)
+        seen.add(key)
+        entry = manifest.get(key)
+        status = compare_to_manifest(source, entry, lambda: file_sha256(source.path))
+        if status == 'unchanged':
+            unchanged.append(source)
+        elif status == 'touched':
+            touched.append((source, entry))
+        else:
+            load.append((source, entry))
+    return IngestionPlan(load, unchanged, touched, removed_entries(manifest, seen, datasets))
+
+
+def compare_to_manifest(source, entry, sha256):
+    """Classifies a scanned file against its manifest entry: 'new', 'unchanged', 'touched' or 'changed'.
+
+    sha256 is a callable returning the file's digest; it is only called when size or mtime differ.
+    """
+    if entry is None:
+        return 'new'
+    if entry.size == source.size and entry.mtime_ns == source.mtime_ns:
+        return 'unchanged'
+    return 'touched' if sha256() == entry.sha256 else 'changed'
+
+
+def removed_entries(manifest, seen, datasets):
+    """Returns the manifest entries of the given datasets whose paths were not seen in the scan."""
+    return [entry for key, entry in manifest.items() if key not in seen and entry.dataset in datasets]
+
+
+def delete_manifest_entries(cursor, connection, paths):
+    """Deletes manifest rows for the given relative paths."""
+    placeholder = '?' if get_dialect(connection) == 'sqlite' else '%s'
+    cursor.executemany(f"DELETE FROM {MANIFEST_TABLE} WHERE path = {placeholder}", [(p,) for p in paths])
@@ -1,6 +1,8 @@
 -- phonepe_analysis_queries.sql
 
 -- Database: phonepe_pulse_db
+-- "Latest year and quarter" queries read the latest_period table, which the ingestion keeps
+-- current (see schema_manager.py).
 
 -- --- Case Study 1: Decoding Transaction Dynamics on PhonePe ---
 -- Scenario: Understand variations in transaction behavior across states, quarters, and payment categories.
@@ -101,7 +103,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_insurance_districts_data
-        WHERE (year, quarter) = (SELECT MAX(year), MAX(quarter) FROM top_insurance_districts_data WHERE year = (SELECT MAX(year) FROM top_insurance_districts_data))
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_insurance_districts_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_insurance_districts_data')
 
         UNION ALL
 
@@ -110,7 +113,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_insurance_pincodes_data
-        WHERE (year, quarter) = (SELECT MAX(year), MAX(quarter) FROM top_insurance_pincodes_data WHERE year = (SELECT MAX(year) FROM top_insurance_pincodes_data))
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_insurance_pincodes_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_insurance_pincodes_data')
     ) AS combined_latest_data
 GROUP BY state
 ORDER BY total_premium_amount DESC
@@ -139,8 +143,8 @@ SELECT
     SUM(transaction_count) AS total_transaction_volume,
     SUM(transaction_amount) AS total_transaction_value
 FROM Map_transaction
-WHERE year = (SELECT MAX(year) FROM Map_transaction)
-  AND quarter = (SELECT MAX(quarter) FROM Map_transaction WHERE year = (SELECT MAX(year) FROM Map_transaction))
+WHERE year = (SELECT year FROM latest_period WHERE table_name = 'Map_transaction')
+  AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'Map_transaction')
 GROUP BY state
 ORDER BY total_transaction_value DESC;
 
@@ -153,15 +157,8 @@ SELECT
     district_name,
     SUM(registered_users) AS total_registered_users
 FROM top_user_districts_data
-WHERE
-    (year, quarter) = (
-        SELECT
-            year,
-            quarter
-        FROM top_user_districts_data
-        ORDER BY year DESC, quarter DESC
-        LIMIT 1
-    )
+WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_user_districts_data')
+  AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_user_districts_data')
 GROUP BY district_name
 ORDER BY total_registered_users DESC
 LIMIT 10;
@@ -248,7 +245,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_transaction_districts_data
-        WHERE (year, quarter) = (SELECT MAX(year), MAX(quarter) FROM top_transaction_districts_data WHERE year = (SELECT MAX(year) FROM top_transaction_districts_data))
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_transaction_districts_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_transaction_districts_data')
 
         UNION ALL
 
@@ -257,7 +255,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_transaction_pincodes_data
-        WHERE (year, quarter) = (SELECT MAX(year), MAX(quarter) FROM top_transaction_pincodes_data WHERE year = (SELECT MAX(year) FROM top_transaction_pincodes_data))
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_transaction_pincodes_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_transaction_pincodes_data')
     ) AS combined_latest_data
 GROUP BY state
 ORDER BY total_transaction_value DESC
@@ -283,15 +282,8 @@ SELECT
     pincode,
     SUM(registered_users) AS total_registered_users
 FROM top_user_pincodes_data
-WHERE
-    (year, quarter) = (
-        SELECT
-            year,
-            quarter
-        FROM top_user_pincodes_data
-        ORDER BY year DESC, quarter DESC
-        LIMIT 1
-    )
+WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_user_pincodes_data')
+  AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_user_pincodes_data')
 GROUP BY pincode
 ORDER BY total_registered_users DESC
 LIMIT 10;
@@ -345,15 +337,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_insurance_districts_data
-        WHERE
-            (year, quarter) = (
-                SELECT
-                    year,
-                    quarter
-                FROM top_insurance_districts_data
-                ORDER BY year DESC, quarter DESC
-                LIMIT 1
-            )
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_insurance_districts_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_insurance_districts_data')
 
         UNION ALL
 
@@ -362,15 +347,8 @@ FROM
             state,
             amount AS total_amount
         FROM top_insurance_pincodes_data
-        WHERE
-            (year, quarter) = (
-                SELECT
-                    year,
-                    quarter
-                FROM top_insurance_pincodes_data
-                ORDER BY year DESC, quarter DESC
-                LIMIT 1
-            )
+        WHERE year = (SELECT year FROM latest_period WHERE table_name = 'top_insurance_pincodes_data')
+          AND quarter = (SELECT quarter FROM latest_period WHERE table_name = 'top_insurance_pincodes_data')
     ) AS combined_latest_insurance_data
 GROUP BY state
 ORDER BY total_insurance_premium_amount DESC
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import dashboard_plots
+from analysis_api import ANALYSES, ResultCache, run_analysis
+from figure_cache import render_figure
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+from pulse_metrics import METRICS
+from sql_runner import fetch_dataframe, read_sql_file
+from synthetic_pulse import FIRST_YEAR, STATES, generate_pulse_tree
+
+# --- End-to-end benchmark on synthetic data ---
+# Generates a synthetic Pulse tree (see synthetic_pulse), loads it into a fresh local SQLite
+# database and times the three paths users wait on:
+#   ingest.*     - full load (rows/sec, files/sec) and a no-op incremental rerun
+#   query.*      - every query of phonepe_analysis_queries.sql (median of `repeat` runs)
+#   dashboard.*  - per chart: running the live analysis and rendering its figure
+# Results are written as JSON. Given a baseline from an earlier run (--save-baseline), the run
+# fails when a metric is worse than the baseline by more than the tolerance.
+
+BENCHMARK_REPORT_PATH = 'benchmark_results.json'
+ANALYSIS_QUERIES_PATH = 'phonepe_analysis_queries.sql'
+
+# A metric regresses when it is this much worse than the baseline (0.25 = 25%) ...
+DEFAULT_TOLERANCE = 0.25
+# ... and, for timings, also slower by at least this many seconds, so sub-millisecond noise is ignored
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _metric(value, unit, better='lower'):
+    return {'value': round(value, 6), 'unit': unit, 'better': better}
+
+
+def _median_seconds(function, repeat):
+    """Calls function `repeat` times and returns (median seconds, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def benchmark_ingestion(base_path, db_path, file_count, max_workers=None):
+    """Loads the tree into a new SQLite database. Returns (metrics, errors)."""
+    connection = connect_local_db(db_path)
+    try:
+        start = time.perf_counter()
+        summary = ingest_pulse_data(base_path, connection=connection, max_workers=max_workers)
+        seconds = time.perf_counter() - start
+        full_stages = {labels['stage']: METRICS.value('pulse_ingest_stage_seconds', **labels)
+                       for labels in METRICS.labels('pulse_ingest_stage_seconds') if labels['stage'] != 'total'}
+        start = time.perf_counter()
+        ingest_pulse_data(base_path, connection=connection, max_workers=max_workers)
+        incremental_seconds = time.perf_counter() - start
+    finally:
+        connection.close()
+
+    rows = sum(counts['loaded'] for counts in summary.values())
+    errors = {table: counts['errors'] for table, counts in summary.items() if counts['errors']}
+    metrics = {
+        'ingest.full.seconds': _metric(seconds, 's'),
+        'ingest.full.rows_per_sec': _metric(rows / seconds, 'rows/s', 'higher'),
+        'ingest.full.files_per_sec': _metric(file_count / seconds, 'files/s', 'higher'),
+        'ingest.incremental_noop.seconds': _metric(incremental_seconds, 's'),
+    }
+    # Stage timings of the full load, so a slower ingestion shows which stage caused it
+    for stage, stage_seconds in full_stages.items():
+        metrics[f'ingest.full.stage.{stage}.seconds'] = _metric(stage_seconds, 's')
+    return metrics, [f"ingest {table}: {count} errors" for table, count in errors.items()]
+
+
+def benchmark_queries(db_path, sql_filepath=ANALYSIS_QUERIES_PATH, repeat=3):
+    """Times every query of the .sql file, one at a time. Returns (metrics, errors)."""
+    metrics, errors = {}, []
+    connection = connect_local_db(db_path)
+    try:
+        for query_id, query in read_sql_file(sql_filepath):
+            def run():
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(query)
+                    return fetch_dataframe(cursor)
+                finally:
+                    cursor.close()
+            try:
+                seconds, df_result = _median_seconds(run, repeat)
+            except Exception as e:
+                errors.append(f"query {query_id}: {e}")
+                continue
+            metrics[f'query.{query_id}.seconds'] = _metric(seconds, 's')
+            metrics[f'query.{query_id}.rows'] = _metric(len(df_result), 'rows', 'info')
+    finally:
+        connection.close()
+    return metrics, errors
+
+
+def benchmark_dashboard(db_path, params, repeat=3):
+    """Times the live analysis and the chart rendering of every dashboard chart. Returns (metrics, errors)."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+    def connection_factory():
+        return connect_local_db(db_path)
+
+    metrics, errors = {}, []
+    total = 0.0
+    for analysis_id in ANALYSES:
+        plot_function = getattr(dashboard_plots, f"plot_{analysis_id.replace('.', '_')}")
+        try:
+            # A fresh cache per run, so every run pays for the query as on a data refresh
+            query_seconds, df = _median_seconds(
+                lambda: run_analysis(analysis_id, connection_factory, cache=ResultCache(), **params), repeat)
+            metrics[f'dashboard.{analysis_id}.query_seconds'] = _metric(query_seconds, 's')
+            total += query_seconds
+            # Small trees can leave a chart without data (e.g. the year-over-year ones with one year)
+            if df.empty:
+                continue
+            render_seconds, _ = _median_seconds(lambda: render_figure(plot_function, df), repeat)
+        except Exception as e:
+            errors.append(f"dashboard {analysis_id}: {e}")
+            continue
+        metrics[f'dashboard.{analysis_id}.render_seconds'] = _metric(render_seconds, 's')
+        total += render_seconds
+    metrics['dashboard.total_seconds'] = _metric(total, 's')
+    return metrics, errors
+
+
+def run_benchmark(scale=0.25, seed=42, repeat=3, max_workers=None, work_dir=None,
+                  sql_filepath=ANALYSIS_QUERIES_PATH, **sizes):
+    """Generates synthetic data, runs all benchmarks and returns the results.
+
+    Data and database go to a temporary directory unless work_dir is given. sizes overrides
+    the scaled number of states, years, districts, pincodes or brands (see synthetic_pulse).
+    """
+    with tempfile.TemporaryDirectory(prefix='pulse_benchmark_') as temp_dir:
+        work_dir = work_dir or temp_dir
+        base_path = os.path.join(work_dir, 'data')
+        db_path = os.path.join(work_dir, 'benchmark.db')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+        generated = generate_pulse_tree(base_path, scale, seed, **sizes)
+        metrics, errors = benchmark_ingestion(base_path, db_path, generated['files'], max_workers)
+        for section_metrics, section_errors in (benchmark_queries(db_path, sql_filepath, repeat),
+                                                benchmark_dashboard(db_path, {
+                                                    'state': STATES[0],
+                                                    'year': FIRST_YEAR + generated['sizes']['years'] - 1,
+                                                }, repeat)):
+            metrics.update(section_metrics)
+            errors.extend(section_errors)
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': scale,
+        'seed': seed,
+        'repeat': repeat,
+        'sizes': generated['sizes'],
+        'files': generated['files'],
+        'bytes': generated['bytes'],
+        'metrics': metrics,
+        'errors': errors,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE, min_seconds=MIN_REGRESSION_SECONDS):
+    """Returns a list of regression messages for metrics that got worse than the baseline."""
+    if baseline.get('sizes') != results['sizes'] or baseline.get('seed') != results['seed']:
+        return [f"baseline was recorded with sizes {baseline.get('sizes')} and seed {baseline.get('seed')}, "
+                f"this run used {results['sizes']} and seed {results['seed']}"]
+    regressions = []
+    for name, base in baseline['metrics'].items():
+        current = results['metrics'].get(name)
+        if current is None:
+            if base['better'] != 'info':
+                regressions.append(f"{name}: missing from this run")
+            continue
+        if base['better'] == 'lower':
+            worse = current['value'] > base['value'] * (1 + tolerance)
+            if base['unit'] == 's':
+                worse = worse and current['value'] - base['value'] >= min_seconds
+        elif base['better'] == 'higher':
+            worse = current['value'] < base['value'] * (1 - tolerance)
+        else:
+            worse = current['value'] != base['value']  # e.g. row counts must not change
+        if worse:
+            regressions.append(f"{name}: {current['value']} {current['unit']} (baseline {base['value']})")
+    return regressions
+
+
+def _write_json(path, document):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def main(argv=None):
+    """Command-line entry point: python pulse_benchmark.py [--scale 0.25] [--baseline PATH [--save-baseline]]
+
+    Exits with status 1 when a metric regressed against the baseline or a benchmark step failed.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark ingestion, queries and dashboard rendering "
+                                                 "on synthetic Pulse data.")
+    parser.add_argument('--scale', type=float, default=0.25, help="Data size relative to the real dataset")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per query/chart; the median is reported")
+    parser.add_argument('--workers', type=int, default=None, help="Number of parser processes for ingestion")
+    parser.add_argument('--output', default=BENCHMARK_REPORT_PATH, help="Where to write the JSON results")
+    parser.add_argument('--work-dir', help="Keep the generated data and database here instead of a temp dir")
+    parser.add_argument('--sql-file', default=ANALYSIS_QUERIES_PATH)
+    parser.add_argument('--baseline', metavar='PATH', help="Compare against (or save to) this baseline file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a metric counts as regressed")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.scale, args.seed, args.repeat, args.workers, args.work_dir, args.sql_file)
+    _write_json(args.output, results)
+
+    print(f"\nBenchmark results ({results['files']} files, sizes {results['sizes']}):")
+    for name, metric in results['metrics'].items():
+        if metric['better'] != 'info':
+            print(f"  {name:<40} {metric['value']:>14.4f} {metric['unit']}")
+    for error in results['errors']:
+        print(f"ERROR: {error}")
+    print(f"Results written to '{args.output}'")
+
+    failed = bool(results['errors'])
+    if args.baseline and args.save_baseline:
+        _write_json(args.baseline, results)
+        print(f"Baseline saved to '{args.baseline}'")
+    elif args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        print(f"{len(regressions)} regression(s) against '{args.baseline}' (tolerance {args.tolerance:.0%})")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
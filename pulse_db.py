@@ -0,0 +1,47 @@
+import os
+import sqlite3
+
+try:
+    import mysql.connector
+except ImportError:  # lets the helpers be imported without the MySQL driver installed
+    mysql = None
+
+from pulse_schema import create_tables
+
+# --- Database Connection Configuration ---
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': 'sandeep',
+    'database': 'phonepe_pulse_db'
+}
+
+# --- Path to my cloned 'pulse' repository data ---
+# This path points to the 'data' folder inside my cloned 'pulse' repository.
+# Set PULSE_DATA_BASE_PATH to load another tree, e.g. one written by synthetic_pulse.py.
+PULSE_DATA_BASE_PATH = os.environ.get('PULSE_DATA_BASE_PATH', r'C:\Users\hanum\OneDrive\Desktop\Labmentix\week6\data')
+
+# --- Local SQLite stand-in for phonepe_pulse_db (used for testing without a MySQL server) ---
+LOCAL_DB_PATH = 'phonepe_pulse_local.db'
+
+
+def connect_db():
+    """Establishes a database connection."""
+    if mysql is None:
+        print("Error connecting to MySQL: mysql-connector-python is not installed")
+        return None
+    try:
+        connection = mysql.connector.connect(**DB_CONFIG)
+        if connection.is_connected():
+            print("Successfully connected to MySQL database!")
+        return connection
+    except mysql.connector.Error as err:
+        print(f"Error connecting to MySQL: {err}")
+        return None
+
+
+def connect_local_db(db_path=LOCAL_DB_PATH):
+    """Opens the local SQLite stand-in database, creating the Pulse tables if needed."""
+    connection = sqlite3.connect(db_path, check_same_thread=False)
+    create_tables(connection)
+    return connection
@@ -0,0 +1,636 @@
+import argparse
+import hashlib
+import json
+import os
+import tarfile
+import time
+import zipfile
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_writer import WRITE_METHODS, BulkWriter
+from ingestion_manifest import (MANIFEST_TABLE, compare_to_manifest, delete_manifest_entries, load_manifest,
+                                manifest_row, plan_ingestion, relative_manifest_path, removed_entries)
+from pulse_db import PULSE_DATA_BASE_PATH, connect_db, connect_local_db
+from pulse_metrics import (METRICS, add_metrics_arguments, configure_from_args, flush_metrics, log_event, profile_run,
+                           stage_timer, timed_iter)
+from pulse_schema import create_tables, get_dialect
+from rollups import ROLLUPS, refresh_rollups
+from schema_manager import analyze_tables, refresh_latest_periods
+
+# --- Single-pass ingestion engine for the Pulse JSON tree ---
+# The tree is scanned once, every quarter file is parsed exactly once (in a process pool),
+# and the parsed document is handed to every extractor registered for its dataset.
+#
+# The data folder can also be given as a .zip, .tar, .tar.gz or .tgz archive of the tree. Its
+# members are then streamed in archive order in one sequential read, with dataset, state, year
+# and quarter taken from the member paths, and nothing is extracted to disk.
+
+PulseFile = namedtuple('PulseFile', ['dataset', 'path', 'state', 'year', 'quarter', 'size', 'mtime_ns'])
+
+# Folder (relative to PULSE_DATA_BASE_PATH) holding state/{state}/{year}/{quarter}.json for each dataset
+DATASET_PATHS = {
+    'aggregated/transaction': ('aggregated', 'transaction', 'country', 'india', 'state'),
+    'aggregated/user': ('aggregated', 'user', 'country', 'india', 'state'),
+    'aggregated/insurance': ('aggregated', 'insurance', 'country', 'india', 'state'),
+    'map/transaction': ('map', 'transaction', 'hover', 'country', 'india', 'state'),
+    'map/user': ('map', 'user', 'hover', 'country', 'india', 'state'),
+    'map/insurance': ('map', 'insurance', 'hover', 'country', 'india', 'state'),
+    'top/transaction': ('top', 'transaction', 'country', 'india', 'state'),
+    'top/user': ('top', 'user', 'country', 'india', 'state'),
+    'top/insurance': ('top', 'insurance', 'country', 'india', 'state'),
+}
+
+
+# --- Extractors ---
+# Each extractor takes a parsed quarter document and returns the rows for one table.
+# Items that are incomplete are skipped with a message appended to `skipped`.
+
+def extract_aggregated_transaction(data, source, skipped):
+    """Extracts Aggregated_transaction rows from an aggregated/transaction document."""
+    rows = []
+    for item in data['data']['transactionData']:
+        instrument = item['paymentInstruments'][0]
+        rows.append((source.state, source.year, source.quarter, item['name'], instrument['count'], instrument['amount']))
+    return rows
+
+
+def extract_aggregated_user(data, source, skipped):
+    """Extracts the Aggregated_user row from an aggregated/user document."""
+    aggregated = data['data']['aggregated']
+    # appOpens may be missing; the responseTimestamp is used as the record's timestamp
+    return [(source.state, source.year, source.quarter,
+             aggregated['registeredUsers'], aggregated.get('appOpens'), data.get('responseTimestamp'))]
+
+
+def extract_users_by_device(data, source, skipped):
+    """Extracts users_by_device rows from an aggregated/user document."""
+    users_by_device_list = []
+    if 'data' in data and data['data'] is not None:
+        users_by_device_list = data['data'].get('usersByDevice') or []
+    response_timestamp = data.get('responseTimestamp')
+
+    rows = []
+    for device_data in users_by_device_list:
+        brand_name = device_data.get('brand')
+        count = device_data.get('count')
+        percentage = device_data.get('percentage')
+        if brand_name is None or count is None or percentage is None:
+            skipped.append(f"Skipping incomplete device data in {source.path}: {device_data}")
+            continue
+        rows.append((source.state, source.year, source.quarter, brand_name, count, percentage, response_timestamp))
+    return rows
+
+
+def extract_aggregated_insurance(data, source, skipped):
+    """Extracts Aggregated_insurance rows from an aggregated/insurance document."""
+    rows = []
+    for item in data['data']['transactionData']:  # Structure is similar to aggregated_transaction
+        instrument = item['paymentInstruments'][0]
+        rows.append((source.state, source.year, source.quarter, item['name'], instrument['count'], instrument['amount']))
+    return rows
+
+
+def extract_map_hover_list(data, source, skipped):
+    """Extracts district count/amount rows from a map/transaction or map/insurance document."""
+    rows = []
+    for district_data in data['data']['hoverDataList']:
+        # Assuming there's only one metric entry for total count/amount for the district
+        metric = district_data['metric'][0]
+        rows.append((source.state, source.year, source.quarter, district_data['name'], metric['count'], metric['amount']))
+    return rows
+
+
+def extract_map_user(data, source, skipped):
+    """Extracts Map_user rows from a map/user document."""
+    rows = []
+    for district_name, user_data in data['data']['hoverData'].items():
+        rows.append((source.state, source.year, source.quarter,
+                     district_name, user_data['registeredUsers'], user_data.get('appOpens')))
+    return rows
+
+
+def _extract_top_metric_entities(data, source, skipped, list_key, label):
+    """Extracts entityName/metric rows from the districts or pincodes list of a top document."""
+    response_timestamp = data.get('responseTimestamp')
+    rows = []
+    for entity_data in data['data'].get(list_key) or []:
+        entity_name = entity_data.get('entityName')
+        metric = entity_data.get('metric')
+        if not (entity_name and metric):
+            skipped.append(f"Skipping incomplete {label} data in {source.path}: {entity_data}")
+            continue
+        metric_type = metric.get('type')
+        count = metric.get('count')
+        amount = metric.get('amount')
+        if any(v is None for v in [metric_type, count, amount]):
+            skipped.append(f"Skipping incomplete {label} metric data in {source.path}: {entity_data}")
+            continue
+        rows.append((source.state, source.year, source.quarter,
+                     entity_name, metric_type, count, amount, response_timestamp))
+    return rows
+
+
+def extract_top_metric_districts(data, source, skipped):
+    """Extracts district rows from a top/transaction or top/insurance document."""
+    return _extract_top_metric_entities(data, source, skipped, 'districts', 'district')
+
+
+def extract_top_metric_pincodes(data, source, skipped):
+    """Extracts pincode rows from a top/transaction or top/insurance document."""
+    return _extract_top_metric_entities(data, source, skipped, 'pincodes', 'pincode')
+
+
+def _extract_top_user_entities(data, source, skipped, list_key, label):
+    """Extracts name/registeredUsers rows from the districts or pincodes list of a top/user document."""
+    response_timestamp = data.get('responseTimestamp')
+    rows = []
+    for entity_data in data['data'].get(list_key) or []:
+        entity_name = entity_data.get('name')
+        registered_users = entity_data.get('registeredUsers')
+        if entity_name is None:
+            skipped.append(f"Skipping {label} data from {source.path}: 'name' is missing or None in {entity_data}")
+            continue
+        if registered_users is None:
+            skipped.append(f"Skipping {label} data from {source.path}: 'registeredUsers' is missing or None in {entity_data}")
+            continue
+        rows.append((source.state, source.year, source.quarter, entity_name, registered_users, response_timestamp))
+    return rows
+
+
+def extract_top_user_districts(data, source, skipped):
+    """Extracts top_user_districts_data rows from a top/user document."""
+    return _extract_top_user_entities(data, source, skipped, 'districts', 'district')
+
+
+def extract_top_user_pincodes(data, source, skipped):
+    """Extracts top_user_pincodes_data rows from a top/user document."""
+    return _extract_top_user_entities(data, source, skipped, 'pincodes', 'pincode')
+
+
+# dataset -> [(table, extractor)]; every extractor of a dataset sees the same parsed document
+EXTRACTORS = {
+    'aggregated/transaction': [('Aggregated_transaction', extract_aggregated_transaction)],
+    'aggregated/user': [('Aggregated_user', extract_aggregated_user),
+                        ('users_by_device', extract_users_by_device)],
+    'aggregated/insurance': [('Aggregated_insurance', extract_aggregated_insurance)],
+    'map/transaction': [('Map_transaction', extract_map_hover_list)],
+    'map/user': [('Map_user', extract_map_user)],
+    'map/insurance': [('Map_insurance', extract_map_hover_list)],
+    'top/transaction': [('top_transaction_districts_data', extract_top_metric_districts),
+                        ('top_transaction_pincodes_data', extract_top_metric_pincodes)],
+    'top/user': [('top_user_districts_data', extract_top_user_districts),
+                 ('top_user_pincodes_data', extract_top_user_pincodes)],
+    'top/insurance': [('top_insurance_districts_data', extract_top_metric_districts),
+                      ('top_insurance_pincodes_data', extract_top_metric_pincodes)],
+}
+
+
+# --- Scanning and parsing ---
+
+def scan_pulse_tree(base_path=PULSE_DATA_BASE_PATH, datasets=None):
+    """Walks the Pulse data tree once and yields a PulseFile for every state/year/quarter file."""
+    for dataset in datasets or DATASET_PATHS:
+        data_path = os.path.join(base_path, *DATASET_PATHS[dataset])
+        if not os.path.isdir(data_path):
+            print(f"Error: Data path not found: {data_path}")
+            continue
+        with os.scandir(data_path) as state_entries:
+            for state_entry in state_entries:
+                if not state_entry.is_dir():
+                    continue
+                state_name_clean = state_entry.name.replace('.json', '')
+                with os.scandir(state_entry.path) as year_entries:
+                    for year_entry in year_entries:
+                        if not year_entry.is_dir():
+                            continue
+                        try:
+                            year = int(year_entry.name)
+                        except ValueError:
+                            print(f"Skipping non-integer year folder: {year_entry.name}")
+                            continue
+                        with os.scandir(year_entry.path) as quarter_entries:
+                            for quarter_entry in quarter_entries:
+                                if not quarter_entry.name.endswith('.json'):
+                                    continue
+                                try:
+                                    quarter = int(quarter_entry.name.replace('.json', ''))
+                                except ValueError:
+                                    print(f"Skipping non-integer quarter file: {quarter_entry.name}")
+                                    continue
+                                stat = quarter_entry.stat()
+                                yield PulseFile(dataset, quarter_entry.path, state_name_clean, year, quarter,
+                                                stat.st_size, stat.st_mtime_ns)
+
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+
+def is_pulse_archive(path):
+    """Returns True if path is an archive file of the Pulse data folder rather than the folder itself."""
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def archive_member_file(archive_path, member_name, size, mtime_ns, datasets):
+    """Returns the PulseFile of an archive member, or None if it is not a state/year/quarter file.
+
+    The member path may start with any prefix (e.g. 'pulse-master/data/'); the dataset is found
+    by its folder sequence in front of state/year/quarter.json. The PulseFile's path is the archive
+    path joined with the member path below the data folder, so manifest keys are the same as when
+    the extracted folder is loaded.
+    """
+    parts = member_name.strip('/').split('/')
+    if not parts[-1].endswith('.json') or parts[-1].startswith('.'):
+        return None
+    for dataset in datasets:
+        folders = DATASET_PATHS[dataset]
+        if len(parts) < len(folders) + 3 or tuple(parts[-3 - len(folders):-3]) != folders:
+            continue
+        try:
+            year = int(parts[-2])
+            quarter = int(parts[-1].replace('.json', ''))
+        except ValueError:
+            print(f"Skipping non-integer year/quarter member: {member_name}")
+            return None
+        return PulseFile(dataset, os.path.join(archive_path, *parts[-3 - len(folders):]),
+                         parts[-3].replace('.json', ''), year, quarter, size, mtime_ns)
+    return None
+
+
+def iter_pulse_archive(archive_path, datasets=None):
+    """Streams an archive of the Pulse data folder, yielding (PulseFile, content bytes) per quarter file.
+
+    Members are read in the order they are stored, so the archive is read once from start to
+    end: zip members by their offset, tar members (plain or gzip) through tarfile's stream mode.
+    """
+    datasets = list(datasets or DATASET_PATHS)
+    if archive_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.header_offset):
+                if info.is_dir():
+                    continue
+                mtime_ns = int(time.mktime(info.date_time + (0, 0, -1))) * 1_000_000_000
+                source = archive_member_file(archive_path, info.filename, info.file_size, mtime_ns, datasets)
+                if source is not None:
+                    yield source, archive.read(info)
+        return
+    with tarfile.open(archive_path, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            source = archive_member_file(archive_path, member.name, member.size, int(member.mtime) * 1_000_000_000,
+                                         datasets)
+            if source is not None:
+                yield source, archive.extractfile(member).read()
+
+
+def parse_pulse_file(source, content=None):
+    """Parses one quarter file and runs every extractor registered for its dataset.
+
+    content is the raw file content when it was already read (e.g. from an archive); otherwise
+    the file is read from source.path.
+    Returns a dict with the extracted rows per table, error counts per table and per error class
+    (exception name, or 'SkippedRecord'), any messages, the SHA-256 of the file content, whether
+    the file failed to parse or extract (`failed`) and the time it took (`parse_seconds`).
+    Runs inside the worker processes, so it only returns plain picklable data.
+    """
+    start = time.perf_counter()
+    result = {'source': source, 'rows': {}, 'errors': Counter(), 'error_classes': Counter(), 'messages': [],
+              'sha256': None, 'failed': False, 'parse_seconds': 0.0}
+    extractors = EXTRACTORS[source.dataset]
+    try:
+        if content is None:
+            with open(source.path, 'rb') as f:
+                content = f.read()
+        result['sha256'] = hashlib.sha256(content).hexdigest()
+        data = json.loads(content)
+    except (OSError, ValueError) as e:
+        result['messages'].append(f"Error decoding JSON from {source.path}: {e}")
+        result['failed'] = True
+        result['error_classes'][type(e).__name__] += 1
+        for table, _ in extractors:
+            result['errors'][table] += 1
+        result['parse_seconds'] = time.perf_counter() - start
+        return result
+
+    for table, extractor in extractors:
+        skipped = []
+        try:
+            result['rows'][table] = extractor(data, source, skipped)
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            result['messages'].append(f"Missing key in JSON from {source.path} ({table}): {e!r}")
+            result['errors'][table] += 1
+            result['error_classes'][type(e).__name__] += 1
+            result['failed'] = True
+        result['messages'].extend(skipped)
+        result['errors'][table] += len(skipped)
+        if skipped:
+            result['error_classes']['SkippedRecord'] += len(skipped)
+    result['parse_seconds'] = time.perf_counter() - start
+    return result
+
+
+def parse_pulse_files(files, max_workers=None, chunksize=16):
+    """Parses quarter files in a process pool, yielding results as they complete in input order.
+
+    max_workers=1 parses in the current process, which is handy for debugging.
+    """
+    if max_workers == 1:
+        yield from map(parse_pulse_file, files)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(parse_pulse_file, files, chunksize=chunksize)
+
+
+def _parse_pulse_batch(batch):
+    """Worker entry point: parses a list of (PulseFile, content) pairs."""
+    return [parse_pulse_file(source, content) for source, content in batch]
+
+
+def parse_pulse_stream(items, max_workers=None, batch_size=16, max_pending=64):
+    """Parses (PulseFile, content) pairs in a process pool as they are read, yielding results in input order.
+
+    Unlike parse_pulse_files this does not consume the whole input up front: at most max_pending
+    batches are in flight, so file contents are held in memory only until they are parsed.
+    """
+    if max_workers == 1:
+        for source, content in items:
+            yield parse_pulse_file(source, content)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == batch_size:
+                pending.append(executor.submit(_parse_pulse_batch, batch))
+                batch = []
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().result()
+        if batch:
+            pending.append(executor.submit(_parse_pulse_batch, batch))
+        while pending:
+            yield from pending.popleft().result()
+
+
+# --- Loading ---
+
+def _delete_file_rows(cursor, placeholder, entry):
+    """Deletes the rows a previously ingested file put into its dataset's tables."""
+    for table, _ in EXTRACTORS[entry.dataset]:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE state = {placeholder} AND year = {placeholder} AND quarter = {placeholder}",
+            (entry.state, entry.year, entry.quarter))
+
+
+def _prepare_full_refresh(cursor, placeholder, datasets):
+    """Empties the tables and manifest rows of the given datasets before a full reload."""
+    for dataset in datasets:
+        for table, _ in EXTRACTORS[dataset]:
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE dataset = {placeholder}", (dataset,))
+
+
+def _remove_files(cursor, connection, placeholder, entries):
+    """Deletes the rows and manifest entries of files that are no longer in the tree."""
+    for entry in entries:
+        _delete_file_rows(cursor, placeholder, entry)
+    delete_manifest_entries(cursor, connection, [entry.path for entry in entries])
+
+
+def ingest_pulse_data(base_path=PULSE_DATA_BASE_PATH, connection=None, datasets=None, max_workers=None,
+                      write_method='executemany', staging=False, batch_size=5000, commit_every=50000,
+                      full_refresh=False, update_rollups=True):
+    """Loads the Pulse dataset into all tables with a single scan and parse of the JSON tree.
+
+    Replaces the nine load_* functions. Uses connect_db() unless a connection is passed in.
+    base_path is the Pulse 'data' folder or a .zip/.tar/.tar.gz archive of it, which is streamed
+    without extracting it (see iter_pulse_archive).
+    Rows are written through a BulkWriter; see bulk_writer for the write methods and staging mode.
+
+    Only files that are new or changed since the last run (per the ingest_manifest table) are
+    loaded. Rows of changed files are replaced, and rows of files that were removed from the tree
+    are deleted. full_refresh=True empties the tables and reloads every file. A file that failed to
+    parse or to write is left out of the manifest, so the next run loads it again.
+    Afterwards the rollup tables fed by the loaded datasets are refreshed (see rollups), and
+    so are the latest period recorded for each table and the planner statistics (see schema_manager).
+    Returns {table: {'loaded': n, 'errors': n}}, or None if no connection could be made.
+    """
+    own_connection = connection is None
+    if own_connection:
+        connection = connect_db()
+        if not connection:
+            return None
+    # Databases created before the manifest existed (or by hand) lack its table
+    create_tables(connection, [MANIFEST_TABLE])
+    datasets = list(datasets or DATASET_PATHS)
+    placeholder = '?' if get_dialect(connection) == 'sqlite' else '%s'
+    parse_errors = Counter()
+    failed_files = set()  # PulseFiles whose rows could not all be parsed or written
+    archive = is_pulse_archive(base_path)
+    status_counts = Counter()
+    stages = Counter()  # stage -> wall seconds, see _record_ingestion_metrics
+    parse_seconds = 0.0
+    run_start = time.perf_counter()
+
+    try:
+        cursor = connection.cursor()
+        with stage_timer(stages, 'scan'):
+            if full_refresh:
+                _prepare_full_refresh(cursor, placeholder, datasets)
+            manifest = {} if full_refresh else load_manifest(connection)
+
+        if archive:
+            print(f"Streaming quarter files from archive '{base_path}'.")
+            seen = set()
+
+            def files_to_load():
+                # Planned file by file as the archive is read; rows of a changed file are deleted
+                # just before its new rows are parsed
+                for source, content in iter_pulse_archive(base_path, datasets):
+                    key = relative_manifest_path(source.path, base_path)
+                    seen.add(key)
+                    entry = manifest.get(key)
+                    status = compare_to_manifest(source, entry, lambda: hashlib.sha256(content).hexdigest())
+                    status_counts[status] += 1
+                    if status == 'touched':
+                        writer.add_rows(MANIFEST_TABLE, [manifest_row(source, base_path, entry.sha256)])
+                    elif status != 'unchanged':
+                        if entry is not None:
+                            _delete_file_rows(cursor, placeholder, entry)
+                        yield source, content
+        else:
+            with stage_timer(stages, 'scan'):
+                files = list(scan_pulse_tree(base_path, datasets))
+                print(f"Found {len(files)} quarter files under '{base_path}'.")
+                plan = plan_ingestion(files, manifest, base_path, datasets)
+            with stage_timer(stages, 'delete'):
+                # Replace rather than upsert, so records that disappeared from a changed file don't linger
+                for _, entry in plan.load:
+                    if entry is not None:
+                        _delete_file_rows(cursor, placeholder, entry)
+                _remove_files(cursor, connection, placeholder, plan.removed)
+            status_counts.update(load=len(plan.load), unchanged=len(plan.unchanged) + len(plan.touched),
+                                 removed=len(plan.removed))
+            print(f"New or changed: {len(plan.load)}, Unchanged: {len(plan.unchanged) + len(plan.touched)}, "
+                  f"Removed: {len(plan.removed)}")
+
+        with BulkWriter(connection, method=write_method, staging=staging,
+                        batch_size=batch_size, commit_every=commit_every) as writer:
+            if archive:
+                results = parse_pulse_stream(files_to_load(), max_workers=max_workers)
+            else:
+                # Content is unchanged, only the recorded mtime needs refreshing
+                writer.add_rows(MANIFEST_TABLE, [manifest_row(source, base_path, entry.sha256)
+                                                 for source, entry in plan.touched])
+                results = parse_pulse_files([source for source, _ in plan.load], max_workers=max_workers)
+            # Time spent waiting for parsed files ('read_parse') vs handing their rows to the writer ('write')
+            for result in timed_iter(results, stages, 'read_parse'):
+                write_start = time.perf_counter()
+                for message in result['messages']:
+                    print(message)
+                parse_errors.update(result['errors'])
+                parse_seconds += result['parse_seconds']
+                _record_file_errors(result)
+                for table, rows in result['rows'].items():
+                    writer.add_rows(table, rows, source=result['source'])
+                # Files that failed are left out of the manifest so the next run retries them
+                if result['failed']:
+                    failed_files.add(result['source'])
+                else:
+                    writer.add_rows(MANIFEST_TABLE, [manifest_row(result['source'], base_path, result['sha256'])])
+                status_counts['failed' if result['failed'] else 'loaded'] += 1
+                stages['write'] += time.perf_counter() - write_start
+            if archive:
+                with stage_timer(stages, 'delete'):
+                    removed = removed_entries(manifest, seen, datasets)
+                    _remove_files(cursor, connection, placeholder, removed)
+                status_counts.update(load=status_counts['new'] + status_counts['changed'],
+                                     removed=len(removed))
+                print(f"New or changed: {status_counts['load']}, "
+                      f"Unchanged: {status_counts['unchanged'] + status_counts['touched']}, "
+                      f"Removed: {len(removed)}")
+            write_start = time.perf_counter()
+        stages['write'] += time.perf_counter() - write_start  # Final flush and commit
+        # A batch can fail after the manifest rows of its files were written, so those are removed
+        # here; a failed file's old manifest row goes too, as its old rows were already deleted
+        write_failed = writer.failed_sources - failed_files
+        status_counts['loaded'] -= len(write_failed)
+        status_counts['failed'] += len(write_failed)
+        for source in write_failed:
+            log_event('ingest_file_error', path=source.path, dataset=source.dataset, error_class='WriteError',
+                      failed=True)
+        failed_files |= write_failed
+        if failed_files:
+            delete_manifest_entries(cursor, connection,
+                                    [relative_manifest_path(source.path, base_path) for source in failed_files])
+            connection.commit()
+            print(f"{len(failed_files)} files failed to load and will be retried on the next run.")
+        cursor.close()
+        if update_rollups and (status_counts['load'] or status_counts['removed']):
+            with stage_timer(stages, 'rollups'):
+                # The periods of failed files may hold part of their rows without any manifest change
+                refresh_rollups(connection, [name for name, rollup in ROLLUPS.items()
+                                             if set(rollup['datasets']) & set(datasets)],
+                                periods={(source.year, source.quarter) for source in failed_files})
+        loaded_tables = [table for dataset in datasets for table, _ in EXTRACTORS[dataset]] + list(ROLLUPS)
+        # A handful of index lookups, so it runs every time and also fills in databases loaded before it existed
+        with stage_timer(stages, 'latest_period'):
+            refresh_latest_periods(connection, loaded_tables)
+        if status_counts['load'] or status_counts['removed']:
+            with stage_timer(stages, 'analyze'):
+                analyze_tables(connection, loaded_tables)
+    finally:
+        if own_connection:
+            connection.close()
+
+    summary = {}
+    for dataset in datasets:
+        for table, _ in EXTRACTORS[dataset]:
+            loaded = writer.loaded[table]
+            errors = parse_errors[table] + writer.errors[table]
+            summary[table] = {'loaded': loaded, 'errors': errors}
+            if writer.errors[table]:
+                METRICS.inc('pulse_ingest_errors_total', writer.errors[table], dataset=dataset, error_class='WriteError')
+            print(f"Finished loading {table} data. Loaded: {loaded}, Errors: {errors}")
+    _record_ingestion_metrics(base_path, summary, stages, parse_seconds, status_counts,
+                              time.perf_counter() - run_start)
+    return summary
+
+
+def _record_file_errors(result):
+    """Counts a parsed file's errors per dataset and class, and logs them with the file's path."""
+    source = result['source']
+    for error_class, count in result['error_classes'].items():
+        METRICS.inc('pulse_ingest_errors_total', count, dataset=source.dataset, error_class=error_class)
+        log_event('ingest_file_error', path=source.path, dataset=source.dataset, error_class=error_class,
+                  count=count, failed=result['failed'], messages=result['messages'][:5])
+
+
+def _record_ingestion_metrics(base_path, summary, stages, parse_seconds, status_counts, seconds):
+    """Publishes the stage timings and counters of an ingestion run, logs it and prints the stage timings.
+
+    Stages: scan (manifest and tree scan), delete (rows of changed and removed files),
+    read_parse (waiting for parsed files; for archives this includes reading them), write (rows
+    handed to the BulkWriter, final flush and commit), rollups, latest_period and analyze.
+    parse_seconds is the parse time summed over the worker processes.
+    """
+    rows = sum(counts['loaded'] for counts in summary.values())
+    files = {'loaded': status_counts['loaded'], 'failed': status_counts['failed'],
+             'unchanged': status_counts['unchanged'] + status_counts['touched'], 'removed': status_counts['removed']}
+    files_per_second = (files['loaded'] + files['failed']) / seconds if seconds else 0.0
+    rows_per_second = rows / seconds if seconds else 0.0
+    for stage, stage_seconds in stages.items():
+        METRICS.set('pulse_ingest_stage_seconds', stage_seconds, stage=stage)
+    METRICS.set('pulse_ingest_stage_seconds', seconds, stage='total')
+    METRICS.set('pulse_ingest_parse_cpu_seconds', parse_seconds)
+    METRICS.set('pulse_ingest_files_per_second', files_per_second)
+    METRICS.set('pulse_ingest_rows_per_second', rows_per_second)
+    METRICS.set('pulse_ingest_last_run_timestamp_seconds', time.time())
+    for outcome, count in files.items():
+        METRICS.inc('pulse_ingest_files_total', count, outcome=outcome)
+    for table, counts in summary.items():
+        METRICS.inc('pulse_ingest_rows_total', counts['loaded'], table=table)
+    log_event('ingest_run', base_path=base_path, seconds=round(seconds, 3),
+              stages={stage: round(stage_seconds, 3) for stage, stage_seconds in stages.items()},
+              parse_cpu_seconds=round(parse_seconds, 3), files=files, rows=rows,
+              files_per_second=round(files_per_second, 1), rows_per_second=round(rows_per_second, 1),
+              errors={table: counts['errors'] for table, counts in summary.items() if counts['errors']})
+    print(f"Ingestion took {seconds:.2f}s ({files_per_second:.0f} files/s, {rows_per_second:.0f} rows/s): "
+          + ", ".join(f"{stage} {stage_seconds:.2f}s" for stage, stage_seconds in stages.items())
+          + f"; parsing used {parse_seconds:.2f}s of worker time")
+    flush_metrics()
+
+
+def main(argv=None):
+    """Command-line entry point: python pulse_ingestion.py [--full-refresh] [--local-db PATH] ..."""
+    parser = argparse.ArgumentParser(description="Load the PhonePe Pulse JSON tree into phonepe_pulse_db.")
+    parser.add_argument('--base-path', default=PULSE_DATA_BASE_PATH,
+                        help="Path to the Pulse 'data' folder, or a .zip/.tar/.tar.gz archive of it")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Ignore the manifest, empty the tables and reload every file")
+    parser.add_argument('--local-db', metavar='PATH', help="Load into a local SQLite database instead of MySQL")
+    parser.add_argument('--workers', type=int, default=None, help="Number of parser processes")
+    parser.add_argument('--write-method', choices=WRITE_METHODS, default='executemany')
+    parser.add_argument('--staging', action='store_true', help="Load through staging tables and merge")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--commit-every', type=int, default=50000)
+    parser.add_argument('--skip-rollups', action='store_true', help="Don't refresh the rollup tables afterwards")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_from_args(args)
+
+    connection = connect_local_db(args.local_db) if args.local_db else None
+    try:
+        with profile_run('ingest'):
+            ingest_pulse_data(args.base_path, connection=connection, max_workers=args.workers,
+                              write_method=args.write_method, staging=args.staging,
+                              batch_size=args.batch_size, commit_every=args.commit_every,
+                              full_refresh=args.full_refresh, update_rollups=not args.skip_rollups)
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import bisect
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Metrics, structured logs and profiling ---
+# One process-wide MetricsRegistry (METRICS) collects counters, gauges and latency histograms
+# from the ingestion, the SQL runner, the analyses, the dashboard and the JSON API:
+#   pulse_ingest_*            - per-stage timings, files/rows per second, errors per class
+#   pulse_query_seconds       - sql_runner latency per query
+#   pulse_analysis_seconds    - analysis_api latency per analysis (cache misses)
+#   pulse_chart_*_seconds     - dashboard load and render time per chart
+#   pulse_http_request_seconds - analysis_service latency per endpoint
+# They are exported in the Prometheus text format: written to a file (for node_exporter's
+# textfile collector or a quick look) and served by analysis_service at /metrics.
+#
+# log_event() writes one JSON object per line with the details metrics can't carry, such as the
+# source path of every file that failed. profile_run() wraps a run in cProfile and dumps a .prof
+# file (view with python -m pstats or snakeviz).
+#
+# Everything is off until configured, through configure_metrics(), the --metrics-log,
+# --metrics-file and --cprofile options of the command-line tools, or these environment variables:
+METRICS_LOG_ENV = 'PULSE_METRICS_LOG'  # JSON log file, '-' for stderr
+METRICS_FILE_ENV = 'PULSE_METRICS_FILE'  # Prometheus text file
+PROFILE_DIR_ENV = 'PULSE_PROFILE_DIR'  # Folder for cProfile dumps
+
+# Histogram buckets in seconds, from a cached lookup to a slow full refresh
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+METRIC_HELP = {
+    'pulse_ingest_stage_seconds': "Wall time of each stage of the last ingestion run",
+    'pulse_ingest_parse_cpu_seconds': "Time the parser processes spent parsing during the last ingestion run",
+    'pulse_ingest_files_per_second': "Files loaded per second in the last ingestion run",
+    'pulse_ingest_rows_per_second': "Rows written per second in the last ingestion run",
+    'pulse_ingest_last_run_timestamp_seconds': "Unix time the last ingestion run finished",
+    'pulse_ingest_files_total': "Quarter files seen by the ingestion, by outcome",
+    'pulse_ingest_rows_total': "Rows written by the ingestion, by table",
+    'pulse_ingest_errors_total': "Ingestion errors by dataset and error class",
+    'pulse_query_seconds': "Latency of the queries run by sql_runner",
+    'pulse_analysis_seconds': "Latency of analysis queries that missed the result cache",
+    'pulse_analysis_cache_total': "Analysis result cache lookups, by result",
+    'pulse_chart_load_seconds': "Time to load the data of a dashboard chart",
+    'pulse_chart_render_seconds': "Time to render (or fetch from the figure cache) a dashboard chart",
+    'pulse_http_request_seconds': "Latency of analysis_service requests",
+}
+
+_config = {'log_path': None, 'metrics_path': None, 'profile_dir': None}
+_log_lock = threading.Lock()
+
+
+def configure_metrics(log_path=None, metrics_path=None, profile_dir=None):
+    """Turns on JSON logs, the Prometheus text file and cProfile dumps; None falls back to the environment."""
+    _config['log_path'] = log_path or os.environ.get(METRICS_LOG_ENV)
+    _config['metrics_path'] = metrics_path or os.environ.get(METRICS_FILE_ENV)
+    _config['profile_dir'] = profile_dir or os.environ.get(PROFILE_DIR_ENV)
+
+
+def add_metrics_arguments(parser):
+    """Adds the --metrics-log, --metrics-file and --cprofile options to an argparse parser."""
+    parser.add_argument('--metrics-log', metavar='PATH', help="Append structured JSON logs here ('-' for stderr)")
+    parser.add_argument('--metrics-file', metavar='PATH', help="Write metrics in the Prometheus text format here")
+    parser.add_argument('--cprofile', metavar='DIR', help="Profile the run with cProfile and save the stats in DIR")
+
+
+def configure_from_args(args):
+    """Configures metrics from the options added by add_metrics_arguments."""
+    configure_metrics(args.metrics_log, args.metrics_file, args.cprofile)
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_key, extra=()):
+    pairs = [*label_key, *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms with labels, exportable as Prometheus text."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}  # name -> {label key: value}
+        self._gauges = {}
+        self._histograms = {}  # name -> {label key: [bucket counts..., sum, count]}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Adds value to a counter."""
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Sets a gauge."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        """Records one observation in a histogram."""
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.setdefault(_label_key(labels), [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, seconds)  # First bucket with bound >= seconds
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += seconds
+            state[-1] += 1
+
+    def value(self, name, **labels):
+        """Returns the current value of a counter or gauge, or None if it was never set."""
+        key = _label_key(labels)
+        with self._lock:
+            for series in (self._counters.get(name, {}), self._gauges.get(name, {})):
+                if key in series:
+                    return series[key]
+        return None
+
+    def labels(self, name):
+        """Returns the label sets ({label: value}) a counter or gauge has values for."""
+        with self._lock:
+            keys = [*self._counters.get(name, {}), *self._gauges.get(name, {})]
+        return [dict(key) for key in keys]
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the with block into a histogram. Yields a dict whose 'seconds' is set on exit."""
+        timing = {'seconds': None}
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing['seconds'] = time.perf_counter() - start
+            self.observe(name, timing['seconds'], **labels)
+
+    def snapshot(self):
+        """Returns every series as plain dicts: {'counters', 'gauges', 'histograms'}."""
+        with self._lock:
+            return {
+                'counters': {name: dict(series) for name, series in self._counters.items()},
+                'gauges': {name: dict(series) for name, series in self._gauges.items()},
+                'histograms': {name: {key: list(state) for key, state in series.items()}
+                               for name, series in self._histograms.items()},
+            }
+
+    def to_prometheus(self):
+        """Returns every series in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def header(name, kind):
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for kind in ('counters', 'gauges'):
+            for name, series in sorted(snapshot[kind].items()):
+                header(name, 'counter' if kind == 'counters' else 'gauge')
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_number(value)}")
+        for name, series in sorted(snapshot['histograms'].items()):
+            header(name, 'histogram')
+            for key, state in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {state[-1]}")
+                lines.append(f"{name}_sum{_format_labels(key)} {state[-2]!r}")
+                lines.append(f"{name}_count{_format_labels(key)} {state[-1]}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Writes to_prometheus() to path atomically, so a collector never reads half a file."""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def clear(self):
+        """Drops every series."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+def log_event(event, **fields):
+    """Writes one structured log line: {"ts", "event", **fields} as JSON. Does nothing unless configured."""
+    path = _config['log_path']
+    if not path:
+        return
+    line = json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, default=str)
+    with _log_lock:
+        if path == '-':
+            print(line, file=sys.stderr)
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def flush_metrics():
+    """Writes the Prometheus text file if one is configured. Returns its path or None."""
+    path = _config['metrics_path']
+    if path:
+        METRICS.write_prometheus(path)
+    return path
+
+
+@contextmanager
+def stage_timer(times, stage):
+    """Adds the wall time of the with block to times[stage]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[stage] += time.perf_counter() - start
+
+
+def timed_iter(iterable, times, stage):
+    """Yields from iterable, adding the time spent waiting for each item to times[stage]."""
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            times[stage] += time.perf_counter() - start
+            return
+        times[stage] += time.perf_counter() - start
+        yield item
+
+
+@contextmanager
+def profile_run(name):
+    """Profiles the with block with cProfile when a profile folder is configured, else does nothing.
+
+    The stats are saved as <profile_dir>/<name>-<timestamp>.prof and the path is logged.
+    """
+    profile_dir = _config['profile_dir']
+    if not profile_dir:
+        yield None
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        print(f"cProfile stats written to '{path}'")
+        log_event('profile', name=name, path=path)
+
+
+configure_metrics()
@@ -0,0 +1,262 @@
+import sqlite3
+
+# --- Table layout of phonepe_pulse_db ---
+# For every table: the column order used by the loaders, and the unique key the
+# ON DUPLICATE KEY UPDATE upserts rely on. Non-key columns are the ones updated on conflict.
+TABLES = {
+    'Aggregated_transaction': {
+        'columns': ['state', 'year', 'quarter', 'transaction_type', 'transaction_count', 'transaction_amount'],
+        'key': ['state', 'year', 'quarter', 'transaction_type'],
+    },
+    'Aggregated_user': {
+        'columns': ['state', 'year', 'quarter', 'registered_users', 'app_opens', 'timestamp'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'users_by_device': {
+        'columns': ['state', 'year', 'quarter', 'brand_name', 'count', 'percentage', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'brand_name'],
+    },
+    'Aggregated_insurance': {
+        'columns': ['state', 'year', 'quarter', 'insurance_type', 'premium_count', 'premium_amount'],
+        'key': ['state', 'year', 'quarter', 'insurance_type'],
+    },
+    'Map_transaction': {
+        'columns': ['state', 'year', 'quarter', 'district', 'transaction_count', 'transaction_amount'],
+        'key': ['state', 'year', 'quarter', 'district'],
+    },
+    'Map_user': {
+        'columns': ['state', 'year', 'quarter', 'district', 'registered_users', 'app_opens'],
+        'key': ['state', 'year', 'quarter', 'district'],
+    },
+    'Map_insurance': {
+        'columns': ['state', 'year', 'quarter', 'district', 'premium_count', 'premium_amount'],
+        'key': ['state', 'year', 'quarter', 'district'],
+    },
+    'top_transaction_districts_data': {
+        'columns': ['state', 'year', 'quarter', 'district_name', 'metric_type', 'count', 'amount', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'district_name'],
+    },
+    'top_transaction_pincodes_data': {
+        'columns': ['state', 'year', 'quarter', 'pincode', 'metric_type', 'count', 'amount', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'pincode'],
+    },
+    'top_user_districts_data': {
+        'columns': ['state', 'year', 'quarter', 'district_name', 'registered_users', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'district_name'],
+    },
+    'top_user_pincodes_data': {
+        'columns': ['state', 'year', 'quarter', 'pincode', 'registered_users', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'pincode'],
+    },
+    'top_insurance_districts_data': {
+        'columns': ['state', 'year', 'quarter', 'district_name', 'metric_type', 'count', 'amount', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'district_name'],
+    },
+    'top_insurance_pincodes_data': {
+        'columns': ['state', 'year', 'quarter', 'pincode', 'metric_type', 'count', 'amount', 'timestamp'],
+        'key': ['state', 'year', 'quarter', 'pincode'],
+    },
+}
+
+# Bookkeeping tables that live next to the Pulse tables
+SUPPORT_TABLES = {
+    # One row per ingested quarter file, used to load only new or changed files
+    'ingest_manifest': {
+        'columns': ['path', 'dataset', 'state', 'year', 'quarter', 'size', 'mtime_ns', 'sha256'],
+        'key': ['path'],
+    },
+    # Signature of the source data each rollup period was last built from
+    'rollup_refresh_log': {
+        'columns': ['rollup_name', 'year', 'quarter', 'signature'],
+        'key': ['rollup_name', 'year', 'quarter'],
+    },
+    # Most recent (year, quarter) of every Pulse and rollup table, kept current by the ingestion
+    'latest_period': {
+        'columns': ['table_name', 'year', 'quarter'],
+        'key': ['table_name'],
+    },
+}
+
+# Pre-aggregated state x year x quarter summaries of the district- and pincode-level tables
+# (the Aggregated_* tables and users_by_device are already at state x period x category grain)
+ROLLUP_TABLES = {
+    'rollup_map_transaction': {
+        'columns': ['state', 'year', 'quarter', 'transaction_count', 'transaction_amount'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'rollup_map_user': {
+        'columns': ['state', 'year', 'quarter', 'registered_users', 'app_opens'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'rollup_map_insurance': {
+        'columns': ['state', 'year', 'quarter', 'premium_count', 'premium_amount'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'rollup_top_transaction': {
+        'columns': ['state', 'year', 'quarter', 'count', 'amount'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'rollup_top_user': {
+        'columns': ['state', 'year', 'quarter', 'registered_users'],
+        'key': ['state', 'year', 'quarter'],
+    },
+    'rollup_top_insurance': {
+        'columns': ['state', 'year', 'quarter', 'count', 'amount'],
+        'key': ['state', 'year', 'quarter'],
+    },
+}
+
+# Secondary indexes, matched to the filters and groupings of the analysis queries. The unique key
+# (state, year, quarter, ...) already serves lookups by state; these serve lookups by period
+# (year = ? AND quarter = ?, the latest-period queries, year-over-year joins) and by category.
+# Index names get the table name as prefix: ix_<table>_<name>.
+INDEXES = {
+    'Aggregated_transaction': {'state_type': ['state', 'transaction_type', 'year', 'quarter'],
+                               'period': ['year', 'quarter']},
+    'Aggregated_user': {'period': ['year', 'quarter']},
+    'users_by_device': {'brand': ['brand_name', 'year', 'quarter'],
+                        'period': ['year', 'quarter', 'brand_name']},
+    'Aggregated_insurance': {'period': ['year', 'quarter']},
+    'Map_transaction': {'period': ['year', 'quarter', 'state']},
+    'Map_user': {'period': ['year', 'quarter', 'district']},
+    'Map_insurance': {'period': ['year', 'quarter', 'district']},
+    'top_transaction_districts_data': {'period': ['year', 'quarter', 'district_name']},
+    'top_transaction_pincodes_data': {'period': ['year', 'quarter', 'pincode']},
+    'top_user_districts_data': {'period': ['year', 'quarter', 'district_name']},
+    'top_user_pincodes_data': {'period': ['year', 'quarter', 'pincode']},
+    'top_insurance_districts_data': {'period': ['year', 'quarter', 'district_name']},
+    'top_insurance_pincodes_data': {'period': ['year', 'quarter', 'pincode']},
+    'ingest_manifest': {'dataset': ['dataset', 'year', 'quarter']},
+    **{table_name: {'period': ['year', 'quarter']} for table_name in ROLLUP_TABLES},
+}
+
+# SQL type of every column name used above (valid for both MySQL and SQLite)
+COLUMN_TYPES = {
+    'state': 'VARCHAR(100)',
+    'year': 'INT',
+    'quarter': 'INT',
+    'transaction_type': 'VARCHAR(100)',
+    'insurance_type': 'VARCHAR(100)',
+    'brand_name': 'VARCHAR(100)',
+    'district': 'VARCHAR(150)',
+    'district_name': 'VARCHAR(150)',
+    'pincode': 'VARCHAR(10)',
+    'metric_type': 'VARCHAR(20)',
+    'transaction_count': 'BIGINT',
+    'transaction_amount': 'DOUBLE',
+    'premium_count': 'BIGINT',
+    'premium_amount': 'DOUBLE',
+    'registered_users': 'BIGINT',
+    'app_opens': 'BIGINT',
+    'count': 'BIGINT',
+    'amount': 'DOUBLE',
+    'percentage': 'DOUBLE',
+    'timestamp': 'BIGINT',
+    'path': 'VARCHAR(500)',
+    'dataset': 'VARCHAR(50)',
+    'size': 'BIGINT',
+    'mtime_ns': 'BIGINT',
+    'sha256': 'CHAR(64)',
+    'rollup_name': 'VARCHAR(64)',
+    'signature': 'CHAR(64)',
+    'table_name': 'VARCHAR(64)',
+}
+
+PLACEHOLDERS = {'mysql': '%s', 'sqlite': '?'}
+
+
+def get_dialect(connection):
+    """Returns 'sqlite' for a sqlite3 connection and 'mysql' for anything else."""
+    return 'sqlite' if isinstance(connection, sqlite3.Connection) else 'mysql'
+
+
+def get_table(table_name):
+    """Returns the columns/key definition of a Pulse, bookkeeping or rollup table."""
+    for tables in (TABLES, SUPPORT_TABLES, ROLLUP_TABLES):
+        if table_name in tables:
+            return tables[table_name]
+    raise KeyError(table_name)
+
+
+def _upsert_clause(table_name, dialect):
+    """Returns the conflict-handling clause that turns an INSERT into an upsert."""
+    table = get_table(table_name)
+    update_columns = [c for c in table['columns'] if c not in table['key']]
+    if dialect == 'sqlite':
+        return (f"ON CONFLICT ({', '.join(table['key'])}) DO UPDATE SET "
+                f"{', '.join(f'{c} = excluded.{c}' for c in update_columns)}")
+    return f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in update_columns)}"
+
+
+def build_upsert_query(table_name, dialect='mysql', row_count=1):
+    """Builds the INSERT ... ON DUPLICATE KEY UPDATE statement for a table.
+
+    row_count > 1 builds a multi-row VALUES statement taking row_count rows of parameters.
+    """
+    columns = get_table(table_name)['columns']
+    row_placeholders = f"({', '.join([PLACEHOLDERS[dialect]] * len(columns))})"
+    return (
+        f"INSERT INTO {table_name} ({', '.join(columns)}) "
+        f"VALUES {', '.join([row_placeholders] * row_count)} "
+        f"{_upsert_clause(table_name, dialect)}"
+    )
+
+
+def build_merge_query(table_name, staging_table, dialect='mysql'):
+    """Builds the statement that upserts every row of a staging table into its target table."""
+    columns = ', '.join(get_table(table_name)['columns'])
+    # SQLite needs a WHERE clause so ON CONFLICT is not parsed as part of the SELECT
+    where_clause = 'WHERE true ' if dialect == 'sqlite' else ''
+    return (
+        f"INSERT INTO {table_name} ({columns}) "
+        f"SELECT {columns} FROM {staging_table} {where_clause}"
+        f"{_upsert_clause(table_name, dialect)}"
+    )
+
+
+def build_create_table_query(table_name):
+    """Builds a CREATE TABLE IF NOT EXISTS statement with the unique key the upserts need."""
+    table = get_table(table_name)
+    column_definitions = [f"{c} {COLUMN_TYPES[c]}" for c in table['columns']]
+    column_definitions.append(f"UNIQUE ({', '.join(table['key'])})")
+    return f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_definitions)})"
+
+
+def index_name(table_name, name):
+    """Returns the database name of one of a table's secondary indexes."""
+    return f"ix_{table_name}_{name}"
+
+
+def build_create_index_query(table_name, name, dialect='mysql'):
+    """Builds the CREATE INDEX statement of one of a table's secondary indexes.
+
+    MySQL has no CREATE INDEX IF NOT EXISTS, so there the caller checks for the index first.
+    """
+    if_not_exists = 'IF NOT EXISTS ' if dialect == 'sqlite' else ''
+    return (f"CREATE INDEX {if_not_exists}{index_name(table_name, name)} "
+            f"ON {table_name} ({', '.join(INDEXES[table_name][name])})")
+
+
+def _existing_indexes(cursor, dialect):
+    """Returns the set of index names in the current database."""
+    if dialect == 'sqlite':
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    else:
+        cursor.execute("SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_tables(connection, table_names=None):
+    """Creates any of the Pulse, bookkeeping and rollup tables and secondary indexes that do not exist yet."""
+    dialect = get_dialect(connection)
+    table_names = table_names or [*TABLES, *SUPPORT_TABLES, *ROLLUP_TABLES]
+    cursor = connection.cursor()
+    for table_name in table_names:
+        cursor.execute(build_create_table_query(table_name))
+    existing = _existing_indexes(cursor, dialect)
+    for table_name in table_names:
+        for name in INDEXES.get(table_name, {}):
+            if index_name(table_name, name) not in existing:
+                cursor.execute(build_create_index_query(table_name, name, dialect))
+    connection.commit()
+    cursor.close()
@@ -0,0 +1,257 @@
+import json
+import re
+from collections import defaultdict
+from datetime import datetime
+
+from pulse_schema import get_dialect
+
+# --- Query profiling for the SQL runner ---
+# For every query the runner records wall time and rows returned; this module adds the
+# EXPLAIN (or EXPLAIN QUERY PLAN on SQLite) output, rows examined and plan warnings for
+# cartesian products, full table scans and filesorts on large tables.
+#
+# Rows examined is exact on MySQL (difference of the session Handler_read_* counters around the
+# query) and an estimate on SQLite: row counts of the tables the plan scans in full, plus the rows
+# each index lookup reads according to sqlite_stat1 (filled by ANALYZE). When the plan searches an
+# index that has no statistics, rows examined is reported as None rather than guessed.
+
+PROFILE_REPORT_PATH = 'query_profile_report.json'
+
+# Tables with at least this many rows count as "large" for the scan and filesort warnings
+LARGE_TABLE_ROWS = 10000
+
+_HANDLER_READ_COUNTERS = ('Handler_read_first', 'Handler_read_key', 'Handler_read_last', 'Handler_read_next',
+                          'Handler_read_prev', 'Handler_read_rnd', 'Handler_read_rnd_next')
+
+
+def read_handler_counters(connection):
+    """Returns the session Handler_read_* counters on MySQL, or None on other databases."""
+    if get_dialect(connection) != 'mysql':
+        return None
+    cursor = connection.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return counters
+
+
+def fetch_dicts(connection, query):
+    """Runs a statement and returns its rows as dicts keyed by column name."""
+    cursor = connection.cursor()
+    cursor.execute(query)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    cursor.close()
+    return rows
+
+
+def explain_query(connection, query):
+    """Returns the plan of a query as dicts: EXPLAIN QUERY PLAN on SQLite, EXPLAIN on MySQL."""
+    if get_dialect(connection) == 'sqlite':
+        return fetch_dicts(connection, f"EXPLAIN QUERY PLAN {query}")
+    return fetch_dicts(connection, f"EXPLAIN {query}")
+
+
+def find_cartesian_joins(query):
+    """Finds comma-separated FROM lists with no WHERE clause, e.g. 'FROM a, b GROUP BY ...'."""
+    findings = []
+    for match in re.finditer(r'\bFROM\s+(\w+)(?:\s+(?:AS\s+)?\w+)?\s*,\s*(\w+)', query, flags=re.IGNORECASE):
+        rest = query[match.end():]
+        # The FROM list ends at the first clause keyword or closing parenthesis
+        clause = re.search(r'\b(WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT|UNION)\b|\)', rest, flags=re.IGNORECASE)
+        if clause is None or clause.group(1) is None or clause.group(1).upper() != 'WHERE':
+            findings.append((match.group(1), match.group(2)))
+    return findings
+
+
+def table_aliases(query):
+    """Maps every table name and alias in FROM/JOIN clauses to its table name."""
+    aliases = {}
+    # The alias may not be a keyword, or ', col FROM t' in a select list would swallow the FROM
+    keywords = r'(?:FROM|WHERE|GROUP|ORDER|LIMIT|JOIN|ON|UNION|INNER|LEFT)\b'
+    pattern = rf'\b(?:FROM|JOIN|,)\s+(\w+)(?:\s+(?:AS\s+)?(?!{keywords})(\w+))?'
+    for table, alias in re.findall(pattern, query, flags=re.IGNORECASE):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def _sqlite_table_sizes(connection, tables):
+    """Returns {table: row count} for the given tables that exist in the SQLite database."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    existing = {row[0] for row in cursor.fetchall()}
+    sizes = {}
+    for table in tables:
+        if table in existing:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            sizes[table] = cursor.fetchone()[0]
+    cursor.close()
+    return sizes
+
+
+def _sqlite_index_stats(connection):
+    """Returns {index name: [rows in table, rows per value of the first column, of the first two, ...]}.
+
+    Read from sqlite_stat1, so it is empty until ANALYZE has been run.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        cursor.close()
+        return {}
+    cursor.execute("SELECT idx, stat FROM sqlite_stat1 WHERE idx IS NOT NULL")
+    stats = {}
+    for index, stat in cursor.fetchall():
+        stats[index] = [int(value) for value in stat.split() if value.isdigit()]
+    cursor.close()
+    return stats
+
+
+def _sqlite_search_rows(detail, index_stats):
+    """Estimates the rows one SEARCH step reads per lookup, or None when there is nothing to go on."""
+    equalities = len(re.findall(r'(?<![<>!])=\?', detail))
+    if 'INTEGER PRIMARY KEY' in detail:
+        return 1 if equalities else None
+    match = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+    stats = index_stats.get(match.group(1)) if match else None
+    if not stats:
+        return None
+    # ANY(column) is a skip-scan: one lookup per distinct value of a leading column
+    skipped = min(len(re.findall(r'ANY\(\w+\)', detail)), len(stats) - 1)
+    rows = stats[min(skipped + equalities, len(stats) - 1)]
+    return rows * stats[0] // max(stats[skipped], 1)
+
+
+def _analyze_sqlite_plan(connection, query, plan):
+    """Returns (estimated rows examined, warnings) for an EXPLAIN QUERY PLAN result."""
+    aliases = table_aliases(query)
+    sizes = _sqlite_table_sizes(connection, set(aliases.values()))
+    index_stats = _sqlite_index_stats(connection)
+    warnings = []
+    scans_by_parent = defaultdict(list)
+    loops_by_parent = defaultdict(list)  # parent -> rows read per pass of each nested loop, outermost first
+    scanned_large_table = False
+
+    for step in plan:
+        match = re.match(r'(SCAN|SEARCH) (\w+)', step['detail'])
+        if not match or aliases.get(match.group(2)) not in sizes:
+            continue
+        table = aliases[match.group(2)]
+        if match.group(1) == 'SEARCH':
+            loops_by_parent[step['parent']].append(_sqlite_search_rows(step['detail'], index_stats))
+            continue
+        scans_by_parent[step['parent']].append(table)
+        loops_by_parent[step['parent']].append(sizes[table])
+        if sizes[table] >= LARGE_TABLE_ROWS:
+            scanned_large_table = True
+            if 'COVERING INDEX' not in step['detail']:
+                warnings.append(f"Full table scan on {table} ({sizes[table]} rows)")
+
+    for tables in scans_by_parent.values():
+        if len(tables) > 1:
+            # Two full scans in the same loop nest with nothing to look up is a cartesian product
+            warnings.append(f"Cartesian product between {' x '.join(tables)}")
+
+    rows_examined = 0
+    for loops in loops_by_parent.values():
+        if None in loops:
+            rows_examined = None  # An index lookup without statistics: no honest estimate
+            break
+        # Each nested loop runs once per row of the loops around it
+        passes = 1
+        for rows in loops:
+            rows_examined += passes * rows
+            passes *= max(rows, 1)
+
+    if scanned_large_table and any('USE TEMP B-TREE FOR ORDER BY' in step['detail'] for step in plan):
+        warnings.append("Filesort (temp B-tree for ORDER BY) over a large table")
+    return rows_examined, warnings
+
+
+def _analyze_mysql_plan(plan):
+    """Returns (estimated rows examined, warnings) for a MySQL EXPLAIN result."""
+    warnings = []
+    rows_examined = 0
+    for step in plan:
+        table = step.get('table')
+        rows = int(step.get('rows') or 0)
+        extra = step.get('Extra') or ''
+        rows_examined += rows
+        if step.get('type') == 'ALL' and rows >= LARGE_TABLE_ROWS:
+            warnings.append(f"Full table scan on {table} (~{rows} rows)")
+        if 'Using filesort' in extra and rows >= LARGE_TABLE_ROWS:
+            warnings.append(f"Filesort on {table} (~{rows} rows)")
+        if 'Using join buffer' in extra and 'Using where' not in extra and step.get('ref') is None:
+            warnings.append(f"Cartesian product: {table} is joined without a join condition")
+    return rows_examined, warnings
+
+
+def build_profile_entry(connection, query_id, query, rows_returned, wall_time, counters_before,
+                        explain_analyze=False, error=None):
+    """Collects the plan, rows examined and warnings for a query that has just been run."""
+    counters_after = read_handler_counters(connection)
+    dialect = get_dialect(connection)
+    entry = {
+        'query_id': query_id,
+        'query': query,
+        'wall_time_s': round(wall_time, 6),
+        'rows_returned': rows_returned,
+        'rows_examined': None,
+        'rows_examined_source': None,
+        'plan': [],
+        'explain_analyze': None,
+        'warnings': [],
+        'error': error,
+    }
+    if error is not None:
+        return entry
+
+    try:
+        if dialect == 'sqlite':
+            entry['plan'] = explain_query(connection, query)
+            entry['rows_examined'], entry['warnings'] = _analyze_sqlite_plan(connection, query, entry['plan'])
+            entry['rows_examined_source'] = 'estimate' if entry['rows_examined'] is not None else None
+        else:
+            entry['plan'] = explain_query(connection, query)
+            estimated_rows, entry['warnings'] = _analyze_mysql_plan(entry['plan'])
+            if counters_before is not None and counters_after is not None:
+                entry['rows_examined'] = sum(counters_after.get(name, 0) - counters_before.get(name, 0)
+                                             for name in _HANDLER_READ_COUNTERS)
+                entry['rows_examined_source'] = 'handler_counters'
+            else:
+                entry['rows_examined'] = estimated_rows
+                entry['rows_examined_source'] = 'estimate'
+            if explain_analyze:
+                # EXPLAIN ANALYZE (MySQL 8.0.18+) runs the query again and returns the timed plan tree
+                entry['explain_analyze'] = '\n'.join(
+                    str(next(iter(row.values()))) for row in fetch_dicts(connection, f"EXPLAIN ANALYZE {query}"))
+    except Exception as e:
+        entry['warnings'].append(f"Could not explain query: {e}")
+
+    # Fall back to a text check when the plan did not already reveal the cartesian product
+    if not any(warning.startswith('Cartesian product') for warning in entry['warnings']):
+        for left, right in find_cartesian_joins(query):
+            entry['warnings'].append(f"Cartesian product: FROM {left}, {right} has no join condition")
+    return entry
+
+
+def write_profile_report(report_path, sql_filepath, entries):
+    """Writes the profile entries and a short summary to a JSON report."""
+    total_time = sum(entry['wall_time_s'] for entry in entries)
+    slowest = sorted(entries, key=lambda entry: entry['wall_time_s'], reverse=True)[:5]
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'sql_file': sql_filepath,
+        'summary': {
+            'queries': len(entries),
+            'total_wall_time_s': round(total_time, 6),
+            'slowest': [{'query_id': e['query_id'], 'wall_time_s': e['wall_time_s']} for e in slowest],
+            'queries_with_warnings': [e['query_id'] for e in entries if e['warnings']],
+        },
+        'queries': entries,
+    }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    return report
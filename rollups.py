@@ -0,0 +1,177 @@
+import hashlib
+from collections import defaultdict
+
+from ingestion_manifest import MANIFEST_TABLE
+from pulse_schema import ROLLUP_TABLES, create_tables, get_dialect
+
+# --- Materialized rollup tables ---
+# Small state x year x quarter summaries of the district/pincode fact tables, so the analysis
+# queries (see phonepe_rollup_queries.sql) read a few hundred rows instead of the full tables.
+#
+# Refresh is incremental per (year, quarter): a period's signature is a hash of the manifest
+# SHA-256s of the files that feed it, and only periods whose signature differs from the one
+# recorded in rollup_refresh_log are rebuilt. Tables loaded without a manifest fall back to a
+# row-count signature taken from the source table.
+
+REFRESH_LOG_TABLE = 'rollup_refresh_log'
+
+# rollup -> the ingestion datasets it depends on, and the SELECT that builds one period of it
+ROLLUPS = {
+    'rollup_map_transaction': {
+        'datasets': ['map/transaction'],
+        'source_tables': ['Map_transaction'],
+        'select': """
+            SELECT state, year, quarter, SUM(transaction_count), SUM(transaction_amount)
+            FROM Map_transaction
+            WHERE year = {p} AND quarter = {p}
+            GROUP BY state, year, quarter""",
+    },
+    'rollup_map_user': {
+        'datasets': ['map/user'],
+        'source_tables': ['Map_user'],
+        'select': """
+            SELECT state, year, quarter, SUM(registered_users), SUM(app_opens)
+            FROM Map_user
+            WHERE year = {p} AND quarter = {p}
+            GROUP BY state, year, quarter""",
+    },
+    'rollup_map_insurance': {
+        'datasets': ['map/insurance'],
+        'source_tables': ['Map_insurance'],
+        'select': """
+            SELECT state, year, quarter, SUM(premium_count), SUM(premium_amount)
+            FROM Map_insurance
+            WHERE year = {p} AND quarter = {p}
+            GROUP BY state, year, quarter""",
+    },
+    'rollup_top_transaction': {
+        'datasets': ['top/transaction'],
+        'source_tables': ['top_transaction_districts_data', 'top_transaction_pincodes_data'],
+        'select': """
+            SELECT state, year, quarter, SUM(count), SUM(amount)
+            FROM (
+                SELECT state, year, quarter, count, amount FROM top_transaction_districts_data
+                WHERE year = {p} AND quarter = {p}
+                UNION ALL
+                SELECT state, year, quarter, count, amount FROM top_transaction_pincodes_data
+                WHERE year = {p} AND quarter = {p}
+            ) AS combined_data
+            GROUP BY state, year, quarter""",
+    },
+    'rollup_top_user': {
+        'datasets': ['top/user'],
+        'source_tables': ['top_user_districts_data', 'top_user_pincodes_data'],
+        'select': """
+            SELECT state, year, quarter, SUM(registered_users)
+            FROM (
+                SELECT state, year, quarter, registered_users FROM top_user_districts_data
+                WHERE year = {p} AND quarter = {p}
+                UNION ALL
+                SELECT state, year, quarter, registered_users FROM top_user_pincodes_data
+                WHERE year = {p} AND quarter = {p}
+            ) AS combined_data
+            GROUP BY state, year, quarter""",
+    },
+    'rollup_top_insurance': {
+        'datasets': ['top/insurance'],
+        'source_tables': ['top_insurance_districts_data', 'top_insurance_pincodes_data'],
+        'select': """
+            SELECT state, year, quarter, SUM(count), SUM(amount)
+            FROM (
+                SELECT state, year, quarter, count, amount FROM top_insurance_districts_data
+                WHERE year = {p} AND quarter = {p}
+                UNION ALL
+                SELECT state, year, quarter, count, amount FROM top_insurance_pincodes_data
+                WHERE year = {p} AND quarter = {p}
+            ) AS combined_data
+            GROUP BY state, year, quarter""",
+    },
+}
+
+
+def _manifest_signatures(cursor, datasets, placeholder):
+    """Returns {(year, quarter): signature} built from the manifest hashes of the given datasets."""
+    cursor.execute(
+        f"SELECT year, quarter, path, sha256 FROM {MANIFEST_TABLE} "
+        f"WHERE dataset IN ({', '.join([placeholder] * len(datasets))})", datasets)
+    hashes = defaultdict(list)
+    for year, quarter, path, sha256 in cursor.fetchall():
+        hashes[(year, quarter)].append(f"{path}:{sha256}")
+    return {period: hashlib.sha256('\n'.join(sorted(entries)).encode('utf-8')).hexdigest()
+            for period, entries in hashes.items()}
+
+
+def _row_count_signatures(cursor, source_tables):
+    """Returns {(year, quarter): signature} from per-period row counts of the source tables."""
+    counts = defaultdict(list)
+    for table in source_tables:
+        cursor.execute(f"SELECT year, quarter, COUNT(*) FROM {table} GROUP BY year, quarter")
+        for year, quarter, row_count in cursor.fetchall():
+            counts[(year, quarter)].append(f"{table}:{row_count}")
+    return {period: hashlib.sha256('\n'.join(sorted(entries)).encode('utf-8')).hexdigest()
+            for period, entries in counts.items()}
+
+
+def _logged_signatures(cursor, rollup_name, placeholder):
+    """Returns {(year, quarter): signature} recorded for a rollup by earlier refreshes."""
+    cursor.execute(f"SELECT year, quarter, signature FROM {REFRESH_LOG_TABLE} WHERE rollup_name = {placeholder}",
+                   (rollup_name,))
+    return {(year, quarter): signature for year, quarter, signature in cursor.fetchall()}
+
+
+def _rebuild_period(cursor, rollup_name, year, quarter, placeholder):
+    """Replaces one (year, quarter) of a rollup table with fresh aggregates from its source tables."""
+    rollup = ROLLUPS[rollup_name]
+    columns = ', '.join(ROLLUP_TABLES[rollup_name]['columns'])
+    select = rollup['select'].format(p=placeholder)
+    cursor.execute(f"DELETE FROM {rollup_name} WHERE year = {placeholder} AND quarter = {placeholder}",
+                   (year, quarter))
+    cursor.execute(f"INSERT INTO {rollup_name} ({columns}) {select}",
+                   (year, quarter) * len(rollup['source_tables']))
+
+
+def refresh_rollups(connection, rollup_names=None, full=False, periods=None):
+    """Brings the rollup tables up to date, rebuilding only the periods whose source data changed.
+
+    full=True rebuilds every period. periods lists (year, quarter) pairs to rebuild even if their
+    signature did not change, e.g. where files failed to load part-way and are not in the manifest.
+    Returns {rollup: number of periods rebuilt or removed}.
+    """
+    placeholder = '?' if get_dialect(connection) == 'sqlite' else '%s'
+    create_tables(connection, list(ROLLUP_TABLES) + [REFRESH_LOG_TABLE])
+    cursor = connection.cursor()
+    refreshed = {}
+    forced = set(periods or ())
+
+    for rollup_name in rollup_names or ROLLUPS:
+        rollup = ROLLUPS[rollup_name]
+        current = _manifest_signatures(cursor, rollup['datasets'], placeholder)
+        if not current:
+            current = _row_count_signatures(cursor, rollup['source_tables'])
+        logged = {} if full else _logged_signatures(cursor, rollup_name, placeholder)
+        if full:
+            cursor.execute(f"DELETE FROM {rollup_name}")
+            cursor.execute(f"DELETE FROM {REFRESH_LOG_TABLE} WHERE rollup_name = {placeholder}", (rollup_name,))
+
+        stale = [period for period, signature in current.items() if logged.get(period) != signature or period in forced]
+        gone = [period for period in logged if period not in current]
+        for year, quarter in stale:
+            _rebuild_period(cursor, rollup_name, year, quarter, placeholder)
+        for year, quarter in gone:
+            cursor.execute(f"DELETE FROM {rollup_name} WHERE year = {placeholder} AND quarter = {placeholder}",
+                           (year, quarter))
+
+        cursor.executemany(
+            f"DELETE FROM {REFRESH_LOG_TABLE} WHERE rollup_name = {placeholder} "
+            f"AND year = {placeholder} AND quarter = {placeholder}",
+            [(rollup_name, year, quarter) for year, quarter in stale + gone])
+        cursor.executemany(
+            f"INSERT INTO {REFRESH_LOG_TABLE} (rollup_name, year, quarter, signature) "
+            f"VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})",
+            [(rollup_name, year, quarter, current[(year, quarter)]) for year, quarter in stale])
+        connection.commit()
+        refreshed[rollup_name] = len(stale) + len(gone)
+        print(f"Refreshed {rollup_name}: {len(stale)} periods rebuilt, {len(gone)} removed")
+
+    cursor.close()
+    return refreshed
@@ -0,0 +1,289 @@
+import argparse
+import re
+
+from pulse_db import connect_db, connect_local_db
+from pulse_schema import INDEXES, ROLLUP_TABLES, TABLES, build_upsert_query, create_tables, get_dialect, get_table
+from query_profiler import explain_query, table_aliases
+from sql_runner import read_sql_file
+
+# --- Schema management for phonepe_pulse_db ---
+# create_schema() builds the Pulse, bookkeeping and rollup tables with their secondary indexes
+# (see pulse_schema.INDEXES) and, on MySQL, can partition the district/pincode tables by year.
+#
+# The latest_period table holds the most recent (year, quarter) of every table. The ingestion
+# refreshes it after each run, so "latest period" queries look it up instead of finding the
+# latest period in the fact table, and filter with year = ? AND quarter = ?, which MySQL can
+# answer from the period index (it rarely uses an index for a (year, quarter) = (...) comparison).
+# sql_runner fills in the tables a query file looks up that have no row yet (ensure_latest_periods).
+#
+# check_index_usage() runs EXPLAIN over a query file and reports, per query and table, whether
+# the table is read through an index seek, a full index scan or a full table scan.
+
+LATEST_PERIOD_TABLE = 'latest_period'
+
+# District/pincode tables that can be RANGE-partitioned by year on MySQL. Their unique keys
+# include year, as MySQL requires for every unique key of a partitioned table.
+PARTITIONED_TABLES = ['Map_transaction', 'Map_user', 'Map_insurance',
+                      'top_transaction_districts_data', 'top_transaction_pincodes_data',
+                      'top_user_districts_data', 'top_user_pincodes_data',
+                      'top_insurance_districts_data', 'top_insurance_pincodes_data']
+
+# Catch-all partition for years beyond the last explicit one
+FUTURE_PARTITION = 'p_future'
+
+
+# --- Latest period metadata ---
+
+def refresh_latest_periods(connection, table_names=None):
+    """Records the most recent (year, quarter) of each table in latest_period.
+
+    Each lookup is an ORDER BY year DESC, quarter DESC LIMIT 1, answered from the period index.
+    Tables without rows are removed from latest_period. Returns {table: (year, quarter) or None}.
+    """
+    create_tables(connection, [LATEST_PERIOD_TABLE])
+    dialect = get_dialect(connection)
+    placeholder = '?' if dialect == 'sqlite' else '%s'
+    table_names = list(table_names or [*TABLES, *ROLLUP_TABLES])
+    latest = {}
+    cursor = connection.cursor()
+    try:
+        for table_name in table_names:
+            cursor.execute(f"SELECT year, quarter FROM {table_name} ORDER BY year DESC, quarter DESC LIMIT 1")
+            row = cursor.fetchone()
+            latest[table_name] = tuple(row) if row else None
+        rows = [(table_name, *period) for table_name, period in latest.items() if period is not None]
+        if rows:
+            cursor.executemany(build_upsert_query(LATEST_PERIOD_TABLE, dialect), rows)
+        empty = [(table_name,) for table_name, period in latest.items() if period is None]
+        if empty:
+            cursor.executemany(f"DELETE FROM {LATEST_PERIOD_TABLE} WHERE table_name = {placeholder}", empty)
+        connection.commit()
+    finally:
+        cursor.close()
+    return latest
+
+
+def ensure_latest_periods(connection, table_names):
+    """Records the latest period of those of table_names that latest_period has no row for, e.g.
+    in a database loaded before the table existed. Returns the tables that were looked up."""
+    create_tables(connection, [LATEST_PERIOD_TABLE])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT table_name FROM {LATEST_PERIOD_TABLE}")
+        recorded = {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+    missing = [table_name for table_name in dict.fromkeys(table_names) if table_name not in recorded]
+    if missing:
+        refresh_latest_periods(connection, missing)
+    return missing
+
+
+def latest_period_condition(table_name):
+    """Returns a WHERE condition selecting a table's latest period as recorded in latest_period."""
+    lookup = f"FROM {LATEST_PERIOD_TABLE} WHERE table_name = '{table_name}'"
+    return f"year = (SELECT year {lookup}) AND quarter = (SELECT quarter {lookup})"
+
+
+def analyze_tables(connection, table_names=None):
+    """Refreshes the planner's table and index statistics (ANALYZE), so it picks the indexes above.
+
+    Without statistics SQLite guesses, and e.g. drives the year-over-year join of query 4.1 from
+    the wrong side. Run after loads that change the data noticeably.
+    """
+    table_names = list(table_names or [*TABLES, *ROLLUP_TABLES])
+    cursor = connection.cursor()
+    try:
+        if get_dialect(connection) == 'sqlite':
+            for table_name in table_names:
+                cursor.execute(f"ANALYZE {table_name}")
+        else:
+            cursor.execute(f"ANALYZE TABLE {', '.join(table_names)}")
+            cursor.fetchall()
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+# --- Partitioning (MySQL only) ---
+
+def _partition_definition(year):
+    return f"PARTITION p{year} VALUES LESS THAN ({year + 1})"
+
+
+def build_partition_query(table_name, years):
+    """Builds the ALTER TABLE that RANGE-partitions a table with one partition per year."""
+    partitions = [_partition_definition(year) for year in sorted(years)]
+    partitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return f"ALTER TABLE {table_name} PARTITION BY RANGE (year) ({', '.join(partitions)})"
+
+
+def build_add_partitions_query(table_name, years):
+    """Builds the ALTER TABLE that splits new year partitions off the catch-all partition."""
+    partitions = [_partition_definition(year) for year in sorted(years)]
+    partitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    return f"ALTER TABLE {table_name} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(partitions)})"
+
+
+def _partitioned_years(cursor, table_name):
+    """Returns the years a table has partitions for, or None if it is not partitioned."""
+    cursor.execute("SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                   "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table_name,))
+    names = [row[0] for row in cursor.fetchall()]
+    if not names or names == [None]:
+        return None
+    return {int(name[1:]) for name in names if re.fullmatch(r'p\d{4}', name)}
+
+
+def _data_years(cursor, table_names):
+    """Returns every year present in the given tables."""
+    years = set()
+    for table_name in table_names:
+        cursor.execute(f"SELECT DISTINCT year FROM {table_name}")
+        years.update(row[0] for row in cursor.fetchall())
+    return years
+
+
+def partition_by_year(connection, years=None, table_names=None):
+    """RANGE-partitions the district/pincode tables by year on MySQL, one partition per year.
+
+    years defaults to every year in the data plus the next one. Tables that are already
+    partitioned only get partitions for the years they are missing (split off p_future), so it
+    is safe to run before each new year's data arrives. Does nothing on SQLite.
+    Returns {table: years added}.
+    """
+    if get_dialect(connection) != 'mysql':
+        print("Partitioning is only supported on MySQL; skipping.")
+        return {}
+    table_names = list(table_names or PARTITIONED_TABLES)
+    cursor = connection.cursor()
+    added = {}
+    try:
+        if years is None:
+            years = _data_years(cursor, table_names)
+            years.add(max(years) + 1 if years else 2018)
+        for table_name in table_names:
+            existing = _partitioned_years(cursor, table_name)
+            if existing is None:
+                cursor.execute(build_partition_query(table_name, years))
+                added[table_name] = sorted(years)
+                continue
+            # REORGANIZE can only split the catch-all partition, so only years above the last one are added
+            new_years = sorted(year for year in years if year > max(existing, default=0))
+            if new_years:
+                cursor.execute(build_add_partitions_query(table_name, new_years))
+            added[table_name] = new_years
+    finally:
+        cursor.close()
+    for table_name, table_years in added.items():
+        print(f"Partitioned {table_name} by year: {len(table_years)} partition(s) added")
+    return added
+
+
+def create_schema(connection, partition=False, years=None):
+    """Creates every table and index that is missing, optionally partitions by year, and refreshes
+    latest_period and the planner statistics."""
+    create_tables(connection)
+    if partition:
+        partition_by_year(connection, years)
+    refresh_latest_periods(connection)
+    analyze_tables(connection)
+
+
+# --- EXPLAIN-based index check ---
+
+def _sqlite_table_access(step, aliases):
+    """Returns (table, access, index) for an EXPLAIN QUERY PLAN step that reads a table, else None."""
+    match = re.match(r'(SCAN|SEARCH) (\w+)(?: USING (?:(COVERING) )?INDEX (\w+))?', step['detail'])
+    if not match or aliases.get(match.group(2)) is None:
+        return None
+    verb, name, covering, index = match.groups()
+    if verb == 'SEARCH':
+        access = 'index seek'
+    elif index is not None:
+        access = 'covering index scan' if covering else 'index scan'
+    else:
+        access = 'full scan'
+    return aliases[name], access, index
+
+
+def _mysql_table_access(step, aliases):
+    """Returns (table, access, index) for a MySQL EXPLAIN row that reads a table, else None."""
+    table = aliases.get(step.get('table'))
+    if table is None:
+        return None
+    access_type = step.get('type')
+    if access_type == 'ALL':
+        access = 'full scan'
+    elif access_type == 'index':
+        access = 'covering index scan' if 'Using index' in (step.get('Extra') or '') else 'index scan'
+    else:
+        access = 'index seek'  # const, eq_ref, ref, range, ...
+    return table, access, step.get('key')
+
+
+def check_index_usage(connection, sql_filepath='phonepe_analysis_queries.sql'):
+    """EXPLAINs every query of a .sql file and reports how each table is accessed.
+
+    Returns a list of {'query_id', 'table', 'access', 'index'} with access one of 'index seek',
+    'covering index scan', 'index scan' or 'full scan'. Derived tables and subquery results are
+    left out; only Pulse, bookkeeping and rollup tables are reported.
+    """
+    dialect = get_dialect(connection)
+    table_access = _sqlite_table_access if dialect == 'sqlite' else _mysql_table_access
+    report = []
+    for query_id, query in read_sql_file(sql_filepath):
+        aliases = {}
+        for name, table_name in table_aliases(query).items():
+            try:
+                get_table(table_name)
+            except KeyError:
+                continue
+            aliases[name] = table_name
+        try:
+            plan = explain_query(connection, query)
+        except Exception as e:
+            print(f"Could not explain query {query_id}: {e}")
+            continue
+        for step in plan:
+            access = table_access(step, aliases)
+            if access is not None:
+                table_name, how, index = access
+                report.append({'query_id': query_id, 'table': table_name, 'access': how, 'index': index})
+    return report
+
+
+def print_index_report(report):
+    """Prints check_index_usage results, one line per table access."""
+    for entry in report:
+        index = f" ({entry['index']})" if entry['index'] else ''
+        print(f"Query {entry['query_id']:<5} {entry['table']:<32} {entry['access']}{index}")
+    full_scans = [entry for entry in report if entry['access'] == 'full scan']
+    print(f"\n{len(report)} table accesses, {len(full_scans)} full table scan(s)"
+          + (f": {', '.join(sorted({entry['query_id'] for entry in full_scans}))}" if full_scans else ""))
+
+
+def main(argv=None):
+    """Command-line entry point: python schema_manager.py [--local-db PATH] [--partition] [--check [SQL_FILE]]"""
+    parser = argparse.ArgumentParser(description="Create, index and check the phonepe_pulse_db schema.")
+    parser.add_argument('--local-db', metavar='PATH', help="Use a local SQLite database instead of MySQL")
+    parser.add_argument('--partition', action='store_true', help="RANGE-partition the map/top tables by year (MySQL)")
+    parser.add_argument('--check', nargs='?', const='phonepe_analysis_queries.sql', metavar='SQL_FILE',
+                        help="Report index use of the queries in SQL_FILE with EXPLAIN")
+    args = parser.parse_args(argv)
+
+    connection = connect_local_db(args.local_db) if args.local_db else connect_db()
+    if not connection:
+        return
+    try:
+        create_schema(connection, partition=args.partition)
+        print(f"Schema is up to date: {len(TABLES)} Pulse tables, "
+              f"{sum(len(indexes) for indexes in INDEXES.values())} secondary indexes")
+        if args.check:
+            print_index_report(check_index_usage(connection, args.check))
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import argparse
+import functools
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+
+from pulse_db import DB_CONFIG, connect_local_db, mysql
+from pulse_metrics import METRICS, add_metrics_arguments, configure_from_args, flush_metrics, log_event, profile_run
+from query_profiler import PROFILE_REPORT_PATH, build_profile_entry, read_handler_counters, write_profile_report
+
+# Rows fetched per round trip when streaming a result set
+FETCH_CHUNK_SIZE = 10000
+
+# A "latest period" lookup in a query, see schema_manager; group 1 is the table looked up
+LATEST_PERIOD_LOOKUP = re.compile(r"FROM\s+latest_period\s+WHERE\s+table_name\s*=\s*'(\w+)'", re.IGNORECASE)
+
+
+def connect_mysql():
+    """Opens a new MySQL connection with DB_CONFIG (the runner's default connection factory)."""
+    if mysql is None:
+        raise ImportError("mysql-connector-python is not installed")
+    return mysql.connector.connect(**DB_CONFIG)
+
+
+def split_sql_queries(sql_script):
+    """Splits a SQL script into (query_id, query) pairs.
+
+    query_id is taken from the '-- Query X.Y:' comment in front of each statement,
+    or falls back to the statement's position in the file.
+    """
+    script = re.sub(r'/\*.*?\*/', '', sql_script, flags=re.DOTALL)  # Remove multi-line comments
+    queries = []
+    label, lines = None, []
+    for line in script.splitlines():
+        # Remove the single-line comment before looking for ';', so a ';' in a comment doesn't end a statement
+        code, _, comment = line.partition('--')
+        match = re.match(r'\s*Query\s+([\w.]+)', comment)
+        if match and not code.strip():
+            label = match.group(1)
+        *statement_ends, rest = code.split(';')
+        for part in statement_ends:
+            query = '\n'.join([*lines, part]).strip()
+            if query:
+                queries.append((label or str(len(queries) + 1), query))
+            label, lines = None, []
+        lines.append(rest)
+    query = '\n'.join(lines).strip()
+    if query:
+        queries.append((label or str(len(queries) + 1), query))
+    return queries
+
+
+def read_sql_file(sql_filepath):
+    """Reads a .sql file and returns its (query_id, query) pairs."""
+    with open(sql_filepath, 'r', encoding='utf-8') as f:
+        return split_sql_queries(f.read())
+
+
+class ConnectionPool:
+    """Keeps up to `size` open connections from a factory and lends them out to threads.
+
+    Works with any DB-API connection factory (MySQL or the SQLite stand-in). A connection
+    whose with-block did not finish normally (an error, KeyboardInterrupt, or a generator that
+    was closed while holding it) is closed instead of being returned to the pool.
+    """
+
+    def __init__(self, connection_factory=connect_mysql, size=5):
+        self.connection_factory = connection_factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Borrows a connection for the duration of a with-block."""
+        self._slots.acquire()
+        try:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self.connection_factory()
+            try:
+                yield connection
+            except BaseException:
+                connection.close()
+                raise
+            self._idle.put(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Closes every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def iter_query_chunks(cursor, chunk_size=FETCH_CHUNK_SIZE):
+    """Yields the result of an executed cursor as {column: list of values} chunks of chunk_size rows.
+
+    With an unbuffered cursor (the mysql.connector default) rows are streamed from the server,
+    so only one chunk is held in memory at a time.
+    """
+    columns = [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield dict(zip(columns, map(list, zip(*rows))))
+
+
+def fetch_dataframe(cursor, chunk_size=FETCH_CHUNK_SIZE):
+    """Builds a DataFrame from an executed cursor, fetching in chunks.
+
+    Each chunk is turned into a typed DataFrame right away, so only one chunk of Python row
+    objects is alive at a time; the typed chunks are concatenated at the end.
+    """
+    columns = [column[0] for column in cursor.description]
+    frames = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        frames.append(pd.DataFrame.from_records(rows, columns=columns))
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+@contextmanager
+def borrow_connection(connection_factory=connect_mysql, pool=None):
+    """Yields a pooled connection if a pool is given, otherwise a fresh one that is closed afterwards."""
+    if pool is not None:
+        with pool.connection() as connection:
+            yield connection
+        return
+    connection = connection_factory()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+def execute_sql_query(query, connection_factory=connect_mysql, pool=None):
+    """Runs one query and returns the result as a DataFrame (empty on error)."""
+    try:
+        with borrow_connection(connection_factory, pool) as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query)
+                return fetch_dataframe(cursor)
+            finally:
+                cursor.close()
+    except Exception as e:
+        print(f"An error occurred: {e}\nQuery: {query.strip()[:100]}...")  # Show first 100 chars of query
+    return pd.DataFrame()  # Return empty DataFrame on error
+
+
+def profile_sql_query(query_id, query, connection_factory=connect_mysql, explain_analyze=False, pool=None):
+    """Runs one query and returns (DataFrame, profile entry) with timing, plan and warnings."""
+    with borrow_connection(connection_factory, pool) as connection:
+        counters_before = read_handler_counters(connection)
+        cursor = connection.cursor()
+        error = None
+        start = time.perf_counter()
+        try:
+            cursor.execute(query)
+            df_result = fetch_dataframe(cursor)
+        except Exception as e:
+            df_result = pd.DataFrame()
+            error = str(e)
+        wall_time = time.perf_counter() - start
+        cursor.close()
+        entry = build_profile_entry(connection, query_id, query, len(df_result), wall_time,
+                                    counters_before, explain_analyze=explain_analyze, error=error)
+        return df_result, entry
+
+
+def _growth_engine_result(growth_engine, query_id, query, profile):
+    """Answers a query from the growth engine. Returns (DataFrame, profile entry or None), or None."""
+    start = time.perf_counter()
+    df_result = growth_engine.report_result(query_id)
+    if df_result is None:
+        return None
+    if not profile:
+        return df_result, None
+    return df_result, {'query_id': query_id, 'query': query, 'wall_time_s': round(time.perf_counter() - start, 6),
+                       'rows_returned': len(df_result), 'rows_examined': None, 'rows_examined_source': 'growth_engine',
+                       'plan': [], 'explain_analyze': None, 'warnings': [], 'error': None}
+
+
+def execute_queries_concurrently(queries, pool, max_workers=4, profile=False, explain_analyze=False,
+                                 growth_engine=None):
+    """Runs independent (query_id, query) pairs on a thread pool sharing a connection pool.
+
+    Queries a growth_engine.GrowthEngine answers (the year-over-year ones) are taken from it
+    instead of the database. Each query's latency goes into the pulse_query_seconds histogram.
+    Yields (query_id, query, DataFrame, profile entry or None) in the original order.
+    """
+    def run(item):
+        query_id = item[0]
+        with METRICS.timer('pulse_query_seconds', query_id=query_id) as timing:
+            result = run_query(item)
+        log_event('query', query_id=query_id, seconds=round(timing['seconds'], 6), rows=len(result[2]))
+        return result
+
+    def run_query(item):
+        query_id, query = item
+        if growth_engine is not None:
+            answered = _growth_engine_result(growth_engine, query_id, query, profile)
+            if answered is not None:
+                return (query_id, query) + answered
+        if profile:
+            return (query_id, query) + profile_sql_query(query_id, query, explain_analyze=explain_analyze, pool=pool)
+        return query_id, query, execute_sql_query(query, pool=pool), None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield from executor.map(run, queries)
+
+
+def prepare_latest_periods(queries, pool):
+    """Records the latest period of every table the queries look up in latest_period and that has
+    no row there yet (a database loaded before the table existed), so those queries aren't empty."""
+    table_names = [table_name for _, query in queries for table_name in LATEST_PERIOD_LOOKUP.findall(query)]
+    if not table_names:
+        return
+    from schema_manager import ensure_latest_periods  # schema_manager builds on this module
+    try:
+        with pool.connection() as connection:
+            refreshed = ensure_latest_periods(connection, table_names)
+    except Exception as e:
+        print(f"Could not refresh the latest_period table: {e}")
+        return
+    if refreshed:
+        print(f"Recorded the latest period of {len(refreshed)} table(s) in latest_period.")
+
+
+def load_and_execute_queries_from_file(sql_filepath, connection_factory=connect_mysql, profile=False,
+                                       report_path=PROFILE_REPORT_PATH, explain_analyze=False, max_workers=4,
+                                       growth_engine=False):
+    """Runs every query of a .sql file and prints the results.
+
+    Queries run concurrently on max_workers threads sharing a connection pool, so the whole file
+    takes roughly as long as its slowest query; max_workers=1 runs them one by one.
+    With profile=True each query's wall time, rows returned, EXPLAIN plan, rows examined and
+    plan warnings are collected and written to a JSON report at report_path, which is returned.
+    connection_factory can be swapped for e.g. pulse_db.connect_local_db to run on SQLite.
+    With growth_engine=True the year-over-year queries (4.1, 6.2) are answered from in-memory
+    growth panels; 4.1 then reports the true yearly totals, as in phonepe_rollup_queries.sql.
+    """
+    if not os.path.exists(sql_filepath):
+        print(f"Error: SQL file not found at '{sql_filepath}'")
+        return None
+
+    queries = read_sql_file(sql_filepath)
+    print(f"Found {len(queries)} queries in '{sql_filepath}'. Executing them on {max_workers} worker(s)...\n")
+
+    pool = ConnectionPool(connection_factory, size=max_workers)
+    prepare_latest_periods(queries, pool)
+    engine, engine_queries = None, {}
+    if growth_engine:
+        from growth_engine import REPORT_QUERIES as engine_queries, GrowthEngine  # growth_engine builds on this module
+        engine = GrowthEngine(connection_factory, pool=pool)
+    profile_entries = []
+    try:
+        for query_id, query, df_result, entry in execute_queries_concurrently(
+                queries, pool, max_workers, profile=profile, explain_analyze=explain_analyze, growth_engine=engine):
+            print(f"--- Executing Query {query_id} ---")
+            if engine is not None and query_id in engine_queries:
+                print("Answered by the growth engine instead of the query below.")
+            print(f"Query:\n{query.strip()}\n")
+
+            if not df_result.empty:
+                print("Query Result:")
+                print(df_result)
+            else:
+                print("No results or an error occurred for this query.")
+            if entry is not None:
+                profile_entries.append(entry)
+                print(f"Profile: {entry['wall_time_s']:.4f}s, {entry['rows_returned']} rows returned, "
+                      f"{'unknown' if entry['rows_examined'] is None else entry['rows_examined']} rows examined")
+                for warning in entry['warnings']:
+                    print(f"WARNING: {warning}")
+            print("-" * 50 + "\n")  # Separator for readability
+    finally:
+        pool.close()
+
+    flush_metrics()
+    if profile:
+        write_profile_report(report_path, sql_filepath, profile_entries)
+        print(f"Profile report written to '{report_path}'")
+        return report_path
+    return None
+
+
+def main(argv=None):
+    """Command-line entry point: python sql_runner.py [SQL_FILE] [--profile] [--local-db PATH] [--growth-engine]"""
+    parser = argparse.ArgumentParser(description="Run the PhonePe analysis queries.")
+    parser.add_argument('sql_file', nargs='?', default='phonepe_analysis_queries.sql')
+    parser.add_argument('--profile', action='store_true', help="Record timings, plans and warnings")
+    parser.add_argument('--report', default=PROFILE_REPORT_PATH, help="Where to write the profile report")
+    parser.add_argument('--explain-analyze', action='store_true', help="Also run EXPLAIN ANALYZE (MySQL 8.0.18+)")
+    parser.add_argument('--local-db', metavar='PATH', help="Run against a local SQLite database instead of MySQL")
+    parser.add_argument('--workers', type=int, default=4, help="Number of queries to run at the same time")
+    parser.add_argument('--growth-engine', action='store_true',
+                        help="Answer the year-over-year queries from in-memory growth panels")
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_from_args(args)
+
+    connection_factory = functools.partial(connect_local_db, args.local_db) if args.local_db else connect_mysql
+    with profile_run('sql_runner'):
+        load_and_execute_queries_from_file(args.sql_file, connection_factory, profile=args.profile,
+                                           report_path=args.report, explain_analyze=args.explain_analyze,
+                                           max_workers=args.workers, growth_engine=args.growth_engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import random
+
+from pulse_ingestion import DATASET_PATHS
+
+# --- Synthetic Pulse data generator ---
+# Writes a JSON tree in the layout of the PhonePe Pulse repository (the layout scan_pulse_tree
+# and the extractors expect), so ingestion, queries and the dashboard can be measured at any size
+# without the real dataset. At scale=1.0 the tree is roughly the size of the real one; every
+# dimension grows with the scale factor and can also be set on its own.
+
+# Sizes at scale=1.0
+BASE_SIZES = {
+    'states': 36,
+    'years': 7,  # 2018 onwards
+    'districts': 20,  # per state
+    'pincodes': 10,  # per state in the top/* lists
+    'brands': 11,
+}
+FIRST_YEAR = 2018
+
+TRANSACTION_TYPES = ['Recharge & bill payments', 'Peer-to-peer payments', 'Merchant payments',
+                     'Financial Services', 'Others']
+# State folder names as in the real tree; the report's default filters (maharashtra, karnataka) come first
+STATES = ['maharashtra', 'karnataka', 'andaman-&-nicobar-islands', 'andhra-pradesh', 'arunachal-pradesh', 'assam',
+          'bihar', 'chandigarh', 'chhattisgarh', 'dadra-&-nagar-haveli-&-daman-&-diu', 'delhi', 'goa', 'gujarat',
+          'haryana', 'himachal-pradesh', 'jammu-&-kashmir', 'jharkhand', 'kerala', 'ladakh', 'lakshadweep',
+          'madhya-pradesh', 'manipur', 'meghalaya', 'mizoram', 'nagaland', 'odisha', 'puducherry', 'punjab',
+          'rajasthan', 'sikkim', 'tamil-nadu', 'telangana', 'tripura', 'uttar-pradesh', 'uttarakhand', 'west-bengal']
+BRANDS = ['Xiaomi', 'Samsung', 'Vivo', 'Oppo', 'OnePlus', 'Realme', 'Apple', 'Motorola', 'Lenovo', 'Huawei', 'Others']
+
+
+def scaled_sizes(scale=1.0, **overrides):
+    """Returns the number of states, years, districts, pincodes and brands for a scale factor."""
+    sizes = {name: max(1, round(size * scale)) for name, size in BASE_SIZES.items()}
+    sizes.update({name: value for name, value in overrides.items() if value is not None})
+    return sizes
+
+
+def _write_json(base_path, dataset, state, year, quarter, document):
+    """Writes one state/year/quarter.json file of a dataset and returns its size in bytes."""
+    folder = os.path.join(base_path, *DATASET_PATHS[dataset], state, str(year))
+    os.makedirs(folder, exist_ok=True)
+    content = json.dumps(document)
+    with open(os.path.join(folder, f"{quarter}.json"), 'w', encoding='utf-8') as f:
+        f.write(content)
+    return len(content)
+
+
+def _metric(rng, growth, count_base, amount_per_count):
+    """Returns a (count, amount) pair that grows over time with some noise."""
+    count = int(count_base * growth * rng.uniform(0.5, 1.5))
+    return count, round(count * amount_per_count * rng.uniform(0.8, 1.2), 2)
+
+
+def _quarter_documents(rng, state, districts, pincodes, brands, growth, timestamp):
+    """Builds the nine Pulse documents of one state and quarter, keyed by dataset."""
+    def entity_metric(count_base, amount_per_count):
+        count, amount = _metric(rng, growth, count_base, amount_per_count)
+        return {'type': 'TOTAL', 'count': count, 'amount': amount}
+
+    registered_users = int(1_000_000 * growth * rng.uniform(0.5, 1.5))
+    device_counts = [rng.randint(1, 1000) for _ in brands]
+    device_total = sum(device_counts)
+    return {
+        'aggregated/transaction': {'responseTimestamp': timestamp, 'data': {'transactionData': [
+            {'name': name, 'paymentInstruments': [entity_metric(500_000, 1500)]} for name in TRANSACTION_TYPES]}},
+        'aggregated/user': {'responseTimestamp': timestamp, 'data': {
+            'aggregated': {'registeredUsers': registered_users, 'appOpens': int(registered_users * rng.uniform(5, 40))},
+            'usersByDevice': [{'brand': brand, 'count': int(registered_users * count / device_total),
+                               'percentage': round(count / device_total, 6)}
+                              for brand, count in zip(brands, device_counts)]}},
+        'aggregated/insurance': {'responseTimestamp': timestamp, 'data': {'transactionData': [
+            {'name': 'Insurance', 'paymentInstruments': [entity_metric(2_000, 500)]}]}},
+        'map/transaction': {'responseTimestamp': timestamp, 'data': {'hoverDataList': [
+            {'name': district, 'metric': [entity_metric(100_000, 1500)]} for district in districts]}},
+        'map/user': {'responseTimestamp': timestamp, 'data': {'hoverData': {
+            district: {'registeredUsers': int(50_000 * growth * rng.uniform(0.5, 1.5)),
+                       'appOpens': int(500_000 * growth * rng.uniform(0.5, 1.5))} for district in districts}}},
+        'map/insurance': {'responseTimestamp': timestamp, 'data': {'hoverDataList': [
+            {'name': district, 'metric': [entity_metric(100, 500)]} for district in districts]}},
+        'top/transaction': {'responseTimestamp': timestamp, 'data': {
+            'districts': [{'entityName': district, 'metric': entity_metric(100_000, 1500)} for district in districts],
+            'pincodes': [{'entityName': pincode, 'metric': entity_metric(10_000, 1500)} for pincode in pincodes]}},
+        'top/user': {'responseTimestamp': timestamp, 'data': {
+            'districts': [{'name': district, 'registeredUsers': int(50_000 * growth * rng.uniform(0.5, 1.5))}
+                          for district in districts],
+            'pincodes': [{'name': pincode, 'registeredUsers': int(5_000 * growth * rng.uniform(0.5, 1.5))}
+                         for pincode in pincodes]}},
+        'top/insurance': {'responseTimestamp': timestamp, 'data': {
+            'districts': [{'entityName': district, 'metric': entity_metric(100, 500)} for district in districts],
+            'pincodes': [{'entityName': pincode, 'metric': entity_metric(10, 500)} for pincode in pincodes]}},
+    }
+
+
+def generate_pulse_tree(base_path, scale=1.0, seed=42, states=None, years=None, districts=None, pincodes=None,
+                        brands=None):
+    """Writes a synthetic Pulse 'data' folder under base_path.
+
+    The scale factor multiplies the number of states, years, districts and pincodes per state and
+    device brands (see BASE_SIZES); any of them can be given explicitly instead. The same seed
+    always produces the same files. Returns a summary with the sizes used, files and bytes written.
+    """
+    sizes = scaled_sizes(scale, states=states, years=years, districts=districts, pincodes=pincodes, brands=brands)
+    rng = random.Random(seed)
+    brand_names = [BRANDS[i] if i < len(BRANDS) else f"Brand {i + 1}" for i in range(sizes['brands'])]
+    files = 0
+    total_bytes = 0
+
+    for state_index in range(sizes['states']):
+        state = STATES[state_index] if state_index < len(STATES) else f"state-{state_index + 1}"
+        district_names = [f"{state} district {i + 1}" for i in range(sizes['districts'])]
+        pincode_names = [str(100000 + state_index * 10000 + i) for i in range(sizes['pincodes'])]
+        for year_index in range(sizes['years']):
+            year = FIRST_YEAR + year_index
+            for quarter in range(1, 5):
+                # Quarter-on-quarter growth of ~8%, like the adoption curve of the real data
+                growth = 1.08 ** (year_index * 4 + quarter - 1)
+                timestamp = 1_600_000_000_000 + (year_index * 4 + quarter) * 7_776_000_000
+                documents = _quarter_documents(rng, state, district_names, pincode_names, brand_names, growth, timestamp)
+                for dataset, document in documents.items():
+                    total_bytes += _write_json(base_path, dataset, state, year, quarter, document)
+                    files += 1
+
+    print(f"Generated {files} files ({total_bytes / 2**20:.1f} MiB) under '{base_path}' with {sizes}")
+    return {'base_path': base_path, 'scale': scale, 'seed': seed, 'sizes': sizes, 'files': files, 'bytes': total_bytes}
+
+
+def main(argv=None):
+    """Command-line entry point: python synthetic_pulse.py OUTPUT_DIR [--scale 0.5] [--seed 42]"""
+    parser = argparse.ArgumentParser(description="Write a synthetic PhonePe Pulse data tree.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--scale', type=float, default=1.0, help="Size relative to the real dataset")
+    parser.add_argument('--seed', type=int, default=42)
+    for name in BASE_SIZES:
+        parser.add_argument(f'--{name}', type=int, default=None, help=f"Override the number of {name}")
+    args = parser.parse_args(argv)
+    generate_pulse_tree(args.output_dir, args.scale, args.seed,
+                        **{name: getattr(args, name) for name in BASE_SIZES})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+import csv
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ingestion_manifest import file_sha256
+from pulse_db import connect_local_db
+from pulse_schema import COLUMN_TYPES, TABLES
+from sql_runner import FETCH_CHUNK_SIZE, ConnectionPool, connect_mysql, iter_query_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export needs pyarrow; CSV export works without it
+    pa = pq = None
+
+try:
+    import xlsxwriter
+except ImportError:  # Only needed for the optional .xlsx export
+    xlsxwriter = None
+
+# --- Streaming table export ---
+# Each table is read with SELECT * and written chunk by chunk as the cursor is consumed, so memory
+# use depends on chunk_size and not on the size of the table. Tables are exported in parallel on a
+# thread pool that shares a ConnectionPool. Every file is written under a temporary name and
+# renamed when complete, and its row count and SHA-256 are recorded in export_manifest.json.
+#
+# Formats:
+#   'parquet' - one row group per chunk (needs pyarrow)
+#   'csv'     - header plus rows, empty field for NULL
+#   'xlsx'    - xlsxwriter in constant_memory mode; tables longer than an Excel sheet continue
+#               on extra sheets (<table>_2, <table>_3, ...)
+
+EXPORT_FORMATS = ('parquet', 'csv', 'xlsx')
+EXPORT_MANIFEST_NAME = 'export_manifest.json'
+
+# Data rows per worksheet: Excel's 1,048,576 row limit minus the header row
+XLSX_MAX_ROWS = 1048575
+
+_ARROW_TYPES = {'VARCHAR': 'string', 'CHAR': 'string', 'INT': 'int64', 'BIGINT': 'int64', 'DOUBLE': 'float64'}
+
+
+def _arrow_schema(table_name, columns):
+    """Returns the Arrow schema of a Pulse table, or None if its column types are unknown."""
+    if table_name not in TABLES:
+        return None
+    fields = []
+    for column in columns:
+        sql_type = COLUMN_TYPES.get(column, '').split('(')[0]
+        if sql_type not in _ARROW_TYPES:
+            return None
+        fields.append(pa.field(column, getattr(pa, _ARROW_TYPES[sql_type])()))
+    return pa.schema(fields)
+
+
+def _write_parquet(path, table_name, columns, chunks):
+    """Writes the chunks to a Parquet file and returns the number of rows written."""
+    if pq is None:
+        raise ImportError("pyarrow is required for Parquet export")
+    schema = _arrow_schema(table_name, columns)
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            batch = pa.Table.from_pydict(chunk, schema=schema)
+            if writer is None:
+                # Without a known schema the first chunk decides the column types
+                schema = batch.schema
+                writer = pq.ParquetWriter(path, schema)
+            writer.write_table(batch)
+            rows += batch.num_rows
+        if writer is None:
+            schema = schema or pa.schema([pa.field(column, pa.string()) for column in columns])
+            writer = pq.ParquetWriter(path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _write_csv(path, table_name, columns, chunks):
+    """Writes the chunks to a CSV file and returns the number of rows written."""
+    rows = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            batch = list(zip(*chunk.values()))
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def _write_xlsx(path, table_name, columns, chunks):
+    """Writes the chunks to an .xlsx workbook in constant-memory mode and returns the number of rows written."""
+    if xlsxwriter is None:
+        raise ImportError("xlsxwriter is required for .xlsx export")
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    worksheet = None
+    sheet_row = XLSX_MAX_ROWS
+    rows = 0
+    try:
+        for chunk in chunks:
+            for row in zip(*chunk.values()):
+                if sheet_row == XLSX_MAX_ROWS:
+                    sheet_number = len(workbook.worksheets()) + 1
+                    suffix = '' if sheet_number == 1 else f"_{sheet_number}"
+                    worksheet = workbook.add_worksheet(table_name[:31 - len(suffix)] + suffix)
+                    worksheet.write_row(0, 0, columns)
+                    sheet_row = 0
+                sheet_row += 1
+                worksheet.write_row(sheet_row, 0, row)
+                rows += 1
+        if worksheet is None:
+            workbook.add_worksheet(table_name[:31]).write_row(0, 0, columns)
+    finally:
+        workbook.close()
+    return rows
+
+
+_WRITERS = {'parquet': _write_parquet, 'csv': _write_csv, 'xlsx': _write_xlsx}
+
+
+def export_table(table_name, output_directory='table_exports', fmt='parquet', connection_factory=connect_mysql,
+                 chunk_size=FETCH_CHUNK_SIZE, pool=None):
+    """Streams one table to a file and returns its manifest entry (with 'error' set on failure)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Expected one of {EXPORT_FORMATS}")
+    os.makedirs(output_directory, exist_ok=True)
+    output_filepath = os.path.join(output_directory, f"{table_name}.{fmt}")
+    temp_path = f"{output_filepath}.{os.getpid()}.tmp"
+    entry = {'table': table_name, 'format': fmt, 'path': output_filepath, 'rows': None, 'bytes': None,
+             'sha256': None, 'seconds': None, 'error': None}
+    start = time.perf_counter()
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool(connection_factory, size=1)
+
+    try:
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"SELECT * FROM {table_name}")
+                columns = [column[0] for column in cursor.description]
+                entry['rows'] = _WRITERS[fmt](temp_path, table_name, columns, iter_query_chunks(cursor, chunk_size))
+            finally:
+                cursor.close()
+        os.replace(temp_path, output_filepath)
+        entry['bytes'] = os.path.getsize(output_filepath)
+        entry['sha256'] = file_sha256(output_filepath)
+        print(f"Successfully exported {entry['rows']} rows from '{table_name}' to '{output_filepath}'")
+    except Exception as e:
+        entry['error'] = str(e)
+        print(f"Error exporting table '{table_name}': {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    finally:
+        if own_pool:
+            pool.close()
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def write_export_manifest(output_directory, entries):
+    """Merges export entries into the directory's export_manifest.json and returns the manifest."""
+    manifest_path = os.path.join(output_directory, EXPORT_MANIFEST_NAME)
+    manifest = {'files': {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    for entry in entries:
+        entry = dict(entry, exported_at=datetime.now().isoformat(timespec='seconds'))
+        manifest['files'][os.path.basename(entry['path'])] = entry
+    manifest['generated_at'] = datetime.now().isoformat(timespec='seconds')
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, manifest_path)
+    return manifest
+
+
+def export_tables(table_names=None, output_directory='table_exports', fmt='parquet', connection_factory=connect_mysql,
+                  chunk_size=FETCH_CHUNK_SIZE, max_workers=4):
+    """Exports tables in parallel (all 13 Pulse tables by default) and records them in the export manifest.
+
+    Returns the list of manifest entries in the order of table_names.
+    """
+    table_names = list(table_names or TABLES)
+    pool = ConnectionPool(connection_factory, size=max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            entries = list(executor.map(
+                lambda table_name: export_table(table_name, output_directory, fmt, chunk_size=chunk_size, pool=pool),
+                table_names))
+    finally:
+        pool.close()
+    write_export_manifest(output_directory, entries)
+    failed = [entry['table'] for entry in entries if entry['error']]
+    print(f"\nExported {len(entries) - len(failed)} of {len(entries)} tables to '{output_directory}' as {fmt}"
+          + (f". Failed: {', '.join(failed)}" if failed else ""))
+    return entries
+
+
+def main(argv=None):
+    """Command-line entry point: python table_export.py [TABLE ...] [--format parquet|csv|xlsx] [--local-db PATH]"""
+    parser = argparse.ArgumentParser(description="Export the Pulse tables to Parquet, CSV or .xlsx files.")
+    parser.add_argument('tables', nargs='*', help="Tables to export (default: all Pulse tables)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='parquet')
+    parser.add_argument('--output-dir', default='table_exports')
+    parser.add_argument('--workers', type=int, default=4, help="Number of tables to export at the same time")
+    parser.add_argument('--chunk-size', type=int, default=FETCH_CHUNK_SIZE, help="Rows fetched and written per chunk")
+    parser.add_argument('--local-db', metavar='PATH', help="Export from a local SQLite database instead of MySQL")
+    args = parser.parse_args(argv)
+
+    connection_factory = functools.partial(connect_local_db, args.local_db) if args.local_db else connect_mysql
+    export_tables(args.tables or None, args.output_dir, args.format, connection_factory,
+                  chunk_size=args.chunk_size, max_workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
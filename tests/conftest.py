@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to the Streamlit app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pulse_db import connect_local_db  # noqa: E402
+
+
+@pytest.fixture
+def connection(tmp_path):
+    """A fresh local SQLite database with the Pulse tables."""
+    connection = connect_local_db(str(tmp_path / 'pulse.db'))
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def pulse_tree(tmp_path):
+    """A small synthetic Pulse 'data' folder covering 2018-2022, the years the report queries ask for."""
+    from synthetic_pulse import generate_pulse_tree
+
+    base_path = str(tmp_path / 'data')
+    generate_pulse_tree(base_path, states=3, years=5, districts=3, pincodes=3, brands=2)
+    return base_path
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from analysis_api import ResultCache, run_analysis
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+
+
+class CountingFactory:
+    """Opens local database connections and counts them."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return connect_local_db(self.db_path)
+
+
+def test_cache_hits_need_no_connection(tmp_path, pulse_tree):
+    db_path = str(tmp_path / 'pulse.db')
+    connection = connect_local_db(db_path)
+    ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    connection.close()
+    factory, cache = CountingFactory(db_path), ResultCache(version_ttl=3600)
+
+    first = run_analysis('1.3', factory, cache=cache, year=2022)
+    assert factory.opened == 1
+    for _ in range(3):
+        pd.testing.assert_frame_equal(run_analysis('1.3', factory, cache=cache, year=2022), first)
+    assert factory.opened == 1
+    assert cache.stats()['hits'] == 3
+
+    # A miss under the same fresh version runs the query without re-reading the version
+    run_analysis('1.3', factory, cache=cache, year=2021)
+    assert factory.opened == 2
+
+    # Once the version is stale it is re-checked on a connection; the data did not change, so it's a hit
+    cache.version_ttl = 0
+    pd.testing.assert_frame_equal(run_analysis('1.3', factory, cache=cache, year=2022), first)
+    assert factory.opened == 3
+    assert cache.stats() == {'entries': 2, 'hits': 4, 'misses': 2}
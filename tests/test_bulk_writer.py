@@ -0,0 +1,89 @@
+import pytest
+
+from bulk_writer import BulkWriter
+
+TABLE = 'Aggregated_transaction'
+
+
+def make_rows(count, amount=1.0):
+    """Aggregated_transaction rows with distinct keys."""
+    return [(f"state-{i % 7}", 2018 + i % 5, 1 + i % 4, f"type {i}", i, amount * i) for i in range(count)]
+
+
+def count_rows(connection):
+    return connection.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+
+@pytest.mark.parametrize('staging', [False, True])
+@pytest.mark.parametrize('method', ['executemany', 'multirow'])
+@pytest.mark.parametrize('batch_size', [7, 1000])
+def test_write_modes_load_every_row(connection, method, staging, batch_size):
+    rows = make_rows(250)
+    with BulkWriter(connection, method=method, staging=staging, batch_size=batch_size, commit_every=60) as writer:
+        for start in range(0, len(rows), 40):
+            writer.add_rows(TABLE, rows[start:start + 40])
+
+    assert writer.loaded[TABLE] == 250
+    assert writer.errors[TABLE] == 0
+    assert count_rows(connection) == 250
+    assert connection.execute(f"SELECT SUM(transaction_amount) FROM {TABLE}").fetchone()[0] == sum(r[5] for r in rows)
+    # Staging tables are temporary and dropped on close
+    assert connection.execute("SELECT COUNT(*) FROM sqlite_temp_master WHERE name LIKE 'staging_%'").fetchone()[0] == 0
+
+
+@pytest.mark.parametrize('staging', [False, True])
+@pytest.mark.parametrize('method', ['executemany', 'multirow'])
+def test_write_modes_upsert_existing_keys(connection, method, staging):
+    with BulkWriter(connection, method=method, staging=staging, batch_size=50) as writer:
+        writer.add_rows(TABLE, make_rows(120))
+    with BulkWriter(connection, method=method, staging=staging, batch_size=50) as writer:
+        writer.add_rows(TABLE, make_rows(80, amount=2.0))
+
+    assert writer.loaded[TABLE] == 80
+    assert count_rows(connection) == 120
+    updated = connection.execute(f"SELECT transaction_amount FROM {TABLE} WHERE transaction_type = 'type 79'")
+    assert updated.fetchone()[0] == 158.0
+    kept = connection.execute(f"SELECT transaction_amount FROM {TABLE} WHERE transaction_type = 'type 80'")
+    assert kept.fetchone()[0] == 80.0
+
+
+def test_load_data_needs_mysql(connection):
+    with pytest.raises(ValueError):
+        BulkWriter(connection, method='load_data')
+
+
+def test_unknown_method(connection):
+    with pytest.raises(ValueError):
+        BulkWriter(connection, method='copy')
+
+
+def test_failed_batches_report_their_sources(connection):
+    connection.execute(f"CREATE TRIGGER fail_write BEFORE INSERT ON {TABLE} "
+                       "WHEN NEW.year = 2020 BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    with BulkWriter(connection, batch_size=10) as writer:
+        # Four files of 5 rows: batches hold files 0-1 and 2-3, and file 3 has a row the database rejects
+        for file_number in range(4):
+            rows = [(f"state-{file_number}", 2019, 1, f"type {i}", i, 1.0) for i in range(5)]
+            if file_number == 3:
+                rows[-1] = ("state-3", 2020, 1, "type 4", 4, 1.0)
+            writer.add_rows(TABLE, rows, source=f"file-{file_number}")
+
+    assert writer.failed_sources == {'file-2', 'file-3'}
+    assert writer.errors[TABLE] == 10
+    assert writer.loaded[TABLE] == 10
+    # SQLite keeps the rows executemany() wrote before the error, which is why such files are reloaded
+    assert count_rows(connection) == 19
+
+
+def test_failed_merges_report_their_sources(connection):
+    connection.execute(f"CREATE TRIGGER fail_write BEFORE INSERT ON {TABLE} "
+                       "WHEN NEW.year = 2020 BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+    with BulkWriter(connection, staging=True, batch_size=10, commit_every=10) as writer:
+        writer.add_rows(TABLE, [("state-0", 2019, 1, f"type {i}", i, 1.0) for i in range(10)], source='file-0')
+        writer.commit()
+        # Staged fine, but the merge into the target table fails
+        writer.add_rows(TABLE, [("state-1", 2020, 1, "type 0", 0, 1.0)], source='file-1')
+
+    assert writer.failed_sources == {'file-1'}
+    assert writer.errors[TABLE] == 1
+    assert writer.loaded[TABLE] == count_rows(connection) == 10
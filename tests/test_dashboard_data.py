@@ -0,0 +1,32 @@
+import pytest
+
+from analysis_api import ANALYSES
+from dashboard_data import connection_factory, load_chart_frame, prerender_chart_frame
+from dashboard_plots import plot_1_3
+from figure_cache import figure_key
+from growth_engine import GrowthEngine
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+from sql_runner import ConnectionPool
+
+
+@pytest.fixture
+def db_path(tmp_path, pulse_tree):
+    db_path = str(tmp_path / 'pulse.db')
+    connection = connect_local_db(db_path)
+    ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    connection.close()
+    return db_path
+
+
+@pytest.mark.parametrize('filters', [{}, {'year': 2021, 'top_n': 3}])
+def test_worker_frames_match_the_app(db_path, filters):
+    # The pre-render workers load with their own connections; their figures are only found by the
+    # app if the frames (and so the figure keys) are the same
+    pool = ConnectionPool(connection_factory("Local SQLite", db_path), size=2)
+    growth_engine = GrowthEngine(pool=pool)
+    for analysis_id in ANALYSES:
+        expected = load_chart_frame(analysis_id, filters, pool, growth_engine)
+        df = prerender_chart_frame(analysis_id, filters, "Local SQLite", db_path)
+        assert figure_key(plot_1_3, df) == figure_key(plot_1_3, expected), analysis_id
+    pool.close()
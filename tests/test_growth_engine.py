@@ -0,0 +1,91 @@
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis_api import ResultCache, run_analysis
+from growth_engine import GrowthEngine
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+from sql_runner import fetch_dataframe, read_sql_file
+
+QUERY_FILES = {name: dict(read_sql_file(os.path.join(os.path.dirname(__file__), '..', f'phonepe_{name}_queries.sql')))
+               for name in ('analysis', 'rollup')}
+
+
+@pytest.fixture
+def connection_factory(tmp_path, pulse_tree):
+    db_path = str(tmp_path / 'pulse.db')
+    connection = connect_local_db(db_path)
+    ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    connection.close()
+    return functools.partial(connect_local_db, db_path)
+
+
+def sql_result(connection_factory, sql):
+    connection = connection_factory()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        return fetch_dataframe(cursor)
+    finally:
+        connection.close()
+
+
+def assert_same_result(result, expected):
+    """Same columns, rows and order as the SQL result; amounts may differ in the last bits."""
+    if expected.empty:
+        assert result.empty
+        return
+    assert list(result.columns) == list(expected.columns)
+    assert result['state'].tolist() == expected['state'].tolist()
+    np.testing.assert_allclose(result.iloc[:, 1:].to_numpy(float), expected.iloc[:, 1:].to_numpy(float), rtol=1e-9)
+
+
+@pytest.mark.parametrize('analysis_id', ['4.1', '6.2'])
+@pytest.mark.parametrize('year', [2019, 2021, 2022, 2030])
+@pytest.mark.parametrize('top_n', [None, 2])
+def test_engine_matches_sql_analyses(connection_factory, analysis_id, year, top_n):
+    engine = GrowthEngine(connection_factory)
+    expected = run_analysis(analysis_id, connection_factory, cache=ResultCache(), year=year, top_n=top_n)
+    assert_same_result(engine.analysis(analysis_id, year=year, top_n=top_n), expected)
+
+
+@pytest.mark.parametrize('query_id, query_file', [('4.1', 'rollup'), ('6.2', 'analysis')])
+def test_engine_matches_report_queries(connection_factory, query_id, query_file):
+    # 4.1 is compared with the rollup file, whose 4.1 reports the true yearly totals
+    expected = sql_result(connection_factory, QUERY_FILES[query_file][query_id])
+    assert not expected.empty
+    assert_same_result(GrowthEngine(connection_factory).report_result(query_id), expected)
+
+
+def test_compare_years_matches_sql_totals(connection_factory):
+    panel = GrowthEngine(connection_factory).panel('transactions', 'district')
+    result = panel.compare('transaction_amount', 2019, 2022)
+    expected = sql_result(connection_factory, """
+        SELECT state, district,
+               SUM(CASE WHEN year = 2019 THEN transaction_amount END) AS start_value,
+               SUM(CASE WHEN year = 2022 THEN transaction_amount END) AS end_value
+        FROM Map_transaction GROUP BY state, district""")
+    merged = result.merge(expected, on=['state', 'district'], suffixes=('', '_sql'))
+    assert len(merged) == len(expected) == len(result)
+    np.testing.assert_allclose(merged['start_value'], merged['start_value_sql'], rtol=1e-9)
+    np.testing.assert_allclose(merged['end_value'], merged['end_value_sql'], rtol=1e-9)
+    np.testing.assert_allclose(merged['growth'], merged['end_value_sql'] - merged['start_value_sql'], rtol=1e-9)
+    cagr = ((merged['end_value_sql'] / merged['start_value_sql']) ** (1 / 3) - 1) * 100
+    np.testing.assert_allclose(merged['cagr_pct'], cagr, rtol=1e-9)
+
+
+def test_trend_yoy_matches_sql(connection_factory):
+    trend = GrowthEngine(connection_factory).panel('users', 'state').trend('registered_users')
+    expected = sql_result(connection_factory, """
+        SELECT cur.state, cur.year, cur.quarter,
+               (cur.registered_users - prev.registered_users) * 100.0 / prev.registered_users AS yoy_growth_pct
+        FROM rollup_map_user cur
+        JOIN rollup_map_user prev ON prev.state = cur.state AND prev.year = cur.year - 1 AND prev.quarter = cur.quarter""")
+    merged = trend.merge(expected, on=['state', 'year', 'quarter'], suffixes=('', '_sql'))
+    assert len(merged) == len(expected) > 0
+    np.testing.assert_allclose(merged['yoy_growth_pct'], merged['yoy_growth_pct_sql'], rtol=1e-9)
+    assert pd.isna(trend.loc[trend['year'] == trend['year'].min(), 'yoy_growth_pct']).all()
@@ -0,0 +1,132 @@
+import glob
+import json
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from ingestion_manifest import MANIFEST_TABLE, load_manifest
+from pulse_db import connect_local_db
+from pulse_ingestion import DATASET_PATHS, EXTRACTORS, ingest_pulse_data
+from pulse_schema import TABLES, create_tables
+from rollups import ROLLUPS
+
+DATA_TABLES = [table for dataset in DATASET_PATHS for table, _ in EXTRACTORS[dataset]]
+
+
+def quarter_file(base_path, dataset, state, year, quarter):
+    pattern = os.path.join(base_path, *dataset.split('/'), '**', 'state', state, str(year), f"{quarter}.json")
+    return glob.glob(pattern, recursive=True)[0]
+
+
+def table_rows(connection, table_name):
+    return sorted(connection.execute(f"SELECT * FROM {table_name}").fetchall(), key=repr)
+
+
+def assert_same_contents(connection, expected):
+    """Asserts two databases hold the same data, rollups and manifest (paths and hashes)."""
+    for table_name in DATA_TABLES + list(ROLLUPS):
+        assert table_rows(connection, table_name) == table_rows(expected, table_name), table_name
+    manifest = f"SELECT path, sha256 FROM {MANIFEST_TABLE} ORDER BY path"
+    assert connection.execute(manifest).fetchall() == expected.execute(manifest).fetchall()
+
+
+def edit_tree(base_path):
+    """Adds, changes, touches and removes one quarter file each. Returns their paths."""
+    new = quarter_file(base_path, 'aggregated/transaction', 'karnataka', 2022, 4).replace('2022', '2023')
+    os.makedirs(os.path.dirname(new))
+    shutil.copy(quarter_file(base_path, 'aggregated/transaction', 'karnataka', 2022, 4), new)
+
+    changed = quarter_file(base_path, 'map/transaction', 'karnataka', 2021, 2)
+    stat = os.stat(changed)
+    with open(changed, encoding='utf-8') as f:
+        document = json.load(f)
+    document['data']['hoverDataList'][0]['metric'][0]['amount'] *= 3
+    with open(changed, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+    # A later edit; zip archives keep mtimes to 2 seconds, so "later" has to be a few seconds here
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 * 10**9))
+
+    touched = quarter_file(base_path, 'top/user', 'maharashtra', 2020, 1)
+    stat = os.stat(touched)
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 * 10**9))
+
+    removed = quarter_file(base_path, 'map/insurance', 'maharashtra', 2019, 3)
+    os.remove(removed)
+    return new, changed, touched, removed
+
+
+def load(connection, base_path, archive, **kwargs):
+    """Ingests the tree, zipped first if archive is set, like a quarterly refresh would."""
+    if archive:
+        zip_path = shutil.make_archive(base_path, 'zip', os.path.dirname(base_path), os.path.basename(base_path))
+        return ingest_pulse_data(zip_path, connection, max_workers=1, **kwargs)
+    return ingest_pulse_data(base_path, connection, max_workers=1, **kwargs)
+
+
+@pytest.mark.parametrize('archive', [False, True], ids=['folder', 'zip'])
+def test_incremental_ingest_matches_full_refresh(tmp_path, pulse_tree, archive):
+    connection = connect_local_db(str(tmp_path / 'incremental.db'))
+    load(connection, pulse_tree, archive)
+    new, changed, touched, removed = edit_tree(pulse_tree)
+
+    summary = load(connection, pulse_tree, archive)
+
+    # Only the new and the changed file are parsed and written
+    loaded = {table: counts['loaded'] for table, counts in summary.items() if counts['loaded']}
+    assert set(loaded) == {'Aggregated_transaction', 'Map_transaction'}
+    manifest = load_manifest(connection)
+    keys = {path: os.path.relpath(path, pulse_tree).replace(os.sep, '/') for path in (new, changed, touched, removed)}
+    assert keys[new] in manifest and keys[changed] in manifest
+    assert keys[removed] not in manifest
+    if not archive:  # Zip archives round mtimes to 2 seconds
+        assert manifest[keys[touched]].mtime_ns == os.stat(touched).st_mtime_ns
+
+    expected = connect_local_db(str(tmp_path / 'full.db'))
+    load(expected, pulse_tree, archive, full_refresh=True)
+    assert_same_contents(connection, expected)
+
+    # Nothing changed since: a rerun loads nothing
+    summary = load(connection, pulse_tree, archive)
+    assert sum(counts['loaded'] for counts in summary.values()) == 0
+    assert_same_contents(connection, expected)
+
+
+def test_failed_writes_are_retried(tmp_path, pulse_tree):
+    connection = connect_local_db(str(tmp_path / 'incremental.db'))
+    ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    _, changed, _, _ = edit_tree(pulse_tree)
+    connection.execute("CREATE TRIGGER fail_write BEFORE INSERT ON Map_transaction "
+                       "WHEN NEW.year = 2021 AND NEW.quarter = 2 BEGIN SELECT RAISE(ABORT, 'disk full'); END")
+
+    summary = ingest_pulse_data(pulse_tree, connection, max_workers=1)
+
+    assert summary['Map_transaction']['errors'] > 0
+    assert os.path.relpath(changed, pulse_tree).replace(os.sep, '/') not in load_manifest(connection)
+    # The rollup of that period was rebuilt from what is in the table, not left at the old totals
+    rollup = connection.execute("SELECT COUNT(*) FROM rollup_map_transaction "
+                                "WHERE year = 2021 AND quarter = 2 AND state = 'karnataka'").fetchone()[0]
+    assert rollup == 0
+
+    connection.execute("DROP TRIGGER fail_write")
+    summary = ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    assert summary['Map_transaction']['loaded'] > 0
+
+    expected = connect_local_db(str(tmp_path / 'full.db'))
+    ingest_pulse_data(pulse_tree, expected, max_workers=1, full_refresh=True)
+    assert_same_contents(connection, expected)
+
+
+def test_ingest_creates_its_bookkeeping_tables(tmp_path, pulse_tree):
+    # A database made before the manifest and latest_period existed, e.g. an older MySQL schema
+    connection = sqlite3.connect(str(tmp_path / 'bare.db'))
+    create_tables(connection, list(TABLES))
+
+    summary = ingest_pulse_data(pulse_tree, connection, max_workers=1)
+
+    assert summary['Map_transaction']['loaded'] > 0
+    assert load_manifest(connection)
+    assert connection.execute("SELECT COUNT(*) FROM latest_period").fetchone()[0] > 0
+    assert sum(counts['loaded'] for counts in ingest_pulse_data(pulse_tree, connection, max_workers=1).values()) == 0
+    connection.close()
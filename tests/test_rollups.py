@@ -0,0 +1,111 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+from rollups import ROLLUPS, refresh_rollups
+from schema_manager import refresh_latest_periods
+from sql_runner import fetch_dataframe, read_sql_file
+
+BASE_QUERIES = dict(read_sql_file(os.path.join(os.path.dirname(__file__), '..', 'phonepe_analysis_queries.sql')))
+ROLLUP_QUERIES = dict(read_sql_file(os.path.join(os.path.dirname(__file__), '..', 'phonepe_rollup_queries.sql')))
+
+# The base 4.1 self-joins Map_transaction and multiplies its totals; the rollup version reports
+# the true yearly totals, so it is checked against those instead
+TRUE_4_1 = """
+SELECT y1.state, y1.total_amount_2021, y2.total_amount_2022,
+       (y2.total_amount_2022 - y1.total_amount_2021) AS amount_growth
+FROM (SELECT state, SUM(transaction_amount) AS total_amount_2021 FROM Map_transaction WHERE year = 2021 GROUP BY state) AS y1
+JOIN (SELECT state, SUM(transaction_amount) AS total_amount_2022 FROM Map_transaction WHERE year = 2022 GROUP BY state) AS y2
+    ON y1.state = y2.state
+ORDER BY amount_growth DESC
+LIMIT 10
+"""
+
+
+def query(connection, sql):
+    cursor = connection.cursor()
+    cursor.execute(sql)
+    df = fetch_dataframe(cursor)
+    cursor.close()
+    return df
+
+
+def refresh(connection, rollup_names=None, **kwargs):
+    """Refreshes the rollups and, as the ingestion does afterwards, their latest periods (read by 3.2 etc.)."""
+    refreshed = refresh_rollups(connection, rollup_names, **kwargs)
+    refresh_latest_periods(connection, list(ROLLUPS))
+    return refreshed
+
+
+def assert_rollup_queries_match(connection):
+    for query_id, rollup_sql in ROLLUP_QUERIES.items():
+        expected = query(connection, TRUE_4_1 if query_id == '4.1' else BASE_QUERIES[query_id])
+        result = query(connection, rollup_sql)
+        assert not expected.empty, query_id
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False, obj=f"Query {query_id}")
+
+
+@pytest.fixture
+def loaded(tmp_path, pulse_tree):
+    """A database loaded from the synthetic tree, with the rollups not built yet."""
+    connection = connect_local_db(str(tmp_path / 'pulse.db'))
+    ingest_pulse_data(pulse_tree, connection, max_workers=1, update_rollups=False)
+    yield connection
+    connection.close()
+
+
+def test_same_queries_in_both_files():
+    assert list(ROLLUP_QUERIES) == list(BASE_QUERIES)
+
+
+def test_rollup_queries_match_base_queries(loaded):
+    refresh(loaded)
+    assert_rollup_queries_match(loaded)
+
+
+def test_refresh_rebuilds_only_changed_periods(loaded, pulse_tree):
+    refresh(loaded)
+    assert refresh(loaded) == {name: 0 for name in ROLLUPS}
+
+    path = os.path.join(pulse_tree, 'map', 'user', 'hover', 'country', 'india', 'state', 'karnataka', '2022', '3.json')
+    with open(path, encoding='utf-8') as f:
+        document = json.load(f)
+    for district in document['data']['hoverData'].values():
+        district['registeredUsers'] += 1000
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+    ingest_pulse_data(pulse_tree, loaded, max_workers=1, update_rollups=False)
+
+    refreshed = refresh(loaded)
+    assert refreshed == {name: 1 if name == 'rollup_map_user' else 0 for name in ROLLUPS}
+    assert_rollup_queries_match(loaded)
+
+
+def test_forced_periods_are_rebuilt(loaded):
+    refresh(loaded)
+    # Rows changed behind the manifest's back, e.g. a file that was only partly written
+    loaded.execute("DELETE FROM Map_transaction WHERE year = 2022 AND quarter = 1 AND state = 'karnataka'")
+    assert refresh(loaded, ['rollup_map_transaction']) == {'rollup_map_transaction': 0}
+
+    assert refresh(loaded, ['rollup_map_transaction'], periods=[(2022, 1)]) == {'rollup_map_transaction': 1}
+    assert_rollup_queries_match(loaded)
+
+
+def test_full_rebuild_matches_incremental(loaded):
+    refresh(loaded)
+    incremental = {name: query(loaded, f"SELECT * FROM {name} ORDER BY state, year, quarter") for name in ROLLUPS}
+    refresh(loaded, full=True)
+    for name in ROLLUPS:
+        pd.testing.assert_frame_equal(query(loaded, f"SELECT * FROM {name} ORDER BY state, year, quarter"),
+                                      incremental[name], obj=name)
+
+
+def test_row_count_signatures_without_manifest(loaded):
+    loaded.execute("DELETE FROM ingest_manifest")
+    refresh(loaded)
+    assert_rollup_queries_match(loaded)
+    assert refresh(loaded) == {name: 0 for name in ROLLUPS}
@@ -0,0 +1,82 @@
+import functools
+import json
+import os
+
+import pytest
+
+from pulse_db import connect_local_db
+from pulse_ingestion import ingest_pulse_data
+from sql_runner import ConnectionPool, load_and_execute_queries_from_file, read_sql_file
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+@pytest.fixture
+def connection_factory(tmp_path, pulse_tree):
+    db_path = str(tmp_path / 'pulse.db')
+    connection = connect_local_db(db_path)
+    ingest_pulse_data(pulse_tree, connection, max_workers=1)
+    connection.close()
+    return functools.partial(connect_local_db, db_path)
+
+
+def sql_path(name):
+    return os.path.join(SQL_DIR, f'phonepe_{name}_queries.sql')
+
+
+def run_file(connection_factory, tmp_path, name):
+    report_path = str(tmp_path / f'{name}_profile.json')
+    load_and_execute_queries_from_file(sql_path(name), connection_factory, profile=True, report_path=report_path,
+                                       max_workers=2)
+    with open(report_path, encoding='utf-8') as f:
+        return {entry['query_id']: entry for entry in json.load(f)['queries']}
+
+
+@pytest.mark.parametrize('name', ['analysis', 'rollup'])
+@pytest.mark.parametrize('latest_period', ['dropped', 'emptied'])
+def test_latest_period_is_filled_in_before_running(connection_factory, tmp_path, name, latest_period):
+    expected = run_file(connection_factory, tmp_path, name)
+    connection = connection_factory()
+    if latest_period == 'dropped':
+        connection.execute("DROP TABLE latest_period")
+    else:
+        connection.execute("DELETE FROM latest_period")
+        connection.commit()
+    connection.close()
+
+    entries = run_file(connection_factory, tmp_path, name)
+
+    assert list(entries) == [query_id for query_id, _ in read_sql_file(sql_path(name))]
+    for query_id, entry in entries.items():
+        assert entry['error'] is None, query_id
+        assert entry['rows_returned'] == expected[query_id]['rows_returned'] > 0, query_id
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def rows_from_pool(pool):
+    with pool.connection() as connection:
+        yield connection
+
+
+@pytest.mark.parametrize('interrupt', [ValueError, KeyboardInterrupt, GeneratorExit])
+def test_pool_closes_connections_of_unfinished_blocks(interrupt):
+    pool = ConnectionPool(FakeConnection, size=1)
+    with pytest.raises(interrupt):
+        with pool.connection() as connection:
+            raise interrupt()
+    assert connection.closed
+
+    # A generator closed while it holds a connection (GeneratorExit at the yield)
+    rows = rows_from_pool(pool)
+    connection = next(rows)
+    rows.close()
+    assert connection.closed
+    with pool.connection() as reused:
+        assert reused is not connection and not reused.closed